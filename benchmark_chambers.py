@@ -0,0 +1,94 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from threading import Thread
+from typing import Tuple
+
+# importing the simulator entry point installs the fakes before main pulls in the display and SSRs
+import simulate  # noqa: F401
+import main as app
+from fermentation_controller import clock
+from fermentation_controller.config import Config
+from fermentation_controller.scheduler import Scheduler
+from fermentation_controller.simulator import FakeW1Devices
+
+
+def chambers(count: int):
+    # pins of a Pi have no meaning in the simulation, they only have to be distinct
+    return [{"name": "fridge%d" % n,
+             "sensors": {role: "28-%04x%02d" % (n, r) for r, role in enumerate(["environment", "vessel", "fridge"])},
+             "heater_pin": 100 + 2 * n,
+             "cooler_pin": 101 + 2 * n} for n in range(count)]
+
+
+def run(count: int, duration: float, directory: str) -> Tuple[float, int, str]:
+    with open("./config.json") as file:
+        settings = json.load(file)
+    # reading a dozen chambers' sensors one by one would take longer than the sensor interval
+    settings.update(chambers=chambers(count), bulk_read=True)
+    config_file = os.path.join(directory, "config.json")
+    with open(config_file, "w") as file:
+        json.dump(settings, file)
+
+    config = Config(config_file)
+    devices = FakeW1Devices(directory)
+    schedule, hardware = app.create(config, None, directory, os.path.join(directory, "data.csv"),
+                                    os.path.join(directory, "data.bin"))
+    scheduler = Scheduler()
+    for _, simulation in simulate.create_simulations(schedule, devices, simulate.gpio, 20.0, 20.0, 20.0):
+        scheduler.add(simulation, 1, 0, "plant")
+    for runnable, interval, init_delay, lane in schedule:
+        scheduler.add(runnable, interval, init_delay, lane)
+
+    started = time.process_time()
+    thread = Thread(target=scheduler.start, name="scheduler")
+    thread.start()
+    clock.sleep(duration)
+    scheduler.stop()
+    thread.join()
+    cpu = time.process_time() - started
+
+    for device in hardware:
+        device.shutdown()
+    # a missed deadline is a skipped run, the CPU it didn't take would make the chambers look cheaper than they are
+    worst = max(scheduler.jobs, key=lambda job: job.missed)
+    missed = sum(job.missed for job in scheduler.jobs)
+    return cpu / duration * 3600, missed, "%s %d/%d" % (worst.name, worst.missed, worst.runs + worst.missed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU cost of running several chambers from one process")
+    parser.add_argument("--chambers", type=int, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--speed", type=float, default=10,
+                        help="virtual seconds per real second, low enough that no deadline is missed")
+    parser.add_argument("--duration", type=float, default=600, help="virtual seconds to simulate per run")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    clock.use(clock.ScaledClock(args.speed))
+
+    print("%-10s %20s %20s %8s  %s" % ("chambers", "CPU s / sim. hour", "per extra chamber", "missed",
+                                        "most missed (missed/scheduled)"))
+    baseline = None
+    saturated = False
+    for count in args.chambers:
+        with tempfile.TemporaryDirectory() as directory:
+            cpu, missed, worst = run(count, args.duration, directory)
+        if baseline is None:
+            baseline = (count, cpu)
+        marginal = "%.3f" % ((cpu - baseline[1]) / (count - baseline[0])) if count != baseline[0] else "-"
+        print("%-10d %20.3f %20s %8d  %s" % (count, cpu, marginal, missed, worst if missed else ""))
+        saturated = saturated or missed > 0
+
+    if saturated:
+        print()
+        print("WARNING: deadlines were missed, the figures leave out skipped runs. Lower --speed and run again.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
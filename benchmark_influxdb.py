@@ -0,0 +1,50 @@
+import argparse
+import gzip
+import timeit
+
+from influxdb.line_protocol import make_lines
+
+from fermentation_controller.data_collector import DataCollector
+from fermentation_controller.line_protocol import LineProtocolEncoder
+from fermentation_controller.replay import SENSOR_NAMES, SWITCH_NAMES
+
+
+def json_points(data, tags, timestamp):
+    # what InfluxDBWriter built before, the client turns it into line protocol with make_lines
+    return [{"measurement": key,
+             "time": timestamp,
+             "tags": tags,
+             "fields": {"value": float(value)}
+             } for key, value in data.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the line protocol encoder with the JSON points path")
+    parser.add_argument("--number", type=int, default=20000, help="intervals to encode per measurement")
+    args = parser.parse_args()
+
+    collector = DataCollector(SENSOR_NAMES, SWITCH_NAMES)
+    data = {name: 19.5 + n / 10 for n, name in enumerate(collector.valid_fields)}
+    tags = {"env": "prod"}
+    timestamp = 1600000000000000000
+    encoder = LineProtocolEncoder("fermentation", tags, collector.valid_fields)
+
+    encoded = "\n".join(encoder.encode(data, timestamp)) + "\n"
+    assert encoded == make_lines({"points": json_points(data, tags, timestamp)}), "encoders disagree"
+
+    json_time = timeit.timeit(lambda: make_lines({"points": json_points(data, tags, timestamp)}), number=args.number)
+    line_time = timeit.timeit(lambda: "\n".join(encoder.encode(data, timestamp)), number=args.number)
+
+    print("%-24s %14s" % ("path", "us / interval"))
+    print("%-24s %14.2f" % ("json points + make_lines", json_time / args.number * 1e6))
+    print("%-24s %14.2f" % ("line protocol encoder", line_time / args.number * 1e6))
+    print()
+    # the flusher sends whole batches, compress a full one as it would go over the wire
+    batch = "".join(line + "\n" for n in range(500) for line in
+                    encoder.encode({name: value + n % 7 / 16 for name, value in data.items()},
+                                   timestamp + n * 15000000000)).encode()
+    print("500 intervals: %d bytes plain, %d bytes gzipped" % (len(batch), len(gzip.compress(batch))))
+
+
+if __name__ == '__main__':
+    main()
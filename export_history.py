@@ -0,0 +1,46 @@
+import argparse
+import csv
+import sys
+
+from fermentation_controller.history import load
+from fermentation_controller.replay import history_files
+
+
+def formatter(kind: str):
+    # float32 columns get their 7 significant digits back instead of the exact binary value
+    if kind == "<f4":
+        return lambda value: "%.7g" % value
+    if kind == "|u1":
+        return str
+    return repr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export binary history files to CSV")
+    parser.add_argument("history", nargs="*", default=["data.bin"],
+                        help="history files, rotated -YYYYMMDD copies of each are included automatically")
+    parser.add_argument("--output", help="CSV file to write, defaults to stdout")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = csv.writer(output)
+    header = None
+    for filename in [f for history in args.history for f in history_files(history)]:
+        try:
+            records = load(filename)
+        except FileNotFoundError:
+            continue
+        names = list(records.dtype.names)
+        if names != header:
+            writer.writerow(names)
+            header = names
+        formats = [formatter(records.dtype.fields[name][0].str) for name in names]
+        for record in records.tolist():
+            writer.writerow([format_value(value) for format_value, value in zip(formats, record)])
+
+    if args.output:
+        output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Optional, Tuple
+
+from .config import CHAMBER_SCHEMA, Config, Settings
+
+SEPARATOR = "."
+SENSOR_ROLES = ["environment", "vessel", "fridge"]
+SWITCH_ROLES = ["heater", "cooler", "limiter"]
+CHAMBER_SETTINGS = [key for key in CHAMBER_SCHEMA if key in Settings._fields]
+
+
+# Fields of a chamber are prefixed with its name, like "fridge2.vessel". The chamber from before there were several
+# has no name, so its fields keep their plain names and existing logs, dashboards and replays keep working.
+def field_name(chamber: str, name: str) -> str:
+    return chamber + SEPARATOR + name if chamber else name
+
+
+def split_field(name: str) -> Tuple[str, str]:
+    chamber, _, base = name.rpartition(SEPARATOR)
+    return chamber, base
+
+
+class Chamber(NamedTuple):
+    name: str
+    # role -> 1-Wire device id, vessel and fridge are needed for control, environment is only recorded
+    sensors: Mapping[str, str]
+    heater_pin: int
+    cooler_pin: int
+
+
+LEGACY_CHAMBER = Chamber("", MappingProxyType({"environment": "28-0301a2798a9f",
+                                               "vessel": "28-0301a2799ddf",
+                                               "fridge": "28-0301a27988e2"}), 16, 20)
+
+
+def chambers_from(settings: Settings) -> List[Chamber]:
+    if not settings.chambers:
+        return [LEGACY_CHAMBER]
+
+    chambers = [Chamber(chamber["name"], chamber["sensors"], chamber["heater_pin"], chamber["cooler_pin"])
+                for chamber in settings.chambers]
+    names = [chamber.name for chamber in chambers]
+    for chamber in chambers:
+        if not chamber.name or SEPARATOR in chamber.name:
+            raise ValueError("Chamber name %r must be set and can't contain '%s'" % (chamber.name, SEPARATOR))
+        if names.count(chamber.name) > 1:
+            raise ValueError("Chamber %s is configured more than once" % chamber.name)
+        unknown = set(chamber.sensors) - set(SENSOR_ROLES)
+        if unknown or "vessel" not in chamber.sensors or "fridge" not in chamber.sensors:
+            raise ValueError("Chamber %s needs vessel and fridge sensors, and can only have %s"
+                             % (chamber.name, ", ".join(SENSOR_ROLES)))
+    pins = [pin for chamber in chambers for pin in (chamber.heater_pin, chamber.cooler_pin)]
+    if len(set(pins)) != len(pins):
+        raise ValueError("Chambers share GPIO pins: %s" % pins)
+    return chambers
+
+
+# The settings as one chamber sees them, the shared ones with the chamber's overrides on top. Follows config reloads,
+# the result is cached until the next one so a dozen controllers don't rebuild it every cycle.
+@dataclass
+class ChamberConfig:
+    config: Config
+    name: str
+
+    def __post_init__(self) -> None:
+        self.cached: Tuple[Optional[Settings], Optional[Settings]] = (None, None)
+
+    def get_settings(self) -> Settings:
+        settings = self.config.get_settings()
+        base, chamber_settings = self.cached
+        if settings is not base:
+            chamber_settings = self.__override(settings)
+            self.cached = (settings, chamber_settings)
+        return chamber_settings
+
+    def __override(self, settings: Settings) -> Settings:
+        for chamber in settings.chambers:
+            if chamber["name"] == self.name:
+                return settings._replace(**{key: chamber[key] for key in CHAMBER_SETTINGS if key in chamber})
+        return settings
@@ -0,0 +1,103 @@
+import time as systime
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from threading import Event
+from typing import Optional
+
+
+class Clock(ABC):
+
+    @abstractmethod
+    def monotonic(self) -> float:
+        pass
+
+    @abstractmethod
+    def time(self) -> float:
+        pass
+
+    @abstractmethod
+    def real_delay(self, seconds: float) -> float:
+        pass
+
+    def wait(self, event: Event, timeout: Optional[float] = None) -> bool:
+        return event.wait(None if timeout is None else self.real_delay(timeout))
+
+    def sleep(self, seconds: float) -> None:
+        systime.sleep(self.real_delay(seconds))
+
+
+class SystemClock(Clock):
+
+    def monotonic(self) -> float:
+        return systime.monotonic()
+
+    def time(self) -> float:
+        return systime.time()
+
+    def real_delay(self, seconds: float) -> float:
+        return seconds
+
+
+@dataclass
+class ScaledClock(Clock):
+    speed: float
+    epoch: float = field(default_factory=systime.time)
+
+    def __post_init__(self) -> None:
+        self.started = systime.monotonic()
+
+    def monotonic(self) -> float:
+        return (systime.monotonic() - self.started) * self.speed
+
+    def time(self) -> float:
+        return self.epoch + self.monotonic()
+
+    def real_delay(self, seconds: float) -> float:
+        return seconds / self.speed
+
+
+# time only moves when told to, for replaying recorded history as fast as possible
+@dataclass
+class ManualClock(Clock):
+    now: float = 0.0
+
+    def set(self, now: float) -> None:
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def real_delay(self, seconds: float) -> float:
+        return 0.0
+
+
+# every time source and timed wait in the controller goes through here, so a simulation can swap in virtual time
+current: Clock = SystemClock()
+
+
+def use(clock: Clock) -> None:
+    global current
+    current = clock
+
+
+def monotonic() -> float:
+    return current.monotonic()
+
+
+def time() -> float:
+    return current.time()
+
+
+def real_delay(seconds: float) -> float:
+    return current.real_delay(seconds)
+
+
+def wait(event: Event, timeout: Optional[float] = None) -> bool:
+    return current.wait(event, timeout)
+
+
+def sleep(seconds: float) -> None:
+    current.sleep(seconds)
@@ -1,24 +1,280 @@
+import hashlib
 import json
+import logging
 from dataclasses import dataclass
-from .runnable import Runnable
+from threading import Lock, Thread
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from .filters import FILTERS
+from .inotify import FileWatcher
+from .runnable import AsyncRunnable
+
+NUMBER = (int, float)
+
+
+class Field(NamedTuple):
+    types: Tuple[type, ...]
+    required: bool = True
+    minimum: Optional[float] = None
+    positive: bool = False
+    # schema of every item of a list of objects, or the field every item of a list of values is
+    items: Optional[Union[Dict[str, "Field"], "Field"]] = None
+    # the only values accepted, for settings that select an implementation
+    choices: Optional[Tuple[Any, ...]] = None
+
+
+# settings a chamber may override, everything else is shared by all chambers
+CHAMBER_SCHEMA = {
+    "name": Field((str,)),
+    "sensors": Field((dict,)),
+    "heater_pin": Field((int,), minimum=0),
+    "cooler_pin": Field((int,), minimum=0),
+    "p": Field(NUMBER, required=False),
+    "i": Field(NUMBER, required=False),
+    "d": Field(NUMBER, required=False),
+    "target": Field(NUMBER, required=False),
+    "control_deadband": Field(NUMBER, required=False, minimum=0),
+    "heating_limit": Field(NUMBER, required=False),
+    "limit_window": Field(NUMBER, required=False, minimum=0),
+    "max_sensor_age": Field(NUMBER, required=False, positive=True),
+}
+
+
+CONFIG_SCHEMA = {
+    "p": Field(NUMBER),
+    "i": Field(NUMBER),
+    "d": Field(NUMBER),
+    "target": Field(NUMBER),
+    "control_deadband": Field(NUMBER, minimum=0),
+    "average_filter": Field((str,), required=False, choices=tuple(FILTERS)),
+    "average_window": Field((int,), positive=True),
+    "heating_limit": Field(NUMBER),
+    "limit_window": Field(NUMBER, minimum=0),
+    "control_interval": Field(NUMBER, positive=True),
+    "csv_interval": Field(NUMBER, positive=True),
+    "influxdb_interval": Field(NUMBER, positive=True),
+    "sensor_interval": Field(NUMBER, positive=True),
+    "config_interval": Field(NUMBER, positive=True),
+    "bulk_read": Field((bool,), required=False),
+    "sensor_read_timeout": Field(NUMBER, required=False, positive=True),
+    "sensor_read_retries": Field((int,), required=False, minimum=0),
+    "max_sensor_age": Field(NUMBER, required=False, positive=True),
+    "execution_mode": Field((str,), required=False, choices=("threads", "asyncio")),
+    "csv_flush_rows": Field((int,), required=False, positive=True),
+    "csv_flush_interval": Field(NUMBER, required=False, minimum=0),
+    "csv_fsync": Field((bool,), required=False),
+    "history_file": Field((str,), required=False),
+    "history_flush_rows": Field((int,), required=False, positive=True),
+    "history_flush_interval": Field(NUMBER, required=False, minimum=0),
+    "history_horizon": Field(NUMBER, required=False, positive=True),
+    "rollup_resolutions": Field((list,), required=False, items=Field(NUMBER, positive=True)),
+    "rollup_file": Field((str,), required=False),
+    "emission_max_age": Field(NUMBER, required=False, positive=True),
+    "emission_deadbands": Field((dict,), required=False),
+    "display_fps": Field(NUMBER, required=False, positive=True),
+    "event_stats_interval": Field(NUMBER, required=False, positive=True),
+    "metrics_port": Field((int,), required=False, positive=True),
+    "metrics_host": Field((str,), required=False),
+    "profile_jobs": Field((list,), required=False, items=Field((str,))),
+    "profile_tracemalloc": Field((bool,), required=False),
+    "profile_dir": Field((str,), required=False),
+    "profile_interval": Field(NUMBER, required=False, positive=True),
+    "chambers": Field((list,), required=False, items=CHAMBER_SCHEMA),
+}
+
+
+# Typed, immutable view of config.json, defaults apply to keys that are left out. Components that read several keys
+# take one of these per cycle, so a reload can never hand them half old and half new values.
+class Settings(NamedTuple):
+    p: float = 1
+    i: float = 0
+    d: float = 0
+    target: float = 19.5
+    control_deadband: float = 0.15
+    average_filter: str = "sma"
+    average_window: int = 30
+    heating_limit: float = 40
+    limit_window: float = 10
+    control_interval: float = 15
+    csv_interval: float = 15
+    influxdb_interval: float = 15
+    sensor_interval: float = 1
+    config_interval: float = 60
+    bulk_read: bool = False
+    sensor_read_timeout: Optional[float] = None
+    sensor_read_retries: int = 0
+    max_sensor_age: Optional[float] = None
+    execution_mode: str = "threads"
+    csv_flush_rows: int = 1
+    csv_flush_interval: float = 0
+    csv_fsync: bool = False
+    history_file: Optional[str] = None
+    history_flush_rows: int = 1
+    history_flush_interval: float = 0
+    history_horizon: Optional[float] = None
+    rollup_resolutions: Tuple[float, ...] = ()
+    rollup_file: str = "rollup.csv"
+    emission_max_age: Optional[float] = None
+    emission_deadbands: Mapping[str, float] = MappingProxyType({})
+    display_fps: float = 2
+    event_stats_interval: float = 60
+    metrics_port: Optional[int] = None
+    metrics_host: str = "127.0.0.1"
+    profile_jobs: Tuple[str, ...] = ()
+    profile_tracemalloc: bool = False
+    profile_dir: str = "profiles"
+    profile_interval: float = 600
+    chambers: Tuple[Mapping[str, Any], ...] = ()
+
+
+def freeze(value):
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    return value
+
+
+def settings_from(config: Mapping[str, Any]) -> Settings:
+    return Settings(**{key: freeze(config[key]) for key in Settings._fields if config.get(key) is not None})
+
+
+def validate(config: Any, schema: Dict[str, Field]) -> List[str]:
+    if not isinstance(config, dict):
+        return ["expected an object, got %s" % type(config).__name__]
+    errors = []
+    for key, spec in schema.items():
+        if key not in config or config[key] is None:
+            if spec.required:
+                errors.append("%s is missing" % key)
+            continue
+        value = config[key]
+        # bool is an int to Python, but never a valid number here
+        if not isinstance(value, spec.types) or (isinstance(value, bool) and bool not in spec.types):
+            errors.append("%s should be %s, got %r" % (key, "/".join(t.__name__ for t in spec.types), value))
+        elif spec.minimum is not None and value < spec.minimum:
+            errors.append("%s should be at least %s, got %r" % (key, spec.minimum, value))
+        elif spec.positive and value <= 0:
+            errors.append("%s should be positive, got %r" % (key, value))
+        elif spec.choices is not None and value not in spec.choices:
+            errors.append("%s should be one of %s, got %r" % (key, ", ".join(map(str, spec.choices)), value))
+        elif isinstance(spec.items, Field):
+            for index, item in enumerate(value):
+                name = "%s[%d]" % (key, index)
+                errors += validate({name: item}, {name: spec.items})
+        elif spec.items is not None:
+            for index, item in enumerate(value):
+                errors += ["%s[%d]: %s" % (key, index, error) for error in validate(item, spec.items)]
+    return errors
 
 
 @dataclass
-class Config(Runnable):
+class Config(AsyncRunnable):
     filename: str
+    schema: Optional[Dict[str, Field]] = None
 
     def __post_init__(self) -> None:
-        self.__load()
+        self.logger = logging.getLogger(__name__)
+        self.lock = Lock()
+        # the watcher thread and run() both reload, one at a time so a change is compared and announced only once
+        self.reload_lock = Lock()
+        self.digest = None
+        self.rejected = None
+        self.watcher = None
+        self.subscriptions: List[Tuple[Tuple[str, ...], Callable[[Settings], None]]] = []
+
+        # a broken config at startup can't fall back on anything
+        errors = self.__load()
+        if errors:
+            raise ValueError("Invalid config %s: %s" % (self.filename, "; ".join(errors)))
 
     def run(self) -> None:
-        self.__load()
+        # fallback for missed or unsupported change notifications, a small read that only gets parsed on a change
+        self.__reload()
 
     def shutdown(self) -> None:
-        pass
+        if self.watcher is not None:
+            self.watcher.close()
 
     def get(self, key: str):
         return self.config.get(key)
 
-    def __load(self) -> None:
+    def get_settings(self) -> Settings:
+        return self.settings
+
+    def subscribe(self, keys: Iterable[str], callback: Callable[[Settings], None]) -> None:
+        # called right away with the current settings, then from whichever thread reloads whenever one of keys changes
+        keys = tuple(keys)
+        for key in keys:
+            if key not in Settings._fields:
+                raise ValueError("Can't subscribe to unknown setting %s" % key)
+        with self.lock:
+            self.subscriptions.append((keys, callback))
+            settings = self.settings
+        callback(settings)
+
+    def watch(self) -> None:
+        try:
+            self.watcher = FileWatcher(self.filename)
+        except OSError as e:
+            self.logger.warning("Can't watch %s, only checking it every run: %s", self.filename, e)
+            return
+        Thread(target=self.__watch, name="config-watcher", daemon=True).start()
+
+    def __watch(self) -> None:
+        try:
+            while self.watcher.wait():
+                self.__reload()
+        finally:
+            self.watcher.release()
+
+    def __reload(self) -> None:
+        with self.reload_lock:
+            previous = self.settings
+            try:
+                errors = self.__load()
+            except (OSError, ValueError) as e:
+                errors = [str(e)]
+            if errors:
+                self.logger.error("Keeping the previous config, %s is invalid: %s", self.filename, "; ".join(errors))
+                return
+
+            settings = self.settings
+            if settings is previous:
+                return
+            with self.lock:
+                subscriptions = list(self.subscriptions)
+            for keys, callback in subscriptions:
+                if any(getattr(previous, key) != getattr(settings, key) for key in keys):
+                    try:
+                        callback(settings)
+                    except Exception:
+                        self.logger.exception("Config subscriber %s failed", callback)
+
+    def __load(self) -> List[str]:
+        with self.lock:
+            raw = self.__read()
+            digest = hashlib.sha1(raw.encode()).digest()
+            # unchanged, or broken in a way that was already reported
+            if digest == self.digest or digest == self.rejected:
+                return []
+
+            self.rejected = digest
+            config = json.loads(raw)
+            errors = validate(config, self.schema) if self.schema is not None else []
+            if errors:
+                return errors
+
+            # readers on other lanes either see the old or the new mapping, never a partial one
+            self.config = MappingProxyType(config)
+            self.settings = settings_from(config)
+            if self.digest is not None:
+                self.logger.info("Reloaded %s", self.filename)
+            self.digest = digest
+            self.rejected = None
+            return []
+
+    def __read(self) -> str:
         with open(self.filename, 'r') as config_raw:
-            self.config = json.load(config_raw)
+            return config_raw.read()
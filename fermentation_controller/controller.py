@@ -1,27 +1,31 @@
 import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Iterable
+from typing import Iterable, Optional
 
 from simple_pid import PID
 
-from .config import Config
-from .runnable import Runnable
+from . import clock
+from .config import Config, Settings
+from .runnable import AsyncRunnable
 from .sensor import Sensor
 from .switch import Switch
 
 
 class ControllerListener(ABC):
 
+    # timestamp is the clock time the terms were computed at, None when they're handled right away
     @abstractmethod
-    def handle_controller(self, p: float, i: float, d: float, control: float) -> None:
+    def handle_controller(self, name: str, p: float, i: float, d: float, control: float,
+                          timestamp: Optional[float] = None) -> None:
         pass
 
 
 @dataclass
-class Controller(Runnable):
+class Controller(AsyncRunnable):
     config: Config
-    sample_time: int
+    # what the scheduler runs it at, the PID takes the actual time between runs from the clock
+    interval: float
     threshold: float
     heater: Switch
     cooler: Switch
@@ -29,13 +33,18 @@ class Controller(Runnable):
     current_temp: Sensor
     fridge_temp: Sensor
     listeners: Iterable[ControllerListener]
+    # the chamber it controls, empty for a single chamber
+    name: str = ""
 
     def __post_init__(self) -> None:
-        self.pid = PID(Kp=self.config.get("p"),
-                       Ki=self.config.get("i"),
-                       Kd=self.config.get("d"),
-                       setpoint=self.config.get("target"),
-                       sample_time=self.sample_time)
+        settings = self.config.get_settings()
+        self.pid = PID(Kp=settings.p,
+                       Ki=settings.i,
+                       Kd=settings.d,
+                       setpoint=settings.target,
+                       # a run that fires a few ms early must still compute, a sample_time gate would skip it
+                       sample_time=None,
+                       time_fn=clock.monotonic)
 
         self.logger = logging.getLogger(__name__)
 
@@ -46,35 +55,58 @@ class Controller(Runnable):
         self.logger.info("Shutting down controller")
 
     def control(self) -> None:
-        self.__update_tunings()
+        # one snapshot for the whole cycle, a reload halfway through can't mix old and new values
+        settings = self.config.get_settings()
 
-        control = self.pid(self.current_temp.get_average())
+        if self.__sensors_stale(settings):
+            self.__fail_safe()
+            return
+
+        self.__update_tunings(settings)
+
+        control = self.pid(self.current_temp.get_filtered())
         (p, i, d) = self.pid.components
 
         self.logger.debug("Received control value %s, pid values: %s %s %s", control, p, i, d)
         self.__publish(p, i, d, control)
 
-        if self.__limit():
+        if self.__limit(settings):
             return
 
         self.__control_switches(control)
 
     def __publish(self, p: float, i: float, d: float, control: float) -> None:
         for l in self.listeners:
-            l.handle_controller(p, i, d, control)
+            l.handle_controller(self.name, p, i, d, control)
 
-    def __update_tunings(self) -> None:
-        p = self.config.get("p")
-        i = self.config.get("i")
-        d = self.config.get("d")
+    def __update_tunings(self, settings: Settings) -> None:
+        p, i, d = settings.p, settings.i, settings.d
         cur_p, cur_i, cur_d = self.pid.tunings
         if p != cur_p or i != cur_i or d != cur_d:
             self.logger.info("Setting PID values to %s, %s, %s.", p, i, d)
             self.pid.tunings = (p, i, d)
 
-    def __limit(self) -> bool:
-        heating_limit = self.config.get("heating_limit")
-        limit_window = self.config.get("limit_window")
+    def __sensors_stale(self, settings: Settings) -> bool:
+        max_age = settings.max_sensor_age
+        if max_age is None:
+            return False
+
+        for sensor in (self.current_temp, self.fridge_temp):
+            age = sensor.get_age()
+            if age > max_age:
+                self.logger.warning("Reading of sensor '%s' is %.0fs old, switching to fail safe", sensor.name, age)
+                return True
+        return False
+
+    def __fail_safe(self) -> None:
+        if self.heater.get():
+            self.heater.set(False)
+        if self.cooler.get():
+            self.cooler.set(False)
+
+    def __limit(self, settings: Settings) -> bool:
+        heating_limit = settings.heating_limit
+        limit_window = settings.limit_window
 
         if self.limiter.get():
             if self.fridge_temp.get() < (heating_limit - limit_window):
@@ -1,20 +1,40 @@
 import csv
+import io
 import logging
-import time
 from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional
 
+from . import clock, metrics
 from .data_collector import DataCollector
-from .runnable import Runnable
+from .emission import Emission
+from .rollup import RollupListener, Stats
+from .rotating_file import RotatingFile
+from .runnable import AsyncRunnable
+
+
+def format_rows(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
 
 
 @dataclass
-class CsvWriter(Runnable):
+class CsvWriter(AsyncRunnable):
     collector: DataCollector
+    filename: str = 'data.csv'
+    flush_rows: int = 1
+    flush_interval: float = 0
+    fsync: bool = False
+    emission: Optional[Emission] = None
 
     def __post_init__(self) -> None:
         self.logger = logging.getLogger(__name__)
-        self.file = open('data.csv', 'a', newline='')
-        self.writer = csv.writer(self.file)
+        # alphabetic, like the logs written before there was a header
+        self.fields = sorted(self.collector.valid_fields)
+        self.file = RotatingFile(self.filename, format_rows([["time"] + self.fields]), self.fsync)
+        self.rows = []
+        self.last_flush = clock.monotonic()
 
     def run(self) -> None:
         data = self.collector.get_data_map()
@@ -22,9 +42,55 @@ class CsvWriter(Runnable):
             self.logger.warning("No data was collected, skipping CSV write")
             return
 
-        # writes fields in alphabetic order, prefixed with a timestamp
-        self.writer.writerow([time.time()] + [v for k, v in sorted(data.items())])
-        self.file.flush()
+        # fields that weren't emitted are left empty, readers carry the previous value forward
+        if self.emission is not None:
+            data = self.emission.select(data)
+        if data:
+            self.rows.append([clock.time()] + [data.get(name, "") for name in self.fields])
+        if len(self.rows) >= self.flush_rows or clock.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self.last_flush = clock.monotonic()
+        if not self.rows:
+            return
+
+        with metrics.sink_write("csv"):
+            self.file.write(format_rows(self.rows))
+        self.rows = []
+
+    def shutdown(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+@dataclass
+class RollupCsvWriter(AsyncRunnable, RollupListener):
+    fields: List[str]
+    filename: str = 'rollup.csv'
+    fsync: bool = False
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        columns = ["time", "resolution"] + ["%s_%s" % (name, stat) for name in self.fields for stat in Stats._fields]
+        self.file = RotatingFile(self.filename, format_rows([columns]), self.fsync)
+        self.lock = Lock()
+        self.rows = []
+
+    def handle_rollup(self, resolution: float, start: float, stats: Dict[str, Stats]) -> None:
+        row = [start, resolution]
+        for name in self.fields:
+            row += stats[name] if name in stats else [""] * len(Stats._fields)
+        with self.lock:
+            self.rows.append(row)
+
+    def run(self) -> None:
+        with self.lock:
+            rows, self.rows = self.rows, []
+        if rows:
+            with metrics.sink_write("rollup_csv"):
+                self.file.write(format_rows(rows))
 
     def shutdown(self) -> None:
+        self.run()
         self.file.close()
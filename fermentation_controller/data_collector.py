@@ -1,45 +1,102 @@
 import logging
-from dataclasses import dataclass
-from typing import List
+import math
+from dataclasses import dataclass, field
+from threading import Lock
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Optional
 
+from . import clock
+from .chamber import field_name
 from .controller import ControllerListener
+from .ring_buffer import RingBuffer
 from .sensor import SensorListener
 from .switch import SwitchListener
 
 
+class Snapshot(NamedTuple):
+    version: int
+    values: Mapping[str, float]
+    updated: Mapping[str, float]
+
+
 @dataclass
 class DataCollector(SensorListener, SwitchListener, ControllerListener):
     sensor_names: List[str]
     switch_names: List[str]
+    horizon: Optional[float] = None
+    sample_interval: float = 1
+    # chambers whose controller terms are collected
+    controllers: List[str] = field(default_factory=lambda: [""])
 
     def __post_init__(self) -> None:
         self.logger = logging.getLogger(__name__)
         self.valid_fields = \
             list(map(lambda name: name + "_avg", self.sensor_names)) + \
             self.sensor_names + self.switch_names + \
-            ['p', 'i', 'd', 'control']
+            [field_name(controller, name) for controller in self.controllers for name in ['p', 'i', 'd', 'control']]
+        self.field_set = frozenset(self.valid_fields)
+        self.ignored = set()
+
+        # listeners are called from every lane while the sinks read, everything below is guarded by the lock
+        self.lock = Lock()
         self.data = {}
+        self.updated = {}
+        self.version = 0
+        self.snapshot = None
+
+        # only kept when history_horizon is configured, it costs memory for every field and only a consumer reading
+        # get_history needs it. No field is updated more often than the sensors, so this bounds it for the whole horizon
+        self.history = {}
+        if self.horizon:
+            capacity = math.ceil(self.horizon / self.sample_interval)
+            self.history = {name: RingBuffer(capacity) for name in self.valid_fields}
+            self.logger.info("Keeping %ss of history, %s bytes", self.horizon,
+                             sum(buffer.nbytes() for buffer in self.history.values()))
 
-    def handle_switch(self, name: str, on: bool) -> None:
+    def handle_switch(self, name: str, on: bool, timestamp: Optional[float] = None) -> None:
         if self.__is_valid_field(name):
-            self.data[name] = int(on)
+            self.__set({name: int(on)}, timestamp)
 
-    def handle_temperature(self, name: str, temperature: float, avg_temperature: float) -> None:
+    def handle_temperature(self, name: str, temperature: float, avg_temperature: float,
+                           timestamp: Optional[float] = None) -> None:
         if self.__is_valid_field(name):
-            self.data[name] = temperature
-            self.data[name + "_avg"] = avg_temperature
+            self.__set({name: temperature, name + "_avg": avg_temperature}, timestamp)
+
+    def handle_controller(self, name: str, p: float, i: float, d: float, control: float,
+                          timestamp: Optional[float] = None) -> None:
+        if self.__is_valid_field(field_name(name, 'p')):
+            self.__set({field_name(name, 'p'): p, field_name(name, 'i'): i, field_name(name, 'd'): d,
+                        field_name(name, 'control'): control}, timestamp)
+
+    def get_snapshot(self) -> Snapshot:
+        # copied at most once per update, sinks reading the same version share it
+        with self.lock:
+            if self.snapshot is None or self.snapshot.version != self.version:
+                self.snapshot = Snapshot(self.version, MappingProxyType(dict(self.data)),
+                                         MappingProxyType(dict(self.updated)))
+            return self.snapshot
+
+    def get_data_map(self) -> Optional[Mapping[str, float]]:
+        snapshot = self.get_snapshot()
+        return None if len(snapshot.values) != len(self.valid_fields) else snapshot.values
 
-    def handle_controller(self, p: float, i: float, d: float, control: float) -> None:
-        self.data['p'] = p
-        self.data['i'] = i
-        self.data['d'] = d
-        self.data['control'] = control
+    def get_history(self, name: str) -> Optional[RingBuffer]:
+        return self.history.get(name)
 
-    def get_data_map(self):
-        return None if len(self.data) != len(self.valid_fields) else self.data
+    def __set(self, values: Mapping[str, float], timestamp: Optional[float]) -> None:
+        now = clock.time() if timestamp is None else timestamp
+        with self.lock:
+            for name, value in values.items():
+                self.data[name] = value
+                self.updated[name] = now
+                if self.history:
+                    self.history[name].append(now, value)
+            self.version += 1
 
     def __is_valid_field(self, name) -> bool:
-        if name not in self.valid_fields:
-            self.logger.warning("Ignoring field %s, not configured!", name)
+        if name not in self.field_set:
+            if name not in self.ignored:
+                self.ignored.add(name)
+                self.logger.warning("Ignoring field %s, not configured!", name)
             return False
         return True
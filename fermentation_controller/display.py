@@ -2,17 +2,39 @@ import logging
 from dataclasses import dataclass
 from math import floor
 from threading import Lock
-from typing import List
+from typing import List, Optional, Tuple
 
 from RPLCD import CharLCD
 from RPi import GPIO
 
+from .chamber import split_field
+from .runnable import AsyncRunnable
 from .sensor import SensorListener
 from .switch import SwitchListener
 
 
+COLS = 16
+ROWS = 2
+# rewriting an unchanged character costs about as much as moving the cursor past it
+MAX_GAP = 1
+
+
+def changed_runs(current: str, text: str) -> List[Tuple[int, int]]:
+    runs = []
+    for index, (old, new) in enumerate(zip(current, text)):
+        if old == new:
+            continue
+        if runs and index - runs[-1][1] <= MAX_GAP:
+            runs[-1] = (runs[-1][0], index + 1)
+        else:
+            runs.append((index, index + 1))
+    return runs
+
+
+# Listeners only draw into an in-memory frame and return, run() sends whatever changed since the last frame to the
+# panel. Scheduled at the frame rate on a lane of its own, a slow HD44780 never holds up a sensor or a switch.
 @dataclass
-class Display(SensorListener, SwitchListener):
+class Display(AsyncRunnable, SensorListener, SwitchListener):
     sensor_names: List[str]
     switch_names: List[str]
 
@@ -21,38 +43,66 @@ class Display(SensorListener, SwitchListener):
 
         self.logger.info("Initiating LCD")
         # Use compatibility mode to avoid driver timing issues https://github.com/dbrgn/RPLCD/issues/70
-        self.lcd = CharLCD(compat_mode=True, numbering_mode=GPIO.BCM, cols=16, rows=2, pin_rs=22, pin_e=17,
+        self.lcd = CharLCD(compat_mode=True, numbering_mode=GPIO.BCM, cols=COLS, rows=ROWS, pin_rs=22, pin_e=17,
                            pins_data=[26, 19, 13, 6])
         self.lcd.cursor_mode = 'hide'
         self.lcd.clear()
 
-        self.write_lock = Lock()
+        # what the panel shows, so only characters that differ get sent; clear() leaves the cursor home
+        self.framebuffer = [" " * COLS for _ in range(ROWS)]
+        self.cursor: Optional[Tuple[int, int]] = (0, 0)
+        # what it should show next, updates in between frames overwrite each other
+        self.frame = list(self.framebuffer)
+        self.lock = Lock()
+        # other chambers share the listeners, only warn once about each of their fields
+        self.ignored = set()
 
-    def handle_switch(self, name: str, on: bool) -> None:
+    def handle_switch(self, name: str, on: bool, timestamp: Optional[float] = None) -> None:
         if name not in self.switch_names:
-            self.logger.warning("'%s' is not configured to be printed to lcd", name)
+            self.__ignore("'%s' is not configured to be printed to lcd", name)
             return
 
         x = floor(self.switch_names.index(name) / 2)
         y = self.switch_names.index(name) % 2
 
-        self.__write(14 + x, y, name[0].upper() if on else " ")
+        self.__draw(14 + x, y, split_field(name)[1][0].upper() if on else " ")
 
-    def handle_temperature(self, name: str, temperature: float, avg_temperature: float) -> None:
+    def handle_temperature(self, name: str, temperature: float, avg_temperature: float,
+                           timestamp: Optional[float] = None) -> None:
         if name not in self.sensor_names:
-            self.logger.warning("Device '%s' is not configured to be printed to LCD", name)
+            self.__ignore("Device '%s' is not configured to be printed to LCD", name)
             return
 
         y = floor(self.sensor_names.index(name) / 2)
         x = (self.sensor_names.index(name) - 2 * y) * 7
 
-        self.__write(x, y, "%s %s" % (name[0].upper(), round(temperature, 1)))
+        # padded to the width of the slot, a shorter value must not leave digits of the previous one behind
+        self.__draw(x, y, ("%s %s" % (split_field(name)[1][0].upper(), round(temperature, 1))).ljust(6))
+
+    def run(self) -> None:
+        with self.lock:
+            frame = list(self.frame)
+
+        for y, text in enumerate(frame):
+            for start, end in changed_runs(self.framebuffer[y], text):
+                self.logger.debug("Writing '%s' to LCD at (%s,%s)", text[start:end], start, y)
+                if self.cursor != (y, start):
+                    self.lcd.cursor_pos = (y, start)
+                self.lcd.write_string(text[start:end])
+                # the driver wraps to the next row after the last column, don't guess where it ends up
+                self.cursor = (y, end) if end < COLS else None
+            self.framebuffer[y] = text
+
+    def __ignore(self, message: str, name: str) -> None:
+        if name not in self.ignored:
+            self.ignored.add(name)
+            self.logger.warning(message, name)
 
-    def __write(self, x, y, text) -> None:
-        self.logger.debug("Writing '%s' to LCD at (%s,%s)", text, x, y)
-        with self.write_lock:
-            self.lcd.cursor_pos = (y, x)
-            self.lcd.write_string(text)
+    def __draw(self, x, y, text) -> None:
+        text = text[:COLS - x]
+        with self.lock:
+            row = self.frame[y]
+            self.frame[y] = row[:x] + text + row[x + len(text):]
 
     def shutdown(self) -> None:
         self.logger.info("Shutting down LCD")
@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+from typing import Dict, Mapping
+
+from . import clock
+from .chamber import split_field
+
+
+# Decides which fields a sink writes: a field is only emitted once it moved more than its deadband away from the
+# value last emitted, or when that is older than max_age. Each sink needs its own instance.
+@dataclass
+class Emission:
+    max_age: float
+    deadbands: Dict[str, float] = field(default_factory=dict)
+    default_deadband: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.emitted: Dict[str, float] = {}
+        self.emitted_at: Dict[str, float] = {}
+        self.resolved: Dict[str, float] = {}
+
+    def select(self, values: Mapping[str, float]) -> Dict[str, float]:
+        now = clock.monotonic()
+        selected = {}
+        for name, value in values.items():
+            last = self.emitted.get(name)
+            if last is None \
+                    or abs(value - last) > self.__deadband(name) \
+                    or now - self.emitted_at[name] >= self.max_age:
+                selected[name] = value
+                self.emitted[name] = value
+                self.emitted_at[name] = now
+        return selected
+
+    def __deadband(self, name: str) -> float:
+        # a chamber's field, like "fridge2.vessel", uses the deadband of "vessel" unless it has one of its own
+        deadband = self.resolved.get(name)
+        if deadband is None:
+            deadband = self.deadbands.get(name, self.deadbands.get(split_field(name)[1], self.default_deadband))
+            self.resolved[name] = deadband
+        return deadband
@@ -0,0 +1,203 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+from threading import Condition, Thread
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from . import clock
+from .controller import ControllerListener
+from .runnable import AsyncRunnable
+from .sensor import SensorListener
+from .switch import SwitchListener
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+# Events carry the clock time they were published at, consumers that keep time series use it rather than the time
+# they got around to handling the event.
+class TemperatureEvent(NamedTuple):
+    name: str
+    temperature: float
+    avg_temperature: float
+    timestamp: float
+
+    def deliver(self, listener: SensorListener) -> None:
+        listener.handle_temperature(self.name, self.temperature, self.avg_temperature, self.timestamp)
+
+
+class SwitchEvent(NamedTuple):
+    name: str
+    on: bool
+    timestamp: float
+
+    def deliver(self, listener: SwitchListener) -> None:
+        listener.handle_switch(self.name, self.on, self.timestamp)
+
+
+class ControllerEvent(NamedTuple):
+    name: str
+    p: float
+    i: float
+    d: float
+    control: float
+    timestamp: float
+
+    def deliver(self, listener: ControllerListener) -> None:
+        listener.handle_controller(self.name, self.p, self.i, self.d, self.control, self.timestamp)
+
+
+def stamp(timestamp: Optional[float]) -> float:
+    return clock.time() if timestamp is None else timestamp
+
+
+# a subscriber gets the events of every listener interface it implements
+LISTENER_TYPES = {TemperatureEvent: SensorListener, SwitchEvent: SwitchListener, ControllerEvent: ControllerListener}
+
+
+class SubscriberStats(NamedTuple):
+    name: str
+    depth: int
+    capacity: int
+    handled: int
+    dropped: int
+    # times a producer had to wait for room in the queue
+    blocked: int
+    mean_time: float
+    max_time: float
+
+
+# A bounded queue in front of one listener, drained by a thread of its own. When it's full, DROP_OLDEST discards the
+# oldest event to make room, for consumers that only care about the latest state. BLOCK makes the producer wait, for
+# consumers that must see every event.
+@dataclass
+class Subscription:
+    listener: Any
+    capacity: int
+    policy: str = BLOCK
+    name: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError("Unknown overflow policy %s" % self.policy)
+        self.logger = logging.getLogger(__name__)
+        self.name = self.name or type(self.listener).__name__
+        self.types = tuple(event for event, interface in LISTENER_TYPES.items() if isinstance(self.listener, interface))
+        self.condition = Condition()
+        self.queue = deque()
+        self.closed = False
+        self.handled = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.thread = Thread(target=self.__work, name="events-" + self.name, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def put(self, event) -> None:
+        with self.condition:
+            if len(self.queue) >= self.capacity:
+                if self.policy == DROP_OLDEST:
+                    self.queue.popleft()
+                    self.dropped += 1
+                else:
+                    self.blocked += 1
+                    while len(self.queue) >= self.capacity and not self.closed:
+                        self.condition.wait()
+            if self.closed:
+                return
+            self.queue.append(event)
+            self.condition.notify_all()
+
+    def close(self) -> None:
+        # events that are already queued still get handled, the thread ends once they're gone
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+    def stats(self) -> SubscriberStats:
+        with self.condition:
+            mean_time = self.total_time / self.handled if self.handled else 0.0
+            return SubscriberStats(self.name, len(self.queue), self.capacity, self.handled, self.dropped, self.blocked,
+                                   mean_time, self.max_time)
+
+    def __work(self) -> None:
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                event = self.queue.popleft()
+                self.condition.notify_all()
+
+            started = clock.monotonic()
+            try:
+                event.deliver(self.listener)
+            except Exception:
+                self.logger.exception("%s failed to handle %s", self.name, event)
+            duration = clock.monotonic() - started
+
+            with self.condition:
+                self.handled += 1
+                self.total_time += duration
+                self.max_time = max(self.max_time, duration)
+
+
+# Stands in for the listeners of sensors, switches and the controller, so publishing only costs a queue append per
+# subscriber and a slow consumer no longer holds up the producer, or the other consumers. run() reports consumers that
+# fall behind.
+@dataclass
+class EventBus(AsyncRunnable, SensorListener, SwitchListener, ControllerListener):
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.subscriptions: List[Subscription] = []
+        self.routes: Dict[type, Tuple[Subscription, ...]] = {event: () for event in LISTENER_TYPES}
+        self.reported_drops: Dict[str, int] = {}
+
+    def subscribe(self, listener, capacity: int = 64, policy: str = BLOCK, name: Optional[str] = None) -> Subscription:
+        subscription = Subscription(listener, capacity, policy, name)
+        if not subscription.types:
+            raise ValueError("%s doesn't listen to any events" % subscription.name)
+
+        subscription.start()
+        self.subscriptions.append(subscription)
+        for event in subscription.types:
+            self.routes[event] += (subscription,)
+        return subscription
+
+    def publish(self, event) -> None:
+        for subscription in self.routes[type(event)]:
+            subscription.put(event)
+
+    def handle_temperature(self, name: str, temperature: float, avg_temperature: float,
+                           timestamp: Optional[float] = None) -> None:
+        self.publish(TemperatureEvent(name, temperature, avg_temperature, stamp(timestamp)))
+
+    def handle_switch(self, name: str, on: bool, timestamp: Optional[float] = None) -> None:
+        self.publish(SwitchEvent(name, on, stamp(timestamp)))
+
+    def handle_controller(self, name: str, p: float, i: float, d: float, control: float,
+                          timestamp: Optional[float] = None) -> None:
+        self.publish(ControllerEvent(name, p, i, d, control, stamp(timestamp)))
+
+    def stats(self) -> List[SubscriberStats]:
+        return [subscription.stats() for subscription in self.subscriptions]
+
+    def run(self) -> None:
+        for stats in self.stats():
+            dropped = stats.dropped - self.reported_drops.get(stats.name, 0)
+            self.reported_drops[stats.name] = stats.dropped
+            if dropped:
+                self.logger.warning("%s is falling behind, dropped %s event(s)", stats.name, dropped)
+            self.logger.debug("%s: %s/%s queued, %s handled, %s blocked, %.3fms mean, %.3fms max",
+                              stats.name, stats.depth, stats.capacity, stats.handled, stats.blocked,
+                              stats.mean_time * 1000, stats.max_time * 1000)
+
+    def shutdown(self) -> None:
+        for subscription in self.subscriptions:
+            subscription.close()
@@ -0,0 +1,134 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import dataclass
+
+
+class Filter(ABC):
+
+    @abstractmethod
+    def update(self, value: float) -> float:
+        pass
+
+    @abstractmethod
+    def get(self) -> float:
+        pass
+
+    @abstractmethod
+    def resize(self, window: int) -> None:
+        pass
+
+    @abstractmethod
+    def is_empty(self) -> bool:
+        pass
+
+
+@dataclass
+class MovingAverage(Filter):
+    window: int
+
+    def __post_init__(self) -> None:
+        self.data = deque([], self.window)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value: float) -> float:
+        if len(self.data) == self.window:
+            self.total -= self.data[0]
+        self.data.append(value)
+        self.total += value
+
+        # re-sum once per window so rounding errors of the running sum can't accumulate
+        self.updates += 1
+        if self.updates >= self.window:
+            self.updates = 0
+            self.total = sum(self.data)
+
+        return self.get()
+
+    def get(self) -> float:
+        return self.total / len(self.data) if self.data else 0.0
+
+    def resize(self, window: int) -> None:
+        if window == self.window:
+            return
+        self.window = window
+        self.data = deque(self.data, window)
+        self.total = sum(self.data)
+
+    def is_empty(self) -> bool:
+        return not self.data
+
+
+@dataclass
+class ExponentialAverage(Filter):
+    window: int
+
+    def __post_init__(self) -> None:
+        self.alpha = 2 / (self.window + 1)
+        self.value = None
+
+    def update(self, value: float) -> float:
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def get(self) -> float:
+        return 0.0 if self.value is None else self.value
+
+    def resize(self, window: int) -> None:
+        self.window = window
+        self.alpha = 2 / (window + 1)
+
+    def is_empty(self) -> bool:
+        return self.value is None
+
+
+@dataclass
+class MovingMedian(Filter):
+    window: int
+
+    def __post_init__(self) -> None:
+        self.data = deque([], self.window)
+        self.ordered = []
+
+    def update(self, value: float) -> float:
+        if len(self.data) == self.window:
+            del self.ordered[bisect_left(self.ordered, self.data[0])]
+        self.data.append(value)
+        insort(self.ordered, value)
+        return self.get()
+
+    def get(self) -> float:
+        size = len(self.ordered)
+        if size == 0:
+            return 0.0
+        middle = size // 2
+        if size % 2:
+            return self.ordered[middle]
+        return (self.ordered[middle - 1] + self.ordered[middle]) / 2
+
+    def resize(self, window: int) -> None:
+        if window == self.window:
+            return
+        self.window = window
+        self.data = deque(self.data, window)
+        self.ordered = sorted(self.data)
+
+    def is_empty(self) -> bool:
+        return not self.data
+
+
+FILTERS = {
+    "sma": MovingAverage,
+    "ema": ExponentialAverage,
+    "median": MovingMedian,
+}
+
+
+def create_filter(kind: str, window: int) -> Filter:
+    if kind not in FILTERS:
+        raise ValueError("Unknown filter '%s', expected one of %s" % (kind, ", ".join(FILTERS)))
+    return FILTERS[kind](window)
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+from . import clock, metrics
+from .data_collector import DataCollector
+from .rotating_file import RotatingFile
+from .runnable import AsyncRunnable
+
+# A history file is MAGIC, the header length as a little endian uint32, a JSON header listing every column as
+# [name, NumPy type], then packed fixed width records. The column list doubles as a NumPy structured dtype.
+MAGIC = b"FCHIST1\n"
+LENGTH = struct.Struct("<I")
+STRUCT_CODES = {"<f8": "d", "<f4": "f", "|u1": "B"}
+
+
+def columns_for(collector: DataCollector) -> List[Tuple[str, str]]:
+    def column_type(name: str) -> str:
+        # temperatures don't need more than a float's 7 digits, switches are 0 or 1, the PID terms get a double
+        if name in collector.switch_names:
+            return "|u1"
+        if name in collector.sensor_names or name[:-len("_avg")] in collector.sensor_names:
+            return "<f4"
+        return "<f8"
+
+    return [("time", "<f8")] + [(name, column_type(name)) for name in collector.valid_fields]
+
+
+def encode_header(columns: List[Tuple[str, str]]) -> bytes:
+    header = json.dumps({"columns": columns}).encode()
+    return MAGIC + LENGTH.pack(len(header)) + header
+
+
+def read_header(file: BinaryIO) -> Tuple[List[Tuple[str, str]], int]:
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a history file: %s" % getattr(file, "name", file))
+    length, = LENGTH.unpack(file.read(LENGTH.size))
+    columns = [tuple(column) for column in json.loads(file.read(length))["columns"]]
+    return columns, len(MAGIC) + LENGTH.size + length
+
+
+def load(filename: str):
+    # NumPy only gets imported by readers, the writer runs on the Pi
+    import numpy as np
+
+    with open(filename, "rb") as file:
+        columns, offset = read_header(file)
+    dtype = np.dtype(columns)
+    # a record that got cut off by a crash is left out
+    count = (os.path.getsize(filename) - offset) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+
+def read_rows(filenames: Iterable[str]) -> Iterator[Dict[str, float]]:
+    for filename in filenames:
+        records = load(filename)
+        names = records.dtype.names
+        for record in records.tolist():
+            yield dict(zip(names, record))
+
+
+@dataclass
+class HistoryWriter(AsyncRunnable):
+    collector: DataCollector
+    filename: str = 'data.bin'
+    flush_rows: int = 1
+    flush_interval: float = 0
+    fsync: bool = False
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        columns = columns_for(self.collector)
+        self.fields = [name for name, _ in columns[1:]]
+        self.record = struct.Struct("<" + "".join(STRUCT_CODES[kind] for _, kind in columns))
+        # records can't be appended to a file that describes different fields, one of those is moved aside
+        self.file = RotatingFile(self.filename, encode_header(columns), self.fsync)
+        self.buffer = bytearray()
+        self.rows = 0
+        self.last_flush = clock.monotonic()
+
+    def run(self) -> None:
+        data = self.collector.get_data_map()
+        if data is None:
+            self.logger.warning("No data was collected, skipping history write")
+            return
+
+        self.buffer += self.record.pack(clock.time(), *[data[name] for name in self.fields])
+        self.rows += 1
+        if self.rows >= self.flush_rows or clock.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self.last_flush = clock.monotonic()
+        if not self.buffer:
+            return
+
+        with metrics.sink_write("history"):
+            self.file.write(bytes(self.buffer))
+        self.buffer = bytearray()
+        self.rows = 0
+
+    def shutdown(self) -> None:
+        self.flush()
+        self.file.close()
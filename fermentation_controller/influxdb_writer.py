@@ -1,52 +1,121 @@
 import logging
-import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
 
+from . import clock, metrics
 from .config import Config
 from .data_collector import DataCollector
-from .runnable import Runnable
+from .emission import Emission
+from .line_protocol import LineProtocolEncoder
+from .rollup import RollupListener, Stats, label
+from .runnable import AsyncRunnable
+from .spool import Spool
 
 
 @dataclass
-class InfluxDBWriter(Runnable):
+class InfluxDBWriter(AsyncRunnable, RollupListener):
     secrets: Config
     collector: DataCollector
+    spool: Spool
+    emission: Optional[Emission] = None
 
     def __post_init__(self) -> None:
         self.logger = logging.getLogger(__name__)
-        self.client = InfluxDBClient(host=self.secrets.get("db_host"),
-                                     port=self.secrets.get("db_port"),
-                                     username=self.secrets.get("db_username"),
-                                     password=self.secrets.get("db_password"))
-        self.client.create_database(self.secrets.get("db_name"))
-        self.client.switch_database(self.secrets.get("db_name"))
 
-    def __create_json(self):
+        # "measurements" keeps the original layout of one measurement per field, "fields" writes a single point
+        self.encoder = LineProtocolEncoder(self.secrets.get("db_measurement") or "fermentation",
+                                           self.secrets.get("db_tags") or {"env": self.secrets.get("env")},
+                                           self.collector.valid_fields,
+                                           self.secrets.get("db_layout") or "measurements")
+
+    def run(self) -> None:
         data = self.collector.get_data_map()
         if data is None:
+            self.logger.warning("No data was collected, skipping InfluxDB write")
             return
 
-        current_time = int(time.time() * 1000000000)
-        data_json = []
-        for key in data:
-            construct_json = [{"measurement": key,
-                               "time": current_time,
-                               "tags": {"env": self.secrets.get("env")},
-                               "fields": {"value": float(data[key])}
-                               }]
-            data_json.append(construct_json)
-        return data_json
+        if self.emission is not None:
+            data = self.emission.select(data)
+            if not data:
+                return
+
+        # only a local append, the flusher takes care of the network
+        self.spool.append(self.encoder.encode(data, int(clock.time() * 1000000000)))
+
+    def handle_rollup(self, resolution: float, start: float, stats: Dict[str, Stats]) -> None:
+        self.spool.append(self.encoder.encode_rollup(label(resolution), stats, int(start * 1000000000)))
+
+    def shutdown(self) -> None:
+        pass
+
+
+@dataclass
+class InfluxDBFlusher(AsyncRunnable):
+    secrets: Config
+    spool: Spool
+
+    retry_at: float = field(default=0.0, init=False)
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.batch_size = self.secrets.get("db_batch_size") or 5000
+        self.min_backoff = self.secrets.get("db_min_backoff") or 15
+        self.max_backoff = self.secrets.get("db_max_backoff") or 900
+        self.backoff = self.min_backoff
+        self.database_ready = False
+
+        # one long-lived client keeps its HTTP session, so writes reuse the connection instead of reconnecting
+        self.client = InfluxDBClient(host=self.secrets.get("db_host"),
+                                     port=self.secrets.get("db_port"),
+                                     username=self.secrets.get("db_username"),
+                                     password=self.secrets.get("db_password"),
+                                     timeout=self.secrets.get("db_timeout") or 5,
+                                     retries=self.secrets.get("db_retries") or 1,
+                                     gzip=self.secrets.get("db_gzip") is not False,
+                                     pool_size=1)
 
     def run(self) -> None:
-        data = self.__create_json()
-        if data is None:
-            self.logger.warning("No data was collected, skipping InfluxDB write")
+        if clock.monotonic() < self.retry_at:
+            return
+
+        try:
+            self.flush()
+        except Exception as e:
+            self.retry_at = clock.monotonic() + self.backoff
+            self.logger.warning("Writing to InfluxDB failed, %s bytes spooled, retrying in %ss: %s",
+                                self.spool.pending_bytes(), self.backoff, e)
+            self.backoff = min(self.backoff * 2, self.max_backoff)
             return
 
-        for measurement in data:
-            self.client.write_points(measurement)
+        self.backoff = self.min_backoff
+
+    def flush(self) -> None:
+        if not self.database_ready:
+            self.client.create_database(self.secrets.get("db_name"))
+            self.client.switch_database(self.secrets.get("db_name"))
+            self.database_ready = True
+
+        while True:
+            records, end = self.spool.read(self.batch_size)
+            if not records:
+                return
+            try:
+                with metrics.sink_write("influxdb"):
+                    self.client.write_points(records, protocol="line")
+            except InfluxDBClientError as e:
+                # the server rejected the data itself, retrying would block everything spooled behind it
+                if e.code != 400:
+                    raise
+                self.logger.error("InfluxDB rejected %s spooled points, dropping them: %s", len(records), e)
+            self.spool.commit(end)
 
     def shutdown(self) -> None:
-        pass
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.warning("Final InfluxDB flush failed, %s bytes stay spooled: %s", self.spool.pending_bytes(), e)
+        self.client.close()
+        self.spool.close()
@@ -0,0 +1,79 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+EVENT = struct.Struct("iIII")
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(_libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+    return _libc
+
+
+# Blocks until a file is written or replaced, using inotify on its directory so editors that save by renaming a
+# temporary file over it are noticed too. close() wakes up a waiting thread through a pipe.
+@dataclass
+class FileWatcher:
+    path: str
+
+    def __post_init__(self) -> None:
+        libc = _load_libc()
+        self.name = os.path.basename(self.path).encode()
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        directory = os.path.dirname(os.path.abspath(self.path)).encode()
+        if libc.inotify_add_watch(self.fd, directory, IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, os.strerror(error), self.path)
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        self.closed = False
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # True once the file changed, False on close() or timeout
+        while not self.closed:
+            readable, _, _ = select.select([self.fd, self.wakeup_read], [], [], timeout)
+            if not readable or self.wakeup_read in readable:
+                return False
+            if self.__changed():
+                return True
+        return False
+
+    def close(self) -> None:
+        self.closed = True
+        os.write(self.wakeup_write, b"\0")
+
+    def release(self) -> None:
+        for fd in (self.fd, self.wakeup_read, self.wakeup_write):
+            os.close(fd)
+
+    def __changed(self) -> bool:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        changed = False
+        offset = 0
+        while offset + EVENT.size <= len(data):
+            _, _, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+            changed = changed or name == self.name
+            offset += EVENT.size + length
+        return changed
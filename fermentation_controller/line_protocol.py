@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from math import isfinite
+from typing import Dict, List, Mapping, Sequence
+
+from .chamber import split_field
+
+
+def escape_measurement(name: str) -> str:
+    return name.replace("\\", "\\\\").replace(",", "\\,").replace(" ", "\\ ").replace("\n", "\\n")
+
+
+def escape_key(key: str) -> str:
+    return escape_measurement(key).replace("=", "\\=")
+
+
+# Renders collector snapshots straight to InfluxDB line protocol. Everything but the values and the timestamp is
+# escaped and concatenated once up front, so encoding an interval is a handful of string joins.
+@dataclass
+class LineProtocolEncoder:
+    measurement: str
+    tags: Dict[str, str]
+    fields: List[str]
+    layout: str = "measurements"
+
+    def __post_init__(self) -> None:
+        tags = "".join(",%s=%s" % (escape_key(key), escape_key(str(value))) for key, value in sorted(self.tags.items()))
+        self.tags_prefix = tags
+        if self.layout == "fields":
+            self.prefix = escape_measurement(self.measurement) + tags + " "
+            self.templates = [(name, escape_key(name) + "=") for name in self.fields]
+        else:
+            self.templates = [(name, self.__series(name) + " value=") for name in self.fields]
+
+    def encode(self, values: Mapping[str, float], timestamp: int) -> List[str]:
+        suffix = " %d" % timestamp
+        if self.layout == "fields":
+            fields = ",".join(template + repr(float(values[name]))
+                              for name, template in self.templates if name in values and isfinite(values[name]))
+            return [self.prefix + fields + suffix] if fields else []
+
+        return [template + repr(float(values[name])) + suffix
+                for name, template in self.templates if name in values and isfinite(values[name])]
+
+    def encode_rollup(self, rollup: str, stats: Mapping[str, Sequence[float]], timestamp: int) -> List[str]:
+        # stats are (min, max, mean, count), tagged with the rollup so they never mix with the raw series
+        tags = self.tags_prefix + ",rollup=" + escape_key(rollup)
+        suffix = " %d" % timestamp
+        fields = []
+        for name in self.fields:
+            if name not in stats:
+                continue
+            minimum, maximum, mean, count = stats[name]
+            prefix = escape_key(name) + "_" if self.layout == "fields" else ""
+            fields.append("{0}min={1!r},{0}max={2!r},{0}mean={3!r},{0}count={4}i"
+                          .format(prefix, float(minimum), float(maximum), float(mean), count))
+
+        if self.layout == "fields":
+            return [escape_measurement(self.measurement) + tags + " " + ",".join(fields) + suffix] if fields else []
+        names = [name for name in self.fields if name in stats]
+        return [self.__series(name, ",rollup=" + escape_key(rollup)) + " " + values + suffix
+                for name, values in zip(names, fields)]
+
+    def __series(self, name: str, extra_tags: str = "") -> str:
+        # a chamber's fields go to the same measurements as those of the other chambers, tagged with the chamber
+        chamber, base = split_field(name)
+        if not chamber:
+            return escape_measurement(name) + self.tags_prefix + extra_tags
+        tags = dict(self.tags, chamber=chamber)
+        return escape_measurement(base) + "".join(",%s=%s" % (escape_key(key), escape_key(str(value)))
+                                                  for key, value in sorted(tags.items())) + extra_tags
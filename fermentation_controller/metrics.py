@@ -0,0 +1,259 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, Iterator, List, Tuple
+
+from . import clock
+
+# seconds, from a quick GPIO write up to a 1-Wire read that runs into its timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{%s}" % ",".join("%s=\"%s\"" % (name, escape_label(value)) for name, value in zip(names, values))
+
+
+# Metrics are updated from every lane and rendered from the HTTP server's thread. Children for a set of label values
+# are created on first use, callers on a hot path keep the child around rather than looking it up every time.
+@dataclass
+class Metric(ABC):
+    name: str
+    help: str
+    label_names: Tuple[str, ...] = ()
+
+    kind = "untyped"
+
+    def __post_init__(self) -> None:
+        self.label_names = tuple(self.label_names)
+        self.lock = Lock()
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values):
+        if len(values) != len(self.label_names):
+            raise ValueError("%s expects labels %s, got %s" % (self.name, self.label_names, values))
+        values = tuple(str(value) for value in values)
+        with self.lock:
+            child = self.children.get(values)
+            if child is None:
+                child = self.children[values] = self.create_child()
+            return child
+
+    @abstractmethod
+    def create_child(self):
+        pass
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        pass
+
+    def render(self) -> List[str]:
+        lines = ["# HELP %s %s" % (self.name, self.help.replace("\\", "\\\\").replace("\n", "\\n")),
+                 "# TYPE %s %s" % (self.name, self.kind)]
+        with self.lock:
+            lines += ["%s%s %s" % (name, labels, format_value(value)) for name, labels, value in self.samples()]
+        return lines
+
+
+class Value:
+
+    def __init__(self, lock: Lock) -> None:
+        self.lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self.lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        with self.lock:
+            self.value = value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def create_child(self) -> Value:
+        return Value(self.lock)
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for values, child in self.children.items():
+            yield self.name, format_labels(self.label_names, values), child.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Observations:
+
+    def __init__(self, lock: Lock, buckets: Tuple[float, ...]) -> None:
+        self.lock = lock
+        self.buckets = buckets
+        # per bucket, the last one is +Inf; made cumulative when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = clock.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(clock.monotonic() - started)
+
+
+@dataclass
+class Histogram(Metric):
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+
+    kind = "histogram"
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        self.buckets = tuple(sorted(self.buckets))
+
+    def create_child(self) -> Observations:
+        return Observations(self.lock, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for values, child in self.children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                yield (self.name + "_bucket", format_labels(self.label_names + ("le",), values + (format_value(bound),)),
+                       cumulative)
+            labels = format_labels(self.label_names, values)
+            yield self.name + "_sum", labels, child.sum
+            yield self.name + "_count", labels, child.count
+
+
+@dataclass
+class Registry:
+    metrics: Dict[str, Metric] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.lock = Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError("Metric %s is already registered" % metric.name)
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "".join(line + "\n" for metric in metrics for line in metric.render())
+
+
+# modules define their metrics once at import, like their loggers
+registry = Registry()
+
+
+def counter(name: str, help: str, label_names: Tuple[str, ...] = ()) -> Counter:
+    return registry.register(Counter(name, help, label_names))
+
+
+def gauge(name: str, help: str, label_names: Tuple[str, ...] = ()) -> Gauge:
+    return registry.register(Gauge(name, help, label_names))
+
+
+def histogram(name: str, help: str, label_names: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, help, label_names, buckets))
+
+
+SINK_WRITE_SECONDS = histogram("fermentation_sink_write_seconds", "Time taken by a sink to write out its data",
+                               ("sink",))
+SINK_ERRORS = counter("fermentation_sink_errors_total", "Writes of a sink that failed", ("sink",))
+
+
+@contextmanager
+def sink_write(sink: str):
+    with SINK_WRITE_SECONDS.labels(sink).time():
+        try:
+            yield
+        except Exception:
+            SINK_ERRORS.labels(sink).inc()
+            raise
+
+
+# Serves the registry as Prometheus text on /metrics, from a daemon thread so a slow scrape never holds up a lane
+@dataclass
+class MetricsServer:
+    port: int
+    host: str = "127.0.0.1"
+    registry: Registry = field(default_factory=lambda: registry)
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.server = ThreadingHTTPServer((self.host, self.port), self.__handler())
+        self.server.daemon_threads = True
+        self.thread = Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    def start(self) -> None:
+        self.logger.info("Serving metrics on http://%s:%s/metrics", self.host, self.server.server_port)
+        self.thread.start()
+
+    def shutdown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __handler(self):
+        metrics_registry = self.registry
+        logger = self.logger
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics_registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                logger.debug(format, *args)
+
+        return Handler
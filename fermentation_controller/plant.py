@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+
+
+# Two-node model of a fermentation chamber: the fridge air exchanges heat with the room and the vessel,
+# the heater and cooler act on the air, and the vessel only follows the air. Coefficients are per second.
+@dataclass
+class ThermalPlant:
+    environment: float = 20.0
+    fridge: float = 20.0
+    vessel: float = 20.0
+    room_loss: float = 1 / 7200
+    air_coupling: float = 1 / 1800
+    vessel_coupling: float = 1 / 14400
+    heater_power: float = 0.01
+    cooler_power: float = 0.02
+    max_step: float = 5.0
+
+    def step(self, seconds: float, heater: bool, cooler: bool) -> None:
+        while seconds > 0:
+            dt = min(seconds, self.max_step)
+            seconds -= dt
+
+            d_fridge = self.room_loss * (self.environment - self.fridge) + \
+                self.air_coupling * (self.vessel - self.fridge) + \
+                self.heater_power * heater - self.cooler_power * cooler
+            d_vessel = self.vessel_coupling * (self.fridge - self.vessel)
+
+            self.fridge += d_fridge * dt
+            self.vessel += d_vessel * dt
+
+    def temperature(self, name: str) -> float:
+        return getattr(self, name)
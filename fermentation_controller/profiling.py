@@ -0,0 +1,162 @@
+import cProfile
+import logging
+import os
+import re
+import time
+import tracemalloc
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, List
+
+from . import clock
+from .config import Config, Settings
+from .runnable import AsyncRunnable
+from .scheduler import Job
+
+TOP_ALLOCATIONS = 10
+# dumps kept of each job and of allocations, at the default profile_interval that's the last 4 hours
+KEEP_DUMPS = 24
+
+
+# cProfile of one job's runs. The scheduler runs the job through it while profiling is enabled, dump() swaps in a fresh
+# profile so every dump covers the runs since the previous one.
+class RunProfile:
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.profile = cProfile.Profile()
+        self.runs = 0
+
+    def run(self, function: Callable[[], None]) -> None:
+        with self.lock:
+            try:
+                self.profile.enable()
+            except ValueError:
+                # from Python 3.12 on only one profiler can be active at a time, a run that overlaps one of
+                # another profiled job goes unprofiled
+                function()
+                return
+            try:
+                function()
+            finally:
+                self.profile.disable()
+            self.runs += 1
+
+    def dump(self, filename: str) -> int:
+        with self.lock:
+            profile, self.profile = self.profile, cProfile.Profile()
+            runs, self.runs = self.runs, 0
+        if runs:
+            profile.dump_stats(filename)
+        return runs
+
+
+def file_name(job: Job) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", job.name).strip("_")
+
+
+# Profiles the jobs named in profile_jobs, either by job name like "Sensor('vessel')" or by class name like "Sensor",
+# and tracks allocations when profile_tracemalloc is set. Both follow config reloads, so a unit that misbehaves can be
+# looked at without restarting it. Dumps go to profile_dir every run, read them with pstats or snakeviz. Only the last
+# few of each are kept, profiling left enabled would fill the SD card otherwise.
+@dataclass
+class Profiler(AsyncRunnable):
+    config: Config
+    jobs: List[Job]
+    directory: str = "profiles"
+    keep: int = KEEP_DUMPS
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.lock = Lock()
+        self.tracing = False
+        self.started_tracing = False
+        self.snapshot = None
+        self.config.subscribe(["profile_jobs", "profile_tracemalloc"], self.__configure)
+
+    def run(self) -> None:
+        with self.lock:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(clock.time()))
+            for job in self.jobs:
+                if job.profile is not None:
+                    self.__dump(job, job.profile, stamp)
+            if self.tracing:
+                self.__dump_allocations(stamp)
+
+    def shutdown(self) -> None:
+        self.run()
+        with self.lock:
+            self.__stop_tracing()
+
+    def __configure(self, settings: Settings) -> None:
+        wanted = set(settings.profile_jobs)
+        with self.lock:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(clock.time()))
+            for job in self.jobs:
+                enabled = job.name in wanted or type(job.runnable).__name__ in wanted
+                if enabled and job.profile is None:
+                    self.logger.info("Profiling %s", job.name)
+                    job.profile = RunProfile()
+                elif not enabled and job.profile is not None:
+                    self.logger.info("Stopped profiling %s", job.name)
+                    profile, job.profile = job.profile, None
+                    self.__dump(job, profile, stamp)
+
+            if settings.profile_tracemalloc and not self.tracing:
+                self.__start_tracing()
+            elif not settings.profile_tracemalloc and self.tracing:
+                self.__dump_allocations(stamp)
+                self.__stop_tracing()
+
+    def __dump(self, job: Job, profile: RunProfile, stamp: str) -> None:
+        filename = os.path.join(self.directory, "%s-%s.prof" % (file_name(job), stamp))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            runs = profile.dump(filename)
+        except OSError as e:
+            self.logger.warning("Failed to write profile of %s: %s", job.name, e)
+            return
+        if runs:
+            self.logger.info("Wrote profile of %s runs of %s to %s", runs, job.name, filename)
+            self.__prune(file_name(job), ".prof")
+
+    def __start_tracing(self) -> None:
+        # someone else may be tracing already, e.g. PYTHONTRACEMALLOC, leave that running
+        self.tracing = True
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        self.logger.info("Tracking allocations")
+
+    def __stop_tracing(self) -> None:
+        if self.tracing and self.started_tracing:
+            tracemalloc.stop()
+        self.tracing = False
+        self.snapshot = None
+
+    def __dump_allocations(self, stamp: str) -> None:
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        filename = os.path.join(self.directory, "tracemalloc-%s.snapshot" % stamp)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            snapshot.dump(filename)
+        except OSError as e:
+            self.logger.warning("Failed to write allocation snapshot: %s", e)
+        else:
+            self.__prune("tracemalloc", ".snapshot")
+
+        # growth since the previous dump is what points at a leak, the snapshots hold the full picture
+        if self.snapshot is not None:
+            for stat in snapshot.compare_to(self.snapshot, "lineno")[:TOP_ALLOCATIONS]:
+                self.logger.info("Allocations: %s", stat)
+        self.snapshot = snapshot
+
+    def __prune(self, prefix: str, suffix: str) -> None:
+        # the stamps sort by time, and matching them keeps "Worker_vessel" from pruning the dumps of "Worker_vessel-2"
+        pattern = re.compile(re.escape(prefix) + r"-\d{8}-\d{6}" + re.escape(suffix))
+        try:
+            dumps = sorted(name for name in os.listdir(self.directory) if pattern.fullmatch(name))
+            for name in dumps[:-self.keep]:
+                os.remove(os.path.join(self.directory, name))
+        except OSError as e:
+            self.logger.warning("Failed to remove old dumps of %s: %s", prefix, e)
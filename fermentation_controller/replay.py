@@ -0,0 +1,184 @@
+import csv
+import glob
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from . import clock
+from .chamber import ChamberConfig, field_name
+from .config import Config
+from .controller import Controller, ControllerListener
+from .data_collector import DataCollector
+from .limiter import Limiter
+from .switch import Switch
+
+logger = logging.getLogger(__name__)
+
+SENSOR_NAMES = ["environment", "vessel", "fridge", "target"]
+SWITCH_NAMES = ["heater", "cooler", "limiter"]
+
+# logs written before the CSV header existed hold the timestamp followed by all fields in alphabetic order
+LEGACY_COLUMNS = ["time"] + sorted(DataCollector(SENSOR_NAMES, SWITCH_NAMES).valid_fields)
+
+
+def history_files(filename: str) -> List[str]:
+    # logrotate's dateext appends -YYYYMMDD, which sorts chronologically
+    rotated = sorted(f for f in glob.glob(glob.escape(filename) + "-*") if f[len(filename) + 1:].isdigit())
+    return rotated + [filename]
+
+
+def read_history(filenames: Iterable[str]) -> Iterator[Dict[str, float]]:
+    # sinks with an emission policy leave unchanged fields empty, those carry the last value forward
+    last = {}
+    for filename in filenames:
+        try:
+            file = open(filename, "r", newline="")
+        except FileNotFoundError:
+            logger.warning("Skipping missing history file %s", filename)
+            continue
+
+        with file:
+            columns = LEGACY_COLUMNS
+            for number, row in enumerate(csv.reader(file)):
+                if number == 0 and row and row[0] == "time":
+                    columns = row
+                    continue
+                if len(row) != len(columns):
+                    logger.warning("Skipping malformed row %s of %s", number + 1, filename)
+                    continue
+                try:
+                    values = {name: float(value) if value != "" else last[name] for name, value in zip(columns, row)}
+                except ValueError:
+                    logger.warning("Skipping unparsable row %s of %s", number + 1, filename)
+                    continue
+                except KeyError:
+                    logger.warning("Skipping row %s of %s, it leaves out fields never seen before",
+                                   number + 1, filename)
+                    continue
+                last = values
+                yield values
+
+
+class Decision(NamedTuple):
+    time: float
+    vessel: float
+    fridge: float
+    heater: bool
+    cooler: bool
+    limiter: bool
+    p: float
+    i: float
+    d: float
+    control: float
+    recorded_heater: Optional[bool]
+    recorded_cooler: Optional[bool]
+
+
+@dataclass
+class ReplaySensor:
+    name: str
+
+    current: float = field(default=0.0, init=False)
+    average: float = field(default=0.0, init=False)
+
+    def set(self, current: float, average: float) -> None:
+        self.current = current
+        self.average = average
+
+    def get(self) -> float:
+        return self.current
+
+    def get_average(self) -> float:
+        return self.average
+
+    def get_filtered(self) -> float:
+        # the unrounded value was never logged, the rounded average is what's left of it
+        return self.average
+
+    def get_age(self) -> float:
+        return 0.0
+
+
+@dataclass
+class RecordingSwitch(Switch):
+    name: str
+
+    on: bool = field(default=False, init=False)
+
+    def set(self, on: bool) -> None:
+        self.on = on
+
+    def get(self) -> bool:
+        return self.on
+
+
+@dataclass
+class Replay(ControllerListener):
+    config: Config
+    restart_gap: float = 300
+    # the chamber whose columns are replayed, empty for the single unnamed one
+    chamber: str = ""
+
+    def __post_init__(self) -> None:
+        self.control_interval = self.config.get("control_interval")
+        self.chamber_config = ChamberConfig(self.config, self.chamber)
+        self.columns = {name: field_name(self.chamber, name)
+                        for name in ["vessel", "vessel_avg", "fridge", "fridge_avg", "heater", "cooler"]}
+        self.clock = clock.ManualClock()
+        self.components = (0.0, 0.0, 0.0, 0.0)
+
+    def handle_controller(self, name: str, p: float, i: float, d: float, control: float,
+                          timestamp: Optional[float] = None) -> None:
+        self.components = (p, i, d, control)
+
+    def run(self, rows: Iterable[Dict[str, float]]) -> Iterator[Decision]:
+        previous_clock = clock.current
+        clock.use(self.clock)
+        try:
+            yield from self.__replay(rows)
+        finally:
+            clock.use(previous_clock)
+
+    def __replay(self, rows: Iterable[Dict[str, float]]) -> Iterator[Decision]:
+        controller = None
+        next_control = None
+        last_time = None
+
+        for row in rows:
+            now = row["time"]
+            self.clock.set(now)
+
+            # a gap in the log means the service was restarted, which starts the PID from scratch
+            if controller is None or now - last_time > self.restart_gap:
+                controller = self.__create_controller()
+                next_control = now
+            last_time = now
+
+            columns = self.columns
+            controller.current_temp.set(row[columns["vessel"]], row[columns["vessel_avg"]])
+            controller.fridge_temp.set(row[columns["fridge"]], row[columns["fridge_avg"]])
+
+            # logged rows jitter around their interval like the live scheduler's runs do, a row a few ms short of
+            # the next step still takes it
+            slack = self.control_interval / 2
+            if now < next_control - slack:
+                continue
+            while next_control <= now + slack:
+                next_control += self.control_interval
+
+            controller.control()
+            p, i, d, control = self.components
+            yield Decision(now, row[columns["vessel_avg"]], row[columns["fridge"]],
+                           controller.heater.get(), controller.cooler.get(), controller.limiter.get(),
+                           p, i, d, control,
+                           bool(row[columns["heater"]]) if columns["heater"] in row else None,
+                           bool(row[columns["cooler"]]) if columns["cooler"] in row else None)
+
+    def __create_controller(self) -> Controller:
+        heater = RecordingSwitch("heater")
+        cooler = RecordingSwitch("cooler")
+        limiter = Limiter("limiter", heater, [])
+        return Controller(self.chamber_config, self.control_interval,
+                          self.chamber_config.get_settings().control_deadband,
+                          heater, cooler, limiter,
+                          ReplaySensor("vessel"), ReplaySensor("fridge"), [self], self.chamber)
@@ -0,0 +1,51 @@
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+
+# Fixed capacity buffer of timestamped samples. Every sample is stored twice, capacity apart, so the latest n
+# samples are always one contiguous slice and windows can be handed out as memoryviews without copying.
+@dataclass
+class RingBuffer:
+    capacity: int
+
+    count: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        if self.capacity < 1:
+            raise ValueError("Ring buffer capacity must be at least 1, got %s" % self.capacity)
+        self.times = array('d', bytes(16 * self.capacity))
+        self.values = array('d', bytes(16 * self.capacity))
+        self.next = 0
+
+    def append(self, time: float, value: float) -> None:
+        index = self.next
+        self.times[index] = self.times[index + self.capacity] = time
+        self.values[index] = self.values[index + self.capacity] = value
+        self.next = index + 1 if index + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        if self.count == 0:
+            return None
+        index = self.next - 1 + self.capacity
+        return self.times[index], self.values[index]
+
+    def window(self, count: Optional[int] = None) -> Tuple[memoryview, memoryview]:
+        # oldest first; the views alias the buffer, copy them if they have to outlive the next capacity appends
+        count = self.count if count is None else min(count, self.count)
+        end = self.next + self.capacity
+        return memoryview(self.times)[end - count:end], memoryview(self.values)[end - count:end]
+
+    def since(self, time: float) -> Tuple[memoryview, memoryview]:
+        times, values = self.window()
+        start = bisect_left(times, time)
+        return times[start:], values[start:]
+
+    def nbytes(self) -> int:
+        return (len(self.times) + len(self.values)) * self.times.itemsize
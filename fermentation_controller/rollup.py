@@ -0,0 +1,161 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional
+
+from . import clock
+from .chamber import field_name
+from .controller import ControllerListener
+from .runnable import AsyncRunnable
+from .sensor import SensorListener
+from .switch import SwitchListener
+
+
+class Stats(NamedTuple):
+    min: float
+    max: float
+    # time weighted for switches, which makes it the duty cycle
+    mean: float
+    count: int
+
+
+class RollupListener(ABC):
+
+    @abstractmethod
+    def handle_rollup(self, resolution: float, start: float, stats: Dict[str, Stats]) -> None:
+        pass
+
+
+def label(resolution: float) -> str:
+    if resolution % 3600 == 0:
+        return "%dh" % (resolution // 3600)
+    if resolution % 60 == 0:
+        return "%dm" % (resolution // 60)
+    return "%gs" % resolution
+
+
+@dataclass
+class Window:
+    resolution: float
+
+    def __post_init__(self) -> None:
+        now = clock.time()
+        self.reset(math.floor(now / self.resolution) * self.resolution)
+        # the window running at startup has no data from before it, aggregating it would pass for a complete one
+        self.partial = now > self.start
+
+    def reset(self, start: float) -> None:
+        self.partial = False
+        self.start = start
+        self.end = start + self.resolution
+        # name -> [min, max, sum, count]
+        self.values: Dict[str, List[float]] = {}
+        self.on_time: Dict[str, float] = {}
+
+    def add(self, name: str, value: float) -> None:
+        values = self.values.get(name)
+        if values is None:
+            self.values[name] = [value, value, value, 1]
+        else:
+            if value < values[0]:
+                values[0] = value
+            if value > values[1]:
+                values[1] = value
+            values[2] += value
+            values[3] += 1
+
+
+# Aggregates events into aligned windows at every resolution, e.g. 1 minute and 1 hour. Events only update running
+# min/max/sum/count, windows that ended are handed to the listeners from run(), on the rollup's own lane.
+@dataclass
+class Rollup(AsyncRunnable, SensorListener, SwitchListener, ControllerListener):
+    sensor_names: List[str]
+    switch_names: List[str]
+    resolutions: List[float]
+    listeners: List[RollupListener]
+    controllers: List[str] = field(default_factory=lambda: [""])
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.fields = self.sensor_names + self.switch_names + \
+            [field_name(controller, name) for controller in self.controllers for name in ['p', 'i', 'd', 'control']]
+        self.lock = Lock()
+        self.windows = [Window(resolution) for resolution in self.resolutions]
+        self.switches: Dict[str, bool] = {}
+        self.switched_at: Dict[str, float] = {}
+        self.closed = []
+
+    def handle_temperature(self, name: str, temperature: float, avg_temperature: float,
+                           timestamp: Optional[float] = None) -> None:
+        if name in self.sensor_names:
+            self.__add({name: temperature}, timestamp)
+
+    def handle_controller(self, name: str, p: float, i: float, d: float, control: float,
+                          timestamp: Optional[float] = None) -> None:
+        if name in self.controllers:
+            self.__add({field_name(name, 'p'): p, field_name(name, 'i'): i, field_name(name, 'd'): d,
+                        field_name(name, 'control'): control}, timestamp)
+
+    def handle_switch(self, name: str, on: bool, timestamp: Optional[float] = None) -> None:
+        if name not in self.switch_names:
+            return
+        # a queued event counts from when it happened, a window that closed in the meantime keeps what it had
+        now = clock.time() if timestamp is None else timestamp
+        with self.lock:
+            self.__roll(now)
+            for window in self.windows:
+                self.__accumulate_on_time(window, name, now)
+                window.add(name, int(on))
+            self.switches[name] = on
+            self.switched_at[name] = now
+
+    def run(self) -> None:
+        with self.lock:
+            self.__roll(clock.time())
+            closed, self.closed = self.closed, []
+
+        for resolution, start, stats in closed:
+            for listener in self.listeners:
+                listener.handle_rollup(resolution, start, stats)
+
+    def shutdown(self) -> None:
+        # partial windows would look like complete ones to the sinks, they're dropped like the first ones are
+        pass
+
+    def __add(self, values: Dict[str, float], timestamp: Optional[float]) -> None:
+        now = clock.time() if timestamp is None else timestamp
+        with self.lock:
+            self.__roll(now)
+            for window in self.windows:
+                for name, value in values.items():
+                    window.add(name, value)
+
+    def __roll(self, now: float) -> None:
+        for window in self.windows:
+            if now < window.end:
+                continue
+            if window.partial:
+                self.logger.debug("Dropping partial %s window from %s", label(window.resolution), window.start)
+            else:
+                for name in self.switches:
+                    self.__accumulate_on_time(window, name, window.end)
+                self.closed.append((window.resolution, window.start, self.__stats(window)))
+            window.reset(math.floor(now / window.resolution) * window.resolution)
+            # a switch that isn't touched during a window still spends it in the state it was left in
+            for name, on in self.switches.items():
+                window.values[name] = [int(on), int(on), 0.0, 0]
+
+    def __accumulate_on_time(self, window: Window, name: str, until: float) -> None:
+        if self.switches.get(name):
+            since = max(self.switched_at[name], window.start)
+            window.on_time[name] = window.on_time.get(name, 0.0) + max(0.0, until - since)
+
+    def __stats(self, window: Window) -> Dict[str, Stats]:
+        stats = {name: Stats(values[0], values[1], values[2] / values[3], values[3])
+                 for name, values in window.values.items() if name not in self.switches}
+        for name in self.switches:
+            values = window.values[name]
+            stats[name] = Stats(values[0], values[1], window.on_time.get(name, 0.0) / window.resolution, values[3])
+        return stats
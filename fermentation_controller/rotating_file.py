@@ -0,0 +1,66 @@
+import logging
+import os
+from dataclasses import dataclass
+
+from . import clock
+
+
+# An append only file that starts with a header and survives logrotate, either moving the file away or truncating it
+# (copytruncate). A file that starts with another header is moved aside, what follows wouldn't match this one.
+@dataclass
+class RotatingFile:
+    filename: str
+    header: bytes
+    fsync: bool = False
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.__open()
+
+    def write(self, data: bytes) -> None:
+        self.__follow_rotation()
+        self.__write(data)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __open(self) -> None:
+        self.__set_aside_other_header()
+        self.file = open(self.filename, 'ab')
+        stat = os.fstat(self.file.fileno())
+        self.inode = stat.st_ino
+        self.size = stat.st_size
+        if self.size == 0:
+            self.__write(self.header)
+
+    def __set_aside_other_header(self) -> None:
+        try:
+            with open(self.filename, 'rb') as file:
+                existing = file.read(len(self.header))
+        except FileNotFoundError:
+            return
+        if existing and existing != self.header:
+            aside = "%s.%d" % (self.filename, clock.time())
+            self.logger.warning("%s has a different header, moving it to %s", self.filename, aside)
+            os.replace(self.filename, aside)
+
+    def __follow_rotation(self) -> None:
+        try:
+            rotated = os.stat(self.filename).st_ino != self.inode
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self.logger.info("%s was rotated, reopening it", self.filename)
+            self.file.close()
+            self.__open()
+        elif os.fstat(self.file.fileno()).st_size < self.size:
+            self.logger.info("%s was truncated, starting it with a header again", self.filename)
+            self.size = 0
+            self.__write(self.header)
+
+    def __write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.size += len(data)
@@ -1,17 +1,20 @@
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from threading import Event
 
+from . import clock
+
 
 @dataclass
 class Runnable(ABC):
     stop_triggered: Event = field(default=Event(), init=False)
 
     def start(self, interval: int, init_delay: int) -> None:
-        self.stop_triggered.wait(init_delay)
+        clock.wait(self.stop_triggered, init_delay)
         while not self.stop_triggered.is_set():
             self.run()
-            self.stop_triggered.wait(interval)
+            clock.wait(self.stop_triggered, interval)
         self.shutdown()
 
     def stop(self) -> None:
@@ -24,3 +27,13 @@ class Runnable(ABC):
     @abstractmethod
     def shutdown(self) -> None:
         pass
+
+
+class AsyncRunnable(Runnable):
+
+    # by default the blocking run()/shutdown() go to the loop's executor, ports override what can run on the loop
+    async def run_async(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.run)
+
+    async def shutdown_async(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
@@ -0,0 +1,228 @@
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass, field
+from itertools import count
+from queue import Queue
+from threading import Event, Thread
+from typing import Any, Dict, List, Optional
+
+from . import clock, metrics
+from .runnable import Runnable, AsyncRunnable
+
+RUN_SECONDS = metrics.histogram("fermentation_run_seconds", "Duration of a job's runs", ("job",))
+# jitter against the nominal interval, deadlines are absolute so lateness never accumulates
+RUN_LATENESS_SECONDS = metrics.histogram("fermentation_run_lateness_seconds",
+                                         "How long after its deadline a job's run started", ("job",))
+MISSED_DEADLINES = metrics.counter("fermentation_missed_deadlines_total", "Deadlines a job missed", ("job",))
+
+
+@dataclass
+class Job:
+    runnable: Runnable
+    interval: float
+    lane: str
+    deadline: float
+
+    runs: int = field(default=0, init=False)
+    missed: int = field(default=0, init=False)
+    busy: bool = field(default=False, init=False)
+    last_duration: float = field(default=0.0, init=False)
+    max_duration: float = field(default=0.0, init=False)
+    total_duration: float = field(default=0.0, init=False)
+    max_lateness: float = field(default=0.0, init=False)
+    # a profiling.RunProfile while the profiler has this job enabled, runs go through it
+    profile: Optional[Any] = field(default=None, init=False)
+
+    def __post_init__(self) -> None:
+        self.run_seconds = RUN_SECONDS.labels(self.name)
+        self.run_lateness_seconds = RUN_LATENESS_SECONDS.labels(self.name)
+        self.missed_deadlines = MISSED_DEADLINES.labels(self.name)
+
+    @property
+    def name(self) -> str:
+        name = getattr(self.runnable, "name", None)
+        return type(self.runnable).__name__ + ("('%s')" % name if name else "")
+
+    def advance(self, now: float) -> int:
+        # next deadline is absolute, so time spent running never accumulates as drift
+        self.deadline += self.interval
+        if self.deadline > now:
+            return 0
+
+        skipped = int((now - self.deadline) // self.interval) + 1
+        self.deadline += skipped * self.interval
+        self.miss(skipped)
+        return skipped
+
+    def miss(self, count: int = 1) -> None:
+        self.missed += count
+        self.missed_deadlines.inc(count)
+
+    def record(self, started: float, deadline: float, finished: float) -> None:
+        self.max_lateness = max(self.max_lateness, started - deadline)
+        self.run_lateness_seconds.observe(max(0.0, started - deadline))
+        self.last_duration = finished - started
+        self.run_seconds.observe(self.last_duration)
+        self.max_duration = max(self.max_duration, self.last_duration)
+        self.total_duration += self.last_duration
+        self.runs += 1
+
+
+@dataclass
+class Lane:
+    name: str
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.queue: Queue = Queue()
+        self.thread = Thread(target=self.__work, name="lane-" + self.name, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+    def submit(self, job: Job, deadline: float) -> None:
+        self.queue.put((job, deadline))
+
+    def __work(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            job, deadline = item
+            started = clock.monotonic()
+            try:
+                profile = job.profile
+                if profile is None:
+                    job.runnable.run()
+                else:
+                    profile.run(job.runnable.run)
+            except Exception:
+                self.logger.exception("Run of %s failed", job.name)
+            finally:
+                job.record(started, deadline, clock.monotonic())
+                job.busy = False
+
+
+@dataclass
+class Scheduler:
+    stop_triggered: Event = field(default_factory=Event, init=False)
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.jobs: List[Job] = []
+        self.lanes: Dict[str, Lane] = {}
+        self.timers: list = []
+        self.sequence = count()
+
+    def add(self, runnable: Runnable, interval: float, init_delay: float = 0, lane: str = "default") -> Job:
+        job = Job(runnable, interval, lane, clock.monotonic() + init_delay)
+        self.jobs.append(job)
+        if lane not in self.lanes:
+            self.lanes[lane] = Lane(lane)
+        heapq.heappush(self.timers, (job.deadline, next(self.sequence), job))
+        return job
+
+    def start(self) -> None:
+        for lane in self.lanes.values():
+            lane.start()
+
+        while not self.stop_triggered.is_set():
+            job = self.__next_due()
+            if job is not None:
+                self.__dispatch(job)
+
+        for lane in self.lanes.values():
+            lane.stop()
+        for job in self.jobs:
+            job.runnable.shutdown()
+
+    def stop(self) -> None:
+        self.stop_triggered.set()
+
+    def __next_due(self) -> Optional[Job]:
+        if not self.timers:
+            self.stop_triggered.wait()
+            return None
+
+        deadline, _, job = self.timers[0]
+        delay = deadline - clock.monotonic()
+        if delay > 0:
+            clock.wait(self.stop_triggered, delay)
+            return None
+
+        heapq.heappop(self.timers)
+        return job
+
+    def __dispatch(self, job: Job) -> None:
+        deadline = job.deadline
+
+        if job.busy:
+            job.miss()
+            self.logger.warning("%s missed its deadline, previous run still in progress", job.name)
+        else:
+            job.busy = True
+            self.lanes[job.lane].submit(job, deadline)
+
+        skipped = job.advance(clock.monotonic())
+        if skipped:
+            self.logger.warning("%s missed %s deadline(s), scheduler fell behind", job.name, skipped)
+
+        heapq.heappush(self.timers, (job.deadline, next(self.sequence), job))
+
+
+@dataclass
+class AsyncScheduler:
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.jobs: List[Job] = []
+        self.tasks: List[asyncio.Task] = []
+        self.stopped = False
+
+    def add(self, runnable: AsyncRunnable, interval: float, init_delay: float = 0, lane: str = "default") -> Job:
+        # lanes only matter for the threaded scheduler, every job here is a task on the same loop
+        job = Job(runnable, interval, lane, clock.monotonic() + init_delay)
+        self.jobs.append(job)
+        return job
+
+    async def start(self) -> None:
+        # like the threaded scheduler, a stop that comes before the start still ends it, the jobs are only shut down
+        if not self.stopped:
+            self.tasks = [asyncio.create_task(self.__loop(job)) for job in self.jobs]
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        for job in self.jobs:
+            await job.runnable.shutdown_async()
+
+    def stop(self) -> None:
+        self.stopped = True
+        for task in self.tasks:
+            task.cancel()
+
+    async def __loop(self, job: Job) -> None:
+        while True:
+            delay = job.deadline - clock.monotonic()
+            if delay > 0:
+                await asyncio.sleep(clock.real_delay(delay))
+
+            started = clock.monotonic()
+            profile = job.profile
+            try:
+                if profile is None:
+                    await job.runnable.run_async()
+                else:
+                    # cProfile only sees its own thread, a profiled job runs its blocking run() in the executor
+                    await asyncio.get_running_loop().run_in_executor(None, profile.run, job.runnable.run)
+            except Exception:
+                self.logger.exception("Run of %s failed", job.name)
+            job.record(started, job.deadline, clock.monotonic())
+
+            skipped = job.advance(clock.monotonic())
+            if skipped:
+                self.logger.warning("%s missed %s deadline(s), run took %.3fs", job.name, skipped, job.last_duration)
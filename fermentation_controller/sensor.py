@@ -1,62 +1,215 @@
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from collections import deque
+from concurrent import futures
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Iterable
+from typing import Callable, Iterable, List, Optional, TypeVar
 
-from .runnable import Runnable
+from . import clock, metrics
+from .config import Config, Settings
+from .filters import create_filter
+from .runnable import AsyncRunnable
+
+T = TypeVar("T")
+
+READ_SECONDS = metrics.histogram("fermentation_sensor_read_seconds", "Time taken to read a sensor's device file",
+                                 ("sensor",))
+# crc, timeout, failure when no attempt of a run succeeded, bulk when a bulk conversion result couldn't be read
+SENSOR_ERRORS = metrics.counter("fermentation_sensor_errors_total", "Failed sensor reads", ("sensor", "kind"))
+
+
+# Runs reads with a deadline on a thread of its own. A hung read can't be interrupted, it's abandoned when it overruns,
+# and as long as it hangs no other read is started, so nothing queues up behind it. Every device gets one of these,
+# a probe that hangs doesn't hold up the reads of the others.
+@dataclass
+class DeadlineReader:
+    name: str
+    timeout: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        self.executor = None
+        self.pending: Optional[Future] = None
+
+    def hanging(self) -> bool:
+        return self.pending is not None and not self.pending.done()
+
+    def read(self, function: Callable[[], T]) -> T:
+        # raises futures.TimeoutError when the read overruns, callers check hanging() first
+        if self.timeout is None:
+            return function()
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="read-" + self.name)
+        self.pending = self.executor.submit(function)
+        return self.pending.result(self.timeout)
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
 
 
 class SensorListener(ABC):
 
+    # timestamp is the clock time the sensor was read at, None when it's handled right away
     @abstractmethod
-    def handle_temperature(self, name: str, temperate: float, avg_temperature: float):
+    def handle_temperature(self, name: str, temperate: float, avg_temperature: float,
+                           timestamp: Optional[float] = None):
         pass
 
 
 @dataclass
-class Sensor(Runnable):
+class Sensor(AsyncRunnable):
     name: str
     device_id: str
     device_dir: str
     average_window: int
     listeners: Iterable[SensorListener]
+    config: Optional[Config] = None
+    read_timeout: Optional[float] = None
+    read_retries: int = 0
 
     current: float = field(default=0.0, init=False)
     average: float = field(default=0.0, init=False)
+    filtered: float = field(default=0.0, init=False)
+    updated: Optional[float] = field(default=None, init=False)
+    crc_errors: int = field(default=0, init=False)
+    timeouts: int = field(default=0, init=False)
+    failures: int = field(default=0, init=False)
 
     def __post_init__(self) -> None:
-        self.device_file = "w1_slave"
-        self.data = deque([], self.average_window)
+        self.filter_kind = "sma"
+        self.filter = create_filter(self.filter_kind, self.average_window)
+        self.reader = DeadlineReader(self.name, self.read_timeout)
         self.logger = logging.getLogger(__name__)
+        self.read_seconds = READ_SECONDS.labels(self.name)
+        self.wanted_filter = (self.filter_kind, self.average_window)
+        if self.config is not None:
+            self.config.subscribe(["average_filter", "average_window"], self.__configure_filter)
 
     def run(self) -> None:
         self.read()
 
+    async def run_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, self.__acquire, "w1_slave", self.__parse_slave):
+            # listeners may drive hardware (the LCD), keep them off the loop
+            await loop.run_in_executor(None, self.__publish)
+
+    async def shutdown_async(self) -> None:
+        self.shutdown()
+
     def shutdown(self) -> None:
         self.logger.info("Shutting down sensor '%s' (%s)", self.name, self.device_id)
+        self.reader.shutdown()
 
     def read(self) -> None:
-        path = self.device_dir + "/" + self.device_id + "/" + self.device_file
-
-        with open(path, "r") as file:
-            lines = file.read().split("\n")
-            if lines[0].strip()[-3:] != "YES":
-                return
+        if self.__acquire("w1_slave", self.__parse_slave):
+            self.__publish()
+
+    def read_converted(self) -> None:
+        # the result of a conversion that W1Bus triggered for the whole bus
+        if self.__acquire("temperature", self.__parse_converted):
+            self.__publish()
+
+    def __acquire(self, device_file: str, parse: Callable[[List[str]], Optional[float]]) -> bool:
+        for _ in range(1 + self.read_retries):
+            lines = self.__read_with_deadline(device_file)
+            if lines is None:
+                # don't retry a read that is still hanging, it would only queue up behind it
+                if self.reader.hanging():
+                    break
+                continue
+            temperature = parse(lines)
+            if temperature is not None:
+                self.__record(temperature)
+                return True
+
+        self.failures += 1
+        SENSOR_ERRORS.labels(self.name, "failure").inc()
+        self.logger.warning("Failed to read sensor '%s' (%s), keeping value from %s",
+                            self.name, self.device_id, "%.1fs ago" % self.get_age() if self.updated else "never")
+        return False
+
+    def __read_with_deadline(self, device_file: str) -> Optional[List[str]]:
+        try:
+            if self.reader.hanging():
+                self.logger.warning("Previous read of sensor '%s' is still hanging", self.name)
+                return None
+            return self.reader.read(lambda: self.__read_lines(device_file))
+        except futures.TimeoutError:
+            self.timeouts += 1
+            SENSOR_ERRORS.labels(self.name, "timeout").inc()
+            self.logger.warning("Reading sensor '%s' took longer than %ss", self.name, self.read_timeout)
+        except OSError as e:
+            self.logger.warning("Reading sensor '%s' failed: %s", self.name, e)
+        return None
+
+    def __read_lines(self, device_file: str) -> List[str]:
+        path = self.device_dir + "/" + self.device_id + "/" + device_file
+
+        with self.read_seconds.time(), open(path, "r") as file:
+            return file.read().split("\n")
+
+    def __parse_slave(self, lines: List[str]) -> Optional[float]:
+        if lines[0].strip()[-3:] != "YES":
+            self.crc_errors += 1
+            SENSOR_ERRORS.labels(self.name, "crc").inc()
+            self.logger.warning("CRC check of sensor '%s' (%s) failed", self.name, self.device_id)
+            return None
 
         temp_line = lines[1]
         temp_pos = temp_line.find("t=")
         temp_str = temp_line[temp_pos + 2:]
 
-        self.current = float(temp_str) / 1000
-        logging.debug("Read %s from sensor '%s' (%s)", self.current, self.name, self.device_id)
+        return float(temp_str) / 1000
 
-        # update moving average
-        self.data.append(self.current)
-        self.average = round(sum(self.data) / len(self.data), 1)
+    def __parse_converted(self, lines: List[str]) -> Optional[float]:
+        try:
+            return int(lines[0].strip()) / 1000
+        except ValueError:
+            # empty while the device is still converting, an error if the CRC check failed
+            SENSOR_ERRORS.labels(self.name, "bulk").inc()
+            self.logger.warning("Failed to read bulk conversion result of %s", self.device_id)
+            return None
 
+    def update(self, temperature: float) -> None:
+        self.__record(temperature)
         self.__publish()
 
+    def __record(self, temperature: float) -> None:
+        logging.debug("Read %s from sensor '%s' (%s)", temperature, self.name, self.device_id)
+
+        # filtered first, a reading only counts as fresh once everything derived from it is too
+        self.__update_filter()
+        self.filtered = self.filter.update(temperature)
+        self.average = round(self.filtered, 1)
+        self.current = temperature
+        self.updated = clock.monotonic()
+
+    def __configure_filter(self, settings: Settings) -> None:
+        # runs on the thread that reloaded the config, the filter itself is only touched by the next sample
+        self.wanted_filter = (settings.average_filter, settings.average_window)
+
+    def __update_filter(self) -> None:
+        kind, window = self.wanted_filter
+        if kind != self.filter_kind:
+            try:
+                replacement = create_filter(kind, window)
+            except ValueError as e:
+                self.logger.error("Keeping %s filter of sensor '%s': %s", self.filter_kind, self.name, e)
+                self.wanted_filter = (self.filter_kind, window)
+                return
+            self.logger.info("Switching filter of sensor '%s' to %s over %s samples", self.name, kind, window)
+            previous = self.filter
+            self.filter = replacement
+            self.filter_kind = kind
+            # seed with the last filtered value so the output doesn't jump back to the raw reading
+            if not previous.is_empty():
+                self.filter.update(previous.get())
+        elif window != self.filter.window:
+            self.logger.info("Resizing filter window of sensor '%s' to %s samples", self.name, window)
+            self.filter.resize(window)
+
     def __publish(self) -> None:
         for l in self.listeners:
             l.handle_temperature(self.name, self.get(), self.get_average())
@@ -66,3 +219,9 @@ class Sensor(Runnable):
 
     def get_average(self) -> float:
         return self.average
+
+    def get_filtered(self) -> float:
+        return self.filtered
+
+    def get_age(self) -> float:
+        return float("inf") if self.updated is None else clock.monotonic() - self.updated
@@ -0,0 +1,151 @@
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Dict, List, Tuple
+
+from . import clock
+from .plant import ThermalPlant
+from .runnable import AsyncRunnable
+
+
+class FakeGPIO(ModuleType):
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self) -> None:
+        super().__init__("RPi.GPIO")
+        self.pins: Dict[int, int] = {}
+
+    def setmode(self, mode: int) -> None:
+        pass
+
+    def getmode(self) -> int:
+        return self.BCM
+
+    def setwarnings(self, enabled: bool) -> None:
+        pass
+
+    def setup(self, port: int, direction: int, **kwargs) -> None:
+        self.pins.setdefault(port, self.LOW)
+
+    def output(self, port: int, value: int) -> None:
+        self.pins[port] = value
+
+    def input(self, port: int) -> int:
+        return self.pins.get(port, self.LOW)
+
+    def cleanup(self, *ports) -> None:
+        for port in ports or list(self.pins):
+            self.pins[port] = self.LOW
+
+
+class FakeCharLCD:
+
+    def __init__(self, cols: int = 16, rows: int = 2, **kwargs) -> None:
+        self.cols = cols
+        self.rows = rows
+        self.cursor_mode = 'hide'
+        self.cursor_pos = (0, 0)
+        self.clear()
+
+    def clear(self) -> None:
+        self.lines = [[" "] * self.cols for _ in range(self.rows)]
+        self.cursor_pos = (0, 0)
+
+    def write_string(self, text: str) -> None:
+        row, col = self.cursor_pos
+        for char in text:
+            if col < self.cols:
+                self.lines[row][col] = char
+            col += 1
+        self.cursor_pos = (row, col)
+
+    def close(self, clear: bool = False) -> None:
+        if clear:
+            self.clear()
+
+    def text(self) -> List[str]:
+        return ["".join(line) for line in self.lines]
+
+
+# Stand-ins for RPi.GPIO and RPLCD, must be installed before anything imports the display or the SSRs
+def install() -> FakeGPIO:
+    gpio = FakeGPIO()
+    rpi = ModuleType("RPi")
+    rpi.GPIO = gpio
+    rplcd = ModuleType("RPLCD")
+    rplcd.CharLCD = FakeCharLCD
+
+    sys.modules["RPi"] = rpi
+    sys.modules["RPi.GPIO"] = gpio
+    sys.modules["RPLCD"] = rplcd
+    return gpio
+
+
+@dataclass
+class FakeW1Devices:
+    device_dir: str
+
+    def __post_init__(self) -> None:
+        master = os.path.join(self.device_dir, "w1_bus_master1")
+        os.makedirs(master, exist_ok=True)
+        self.__write(os.path.join(master, "therm_bulk_read"), "0\n")
+        self.written: Dict[str, int] = {}
+
+    def write(self, device_id: str, temperature: float) -> None:
+        # DS18B20s resolve 1/16th of a degree, most plant steps don't change what the sensor would report
+        millis = int(round(temperature * 16)) * 1000 // 16
+        if self.written.get(device_id) == millis:
+            return
+        self.written[device_id] = millis
+
+        device = os.path.join(self.device_dir, device_id)
+        os.makedirs(device, exist_ok=True)
+        self.__write(os.path.join(device, "w1_slave"),
+                     "50 01 4b 46 7f ff 0c 10 1c : crc=1c YES\n50 01 4b 46 7f ff 0c 10 1c t=%d\n" % millis)
+        self.__write(os.path.join(device, "temperature"), "%d\n" % millis)
+
+    @staticmethod
+    def __write(path: str, content: str) -> None:
+        # replace instead of rewrite, so a concurrent reader never sees a half written file
+        with open(path + ".tmp", "w") as file:
+            file.write(content)
+        os.replace(path + ".tmp", path)
+
+
+@dataclass
+class Simulation(AsyncRunnable):
+    plant: ThermalPlant
+    devices: FakeW1Devices
+    gpio: FakeGPIO
+    sensors: List[Tuple[str, str]]
+    heater_port: int
+    cooler_port: int
+
+    last_step: float = field(default=0.0, init=False)
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.last_step = clock.monotonic()
+        self.__publish()
+
+    def run(self) -> None:
+        now = clock.monotonic()
+        self.plant.step(now - self.last_step,
+                        self.gpio.input(self.heater_port) == self.gpio.HIGH,
+                        self.gpio.input(self.cooler_port) == self.gpio.HIGH)
+        self.last_step = now
+        self.__publish()
+
+    def shutdown(self) -> None:
+        self.logger.info("Stopping simulation at vessel %.2f, fridge %.2f", self.plant.vessel, self.plant.fridge)
+
+    def __publish(self) -> None:
+        for name, device_id in self.sensors:
+            self.devices.write(device_id, self.plant.temperature(name))
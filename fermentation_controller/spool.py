@@ -0,0 +1,87 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import List, Tuple
+
+
+# Append-only queue of text records on disk, drained from the front by advancing a persisted read offset.
+# The file is truncated once everything has been drained, so it only grows while the consumer is behind.
+@dataclass
+class Spool:
+    path: str
+    max_bytes: int = 16 * 1024 * 1024
+    fsync: bool = False
+
+    dropped: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.lock = Lock()
+        self.offset_path = self.path + ".offset"
+        self.file = open(self.path, "ab")
+        self.reader = open(self.path, "rb")
+        self.size = self.file.seek(0, os.SEEK_END)
+        self.offset = self.__load_offset()
+        self.overflowing = False
+
+    def append(self, records: List[str]) -> bool:
+        data = "".join(record + "\n" for record in records).encode()
+        with self.lock:
+            if self.size + len(data) > self.max_bytes:
+                self.dropped += len(records)
+                if not self.overflowing:
+                    self.logger.warning("Spool %s is full at %s bytes, dropping new records", self.path, self.size)
+                self.overflowing = True
+                return False
+
+            self.overflowing = False
+            self.file.write(data)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.size += len(data)
+            return True
+
+    def read(self, max_records: int) -> Tuple[List[str], int]:
+        with self.lock:
+            self.reader.seek(self.offset)
+            records = []
+            end = self.offset
+            while len(records) < max_records:
+                line = self.reader.readline()
+                # a line without newline is a write that got cut off, it's never going to be complete
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                records.append(line[:-1].decode())
+            return records, end
+
+    def commit(self, end: int) -> None:
+        with self.lock:
+            self.offset = end
+            if self.offset >= self.size:
+                self.file.truncate(0)
+                self.size = 0
+                self.offset = 0
+            self.__store_offset()
+
+    def pending_bytes(self) -> int:
+        return self.size - self.offset
+
+    def close(self) -> None:
+        self.file.close()
+        self.reader.close()
+
+    def __load_offset(self) -> int:
+        try:
+            with open(self.offset_path, "r") as file:
+                offset = int(file.read())
+        except (OSError, ValueError):
+            return 0
+        return offset if offset <= self.size else 0
+
+    def __store_offset(self) -> None:
+        with open(self.offset_path + ".tmp", "w") as file:
+            file.write(str(self.offset))
+        os.replace(self.offset_path + ".tmp", self.offset_path)
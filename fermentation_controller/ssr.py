@@ -4,8 +4,11 @@ from typing import Iterable
 
 from RPi import GPIO
 
+from . import metrics
 from .switch import Switch, SwitchListener
 
+SWITCH_SETS = metrics.counter("fermentation_switch_sets_total", "Times a switch was set", ("switch", "state"))
+
 
 @dataclass
 class Ssr(Switch):
@@ -28,6 +31,7 @@ class Ssr(Switch):
     def set(self, on: bool) -> None:
         logging.debug("Switching '%s' %s", self.name, "on" if on else "off")
         GPIO.output(self.port, GPIO.HIGH if on else GPIO.LOW)
+        SWITCH_SETS.labels(self.name, "on" if on else "off").inc()
         self.on = on
         self.__publish(self.on)
 
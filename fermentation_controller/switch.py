@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class SwitchListener(ABC):
 
+    # timestamp is the clock time the switch was set at, None when it's handled right away
     @abstractmethod
-    def handle_switch(self, name: str, on: bool):
+    def handle_switch(self, name: str, on: bool, timestamp: Optional[float] = None):
         pass
 
 
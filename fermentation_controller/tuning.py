@@ -0,0 +1,146 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+
+from .chamber import field_name
+from .plant import ThermalPlant
+
+logger = logging.getLogger(__name__)
+
+
+def load_columns(rows: Iterable[Dict[str, float]], chamber: str = "") -> Dict[str, np.ndarray]:
+    # time is shared by all chambers, the rest is logged under the chamber's name
+    columns = {"time": "time"}
+    columns.update({name: field_name(chamber, name) for name in ["environment", "fridge", "vessel", "heater", "cooler"]})
+    data = {name: [] for name in columns}
+    for row in rows:
+        missing = [column for column in columns.values() if column not in row]
+        if missing:
+            raise ValueError("History has no %s column" % ", ".join(missing))
+        for name, column in columns.items():
+            data[name].append(row[column])
+    return {name: np.asarray(values, dtype=float) for name, values in data.items()}
+
+
+def fit_plant(columns: Dict[str, np.ndarray], max_gap: float = 60) -> ThermalPlant:
+    dt = np.diff(columns["time"])
+    # skip gaps where the service was down, and the switch state logged at the start of each interval applies to it
+    valid = (dt > 0) & (dt <= max_gap)
+    if valid.sum() < 10:
+        raise ValueError("Not enough consecutive samples to fit a thermal model")
+
+    environment = columns["environment"][:-1][valid]
+    fridge = columns["fridge"][:-1][valid]
+    vessel = columns["vessel"][:-1][valid]
+    heater = columns["heater"][:-1][valid]
+    cooler = columns["cooler"][:-1][valid]
+    dt = dt[valid]
+
+    fridge_rate = np.diff(columns["fridge"])[valid] / dt
+    vessel_rate = np.diff(columns["vessel"])[valid] / dt
+
+    fridge_terms = np.column_stack([environment - fridge, vessel - fridge, heater, -cooler])
+    (room_loss, air_coupling, heater_power, cooler_power), *_ = np.linalg.lstsq(fridge_terms, fridge_rate, rcond=None)
+    (vessel_coupling,), *_ = np.linalg.lstsq((fridge - vessel)[:, None], vessel_rate, rcond=None)
+
+    plant = ThermalPlant(environment=float(environment.mean()),
+                         fridge=float(columns["fridge"][0]), vessel=float(columns["vessel"][0]),
+                         room_loss=float(room_loss), air_coupling=float(air_coupling),
+                         vessel_coupling=float(vessel_coupling),
+                         heater_power=float(heater_power), cooler_power=float(cooler_power))
+    if min(room_loss, air_coupling, vessel_coupling, heater_power, cooler_power) < 0:
+        logger.warning("Fitted model has negative coefficients, the log may not excite heater and cooler enough: %s",
+                       plant)
+    return plant
+
+
+def grid(p: Sequence[float], i: Sequence[float], d: Sequence[float], deadband: Sequence[float]) -> Dict[str, np.ndarray]:
+    mesh = np.meshgrid(np.asarray(p, dtype=float), np.asarray(i, dtype=float),
+                       np.asarray(d, dtype=float), np.asarray(deadband, dtype=float), indexing="ij")
+    return {name: values.ravel() for name, values in zip(["p", "i", "d", "control_deadband"], mesh)}
+
+
+@dataclass
+class Sweep:
+    plant: ThermalPlant
+    target: float
+    control_interval: float = 15
+    heating_limit: float = 40
+    limit_window: float = 10
+    tolerance: float = 0.25
+
+    def run(self, tunings: Dict[str, np.ndarray], duration: float) -> Dict[str, np.ndarray]:
+        kp, ki, kd, deadband = tunings["p"], tunings["i"], tunings["d"], tunings["control_deadband"]
+        size = kp.shape[0]
+        plant = self.plant
+        dt = self.control_interval
+        substeps = max(1, int(np.ceil(dt / plant.max_step)))
+        h = dt / substeps
+
+        fridge = np.full(size, plant.fridge)
+        vessel = np.full(size, plant.vessel)
+        integral = np.zeros(size)
+        last_input = vessel.copy()
+        heater = np.zeros(size, dtype=bool)
+        cooler = np.zeros(size, dtype=bool)
+        limiter = np.zeros(size, dtype=bool)
+
+        direction = 1.0 if self.target >= plant.vessel else -1.0
+        overshoot = np.zeros(size)
+        last_outside = np.full(size, -1)
+        cycles = np.zeros(size, dtype=int)
+        heater_time = np.zeros(size)
+        cooler_time = np.zeros(size)
+
+        steps = int(duration // dt)
+        for step in range(steps):
+            # simple_pid's law with default options: proportional on error, derivative on measurement
+            error = self.target - vessel
+            integral += ki * error * dt
+            control = kp * error + integral - kd * (vessel - last_input) / dt
+            last_input = vessel.copy()
+
+            # Controller.__limit, with its hysteresis, then Controller.__control_switches
+            limiter = np.where(limiter, fridge >= self.heating_limit - self.limit_window, fridge > self.heating_limit)
+            active = (np.abs(control) >= deadband) & (control != 0) & ~limiter
+            new_heater = active & (control > 0)
+            new_cooler = active & (control < 0)
+            # while limited the controller leaves the switches alone, except that the limiter kills the heater
+            new_heater = np.where(limiter, False, new_heater)
+            new_cooler = np.where(limiter, cooler, new_cooler)
+
+            cycles += (new_heater & ~heater) + (new_cooler & ~cooler)
+            heater, cooler = new_heater, new_cooler
+            heater_time += heater * dt
+            cooler_time += cooler * dt
+
+            for _ in range(substeps):
+                d_fridge = plant.room_loss * (plant.environment - fridge) + \
+                    plant.air_coupling * (vessel - fridge) + \
+                    plant.heater_power * heater - plant.cooler_power * cooler
+                d_vessel = plant.vessel_coupling * (fridge - vessel)
+                fridge = fridge + d_fridge * h
+                vessel = vessel + d_vessel * h
+
+            overshoot = np.maximum(overshoot, (vessel - self.target) * direction)
+            last_outside = np.where(np.abs(vessel - self.target) > self.tolerance, step, last_outside)
+
+        settled = last_outside < steps - 1
+        return {
+            **tunings,
+            "overshoot": overshoot,
+            "settling_time": np.where(settled, (last_outside + 1) * dt, np.inf),
+            "switch_cycles": cycles,
+            "heater_duty": heater_time / (steps * dt),
+            "cooler_duty": cooler_time / (steps * dt),
+            "final_error": vessel - self.target,
+        }
+
+
+def rank(results: Dict[str, np.ndarray]) -> np.ndarray:
+    # settled runs first, then by settling time to the quarter hour, overshoot to a tenth of a degree, switch cycles
+    settling = np.round(results["settling_time"] / 900)
+    overshoot = np.round(results["overshoot"], 1)
+    return np.lexsort((results["switch_cycles"], overshoot, settling))
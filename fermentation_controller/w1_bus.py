@@ -0,0 +1,93 @@
+import glob
+import logging
+import os
+from concurrent import futures
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from . import clock
+from .runnable import AsyncRunnable
+from .sensor import DeadlineReader, Sensor
+
+
+@dataclass
+class W1Bus(AsyncRunnable):
+    device_dir: str
+    sensors: List[Sensor]
+    conversion_timeout: float = 1.5
+    poll_interval: float = 0.05
+    # like the sensors' reads, accesses to the bus masters get a deadline and are retried
+    read_timeout: Optional[float] = None
+    read_retries: int = 0
+
+    def __post_init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.reader = DeadlineReader("w1-bus", self.read_timeout)
+        self.masters = sorted(glob.glob(os.path.join(self.device_dir, "w1_bus_master*")))
+        if not self.masters:
+            self.logger.warning("No 1-Wire bus masters found in %s, falling back to reading sensors one by one",
+                                self.device_dir)
+
+    def run(self) -> None:
+        self.read()
+
+    def shutdown(self) -> None:
+        self.logger.info("Shutting down 1-Wire bus")
+        for sensor in self.sensors:
+            sensor.shutdown()
+        self.reader.shutdown()
+
+    def read(self) -> None:
+        if not self.masters:
+            for sensor in self.sensors:
+                sensor.read()
+            return
+
+        # one simultaneous conversion for every device on every master, instead of one per device read
+        for master in self.masters:
+            for _ in range(1 + self.read_retries):
+                if self.__access(master, lambda: self.__trigger(master)) or self.reader.hanging():
+                    break
+
+        self.__wait_for_conversion()
+
+        # every result is read with its sensor's deadline and retries, a hung probe only holds up itself
+        for sensor in self.sensors:
+            sensor.read_converted()
+
+    def __wait_for_conversion(self) -> None:
+        deadline = clock.monotonic() + self.conversion_timeout
+        pending = list(self.masters)
+        while pending:
+            # -1 means at least one device on the master is still converting
+            # a master that can't be asked is given up on, its sensors' reads time out on their own
+            pending = [m for m in pending if self.__access(m, lambda: self.__bulk_read_status(m)) == "-1"]
+            if not pending:
+                return
+            if clock.monotonic() > deadline:
+                self.logger.warning("Bulk conversion on %s did not finish within %ss", pending, self.conversion_timeout)
+                return
+            clock.sleep(self.poll_interval)
+
+    def __access(self, master: str, function: Callable):
+        try:
+            if self.reader.hanging():
+                self.logger.warning("Previous access of %s is still hanging", master)
+                return None
+            return self.reader.read(function)
+        except futures.TimeoutError:
+            self.logger.warning("Accessing %s took longer than %ss", master, self.read_timeout)
+        except OSError as e:
+            self.logger.warning("Accessing %s failed: %s", master, e)
+        return None
+
+    @staticmethod
+    def __trigger(master: str) -> bool:
+        with open(os.path.join(master, "therm_bulk_read"), "w") as file:
+            file.write("trigger\n")
+        return True
+
+    @staticmethod
+    def __bulk_read_status(master: str) -> str:
+        with open(os.path.join(master, "therm_bulk_read"), "r") as file:
+            return file.read().strip()
@@ -1,16 +1,29 @@
+import asyncio
 import logging
+import os
 import signal
 from threading import Thread, Event
+from typing import Optional
 
-from fermentation_controller.config import Config
+from fermentation_controller.chamber import SENSOR_ROLES, SWITCH_ROLES, ChamberConfig, chambers_from, field_name
+from fermentation_controller.config import CONFIG_SCHEMA, Config
 from fermentation_controller.controller import Controller
-from fermentation_controller.csv_writer import CsvWriter
+from fermentation_controller.csv_writer import CsvWriter, RollupCsvWriter
 from fermentation_controller.data_collector import DataCollector
-from fermentation_controller.influxdb_writer import InfluxDBWriter
+from fermentation_controller.influxdb_writer import InfluxDBWriter, InfluxDBFlusher
 from fermentation_controller.display import Display
+from fermentation_controller.emission import Emission
+from fermentation_controller.event_bus import BLOCK, DROP_OLDEST, EventBus
+from fermentation_controller.history import HistoryWriter
 from fermentation_controller.limiter import Limiter
+from fermentation_controller.metrics import MetricsServer
+from fermentation_controller.profiling import Profiler
+from fermentation_controller.rollup import Rollup
+from fermentation_controller.scheduler import Scheduler, AsyncScheduler
 from fermentation_controller.sensor import Sensor
+from fermentation_controller.spool import Spool
 from fermentation_controller.ssr import Ssr
+from fermentation_controller.w1_bus import W1Bus
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 
@@ -29,60 +42,187 @@ signal.signal(signal.SIGTERM, start_shutdown)
 
 
 def main():
-    config = Config("./config.json")
+    config = Config("./config.json", CONFIG_SCHEMA)
     secrets = Config("./secret.json")
+    # edits apply as soon as the file is saved, config_interval only remains as a fallback
+    config.watch()
+
+    schedule, hardware = create(config, secrets, "/sys/bus/w1/devices", "data.csv", config.get("history_file"))
+
+    # local only by default, put a reverse proxy or an SSH tunnel in front to scrape it from elsewhere
+    metrics_server = None
+    if config.get("metrics_port"):
+        metrics_server = MetricsServer(config.get("metrics_port"), config.get("metrics_host") or "127.0.0.1")
+        metrics_server.start()
+
+    if config.get("execution_mode") == "asyncio":
+        asyncio.run(run_event_loop(schedule, config))
+    else:
+        run_threads(schedule, config)
+
+    for device in hardware:
+        device.shutdown()
+
+    if metrics_server is not None:
+        metrics_server.shutdown()
+
+
+def create(config: Config, secrets: Optional[Config], device_dir: str, csv_file: str,
+           history_file: Optional[str] = None):
+    chambers = chambers_from(config.get_settings())
+    controllers = [chamber.name for chamber in chambers]
+    sensor_roles = [[role for role in SENSOR_ROLES if role in chamber.sensors] for chamber in chambers]
+    sensor_names = [field_name(chamber.name, role) for chamber, roles in zip(chambers, sensor_roles) for role in roles]
+    switch_names = [field_name(chamber.name, role) for chamber in chambers for role in SWITCH_ROLES]
+    target_names = [field_name(chamber.name, "target") for chamber in chambers]
+
+    # a 16x2 panel fits a single chamber, it shows the first one
+    shown = chambers[0].name
+    display = Display([field_name(shown, name) for name in ["environment", "vessel", "fridge", "target"]],
+                      [field_name(shown, name) for name in SWITCH_ROLES])
+
+    data_collector = DataCollector(sensor_names + target_names, switch_names,
+                                   config.get("history_horizon"), config.get("sensor_interval"), controllers)
+    # rows are buffered to spare the SD card, a crash loses at most one flush interval of them
+    csv_writer = CsvWriter(data_collector, csv_file, config.get("csv_flush_rows") or 1,
+                           config.get("csv_flush_interval") or 0, bool(config.get("csv_fsync")),
+                           create_emission(config))
+
+    # producers only queue events, each consumer handles them on a thread of its own. The display only needs the
+    # latest state, storage must see every event.
+    event_bus = EventBus()
+    event_bus.subscribe(display, 16, DROP_OLDEST)
+    event_bus.subscribe(data_collector, 1024, BLOCK)
+    listeners = [event_bus]
+    controller_listeners = [event_bus]
+    rollup_listeners = []
+    rollup = None
+    if config.get("rollup_resolutions"):
+        rollup = Rollup(sensor_names, switch_names, config.get("rollup_resolutions"), rollup_listeners, controllers)
+        event_bus.subscribe(rollup, 1024, BLOCK)
+
+    read_timeout = config.get("sensor_read_timeout")
+    read_retries = config.get("sensor_read_retries") or 0
+    sensors = []
+    ssrs = []
+    chamber_controllers = []
+    for chamber, roles in zip(chambers, sensor_roles):
+        chamber_config = ChamberConfig(config, chamber.name)
+        settings = chamber_config.get_settings()
+        target = field_name(chamber.name, "target")
+        display.handle_temperature(target, settings.target, settings.target)
+        data_collector.handle_temperature(target, settings.target, settings.target)
+
+        chamber_sensors = {role: Sensor(field_name(chamber.name, role), chamber.sensors[role], device_dir,
+                                        config.get("average_window"), listeners, config, read_timeout, read_retries)
+                           for role in roles}
+
+        heater_ssr = Ssr(field_name(chamber.name, "heater"), chamber.heater_pin, listeners)
+        cooler_ssr = Ssr(field_name(chamber.name, "cooler"), chamber.cooler_pin, listeners)
+
+        limiter = Limiter(field_name(chamber.name, "limiter"), heater_ssr, listeners)
+
+        chamber_controllers.append(Controller(chamber_config, config.get("control_interval"), settings.control_deadband,
+                                              heater_ssr, cooler_ssr, limiter,
+                                              chamber_sensors["vessel"], chamber_sensors["fridge"],
+                                              controller_listeners, chamber.name))
+        sensors += chamber_sensors.values()
+        ssrs += [heater_ssr, cooler_ssr]
+
+    # sensors share the 1-Wire bus anyway, slow sinks get a lane of their own so they never delay control. With more
+    # than a chamber or two, only a bulk read gets every sensor converted within a sensor interval.
+    if config.get("bulk_read"):
+        schedule = [(W1Bus(device_dir, sensors, read_timeout=read_timeout, read_retries=read_retries),
+                     config.get("sensor_interval"), 0, "sensors")]
+    else:
+        if len(chambers) > 2:
+            logger.warning("Reading the sensors of %s chambers one by one, enable bulk_read if they can't keep up",
+                           len(chambers))
+        schedule = [(sensor, config.get("sensor_interval"), 0, "sensors") for sensor in sensors]
+
+    schedule += [(controller, config.get("control_interval"), 2, "control") for controller in chamber_controllers]
+    schedule += [(config, config.get("config_interval"), 0, "control"),
+                 # shut down after the producers and before the sinks, so queued events still reach storage
+                 (event_bus, config.get("event_stats_interval") or 60, 0, "sinks"),
+                 (csv_writer, config.get("csv_interval"), 0, "sinks"),
+                 # listeners only update the frame, the panel is written from a lane nothing else waits on
+                 (display, 1 / (config.get("display_fps") or 2), 0, "display")]
+
+    if history_file:
+        # compact enough to keep every sensor reading, rather than one row per csv_interval
+        history_writer = HistoryWriter(data_collector, history_file,
+                                       config.get("history_flush_rows") or 1, config.get("history_flush_interval") or 0,
+                                       bool(config.get("csv_fsync")))
+        schedule += [(history_writer, config.get("sensor_interval"), 0, "sinks")]
+
+    if rollup is not None:
+        # closed windows are handed to the sinks from the rollup's run, next to the other sinks
+        rollup_writer = RollupCsvWriter(rollup.fields,
+                                        os.path.join(os.path.dirname(csv_file), config.get("rollup_file")),
+                                        bool(config.get("csv_fsync")))
+        rollup_listeners.append(rollup_writer)
+        schedule += [(rollup, config.get("sensor_interval"), 0, "sinks"),
+                     (rollup_writer, min(config.get("rollup_resolutions")), 0, "sinks")]
+
+    if secrets is not None:
+        # points are spooled to disk and flushed from a lane of their own, an outage never blocks the other sinks
+        spool = Spool(secrets.get("db_spool") or "influxdb.spool", secrets.get("db_spool_bytes") or 16 * 1024 * 1024)
+        influxdb_writer = InfluxDBWriter(secrets, data_collector, spool, create_emission(config))
+        influxdb_flusher = InfluxDBFlusher(secrets, spool)
+        rollup_listeners.append(influxdb_writer)
+        schedule += [(influxdb_writer, config.get("influxdb_interval"), 0, "sinks"),
+                     (influxdb_flusher, config.get("influxdb_interval"), 0, "network")]
+
+    return schedule, ssrs
+
+
+def create_emission(config: Config) -> Optional[Emission]:
+    # every sink keeps track of what it emitted itself, so each gets its own
+    max_age = config.get("emission_max_age")
+    if not max_age:
+        return None
+    return Emission(max_age, config.get("emission_deadbands") or {})
+
+
+def add_profiler(scheduler, config: Config) -> None:
+    # added last, so it knows every job and dumps their profiles after they were shut down
+    interval = config.get("profile_interval") or 600
+    scheduler.add(Profiler(config, list(scheduler.jobs), config.get("profile_dir") or "profiles"),
+                  interval, interval, "sinks")
+
+
+def run_threads(schedule, config: Config) -> None:
+    scheduler = Scheduler()
+    for runnable, interval, init_delay, lane in schedule:
+        scheduler.add(runnable, interval, init_delay, lane)
+    add_profiler(scheduler, config)
+
+    scheduler_thread = Thread(target=scheduler.start, name="scheduler")
+    scheduler_thread.start()
 
-    display = Display(["environment", "vessel", "fridge", "target"], ["heater", "cooler", "limiter"])
-    display.handle_temperature("target", config.get("target"), config.get("target"))
-
-    data_collector = DataCollector(["environment", "vessel", "fridge", "target"],
-                                   ["heater", "cooler", "limiter"])
-    csv_writer = CsvWriter(data_collector)
-    influxdb_writer = InfluxDBWriter(secrets, data_collector)
-
-    data_collector.handle_temperature("target", config.get("target"), config.get("target"))
-
-    env_sensor = Sensor("environment", "28-0301a2798a9f", "/sys/bus/w1/devices", config.get("average_window"),
-                        [display, data_collector])
-    vessel_sensor = Sensor("vessel", "28-0301a2799ddf", "/sys/bus/w1/devices", config.get("average_window"),
-                           [display, data_collector])
-    fridge_sensor = Sensor("fridge", "28-0301a27988e2", "/sys/bus/w1/devices", config.get("average_window"),
-                           [display, data_collector])
-
-    heater_ssr = Ssr("heater", 16, [display, data_collector])
-    cooler_ssr = Ssr("cooler", 20, [display, data_collector])
-
-    limiter = Limiter("limiter", heater_ssr, [display, data_collector])
+    shutdown.wait()
 
-    controller = Controller(config, config.get("control_interval"), config.get("control_deadband"),
-                            heater_ssr, cooler_ssr, limiter,
-                            vessel_sensor, fridge_sensor, [data_collector])
+    logger.info("Received interrupt, shutting down")
 
-    runnables = [(env_sensor, config.get("sensor_interval"), 0),
-                 (vessel_sensor, config.get("sensor_interval"), 0),
-                 (fridge_sensor, config.get("sensor_interval"), 0),
-                 (controller, config.get("control_interval"), 2),
-                 (config, config.get("config_interval"), 0),
-                 (csv_writer, config.get("csv_interval"), 0),
-                 (influxdb_writer, config.get("influxdb_interval"), 0)]
+    scheduler.stop()
+    scheduler_thread.join()
 
-    threads = []
-    for runnable, interval, init_delay in runnables:
-        t = Thread(target=runnable.start, args=(interval, init_delay))
-        threads.append(t)
-        t.start()
 
-    shutdown.wait()
+async def run_event_loop(schedule, config: Config) -> None:
+    scheduler = AsyncScheduler()
+    for runnable, interval, init_delay, lane in schedule:
+        scheduler.add(runnable, interval, init_delay, lane)
+    add_profiler(scheduler, config)
 
-    logger.info("Received interrupt, shutting down")
+    def stop() -> None:
+        logger.info("Received interrupt, shutting down")
+        scheduler.stop()
 
-    for index, (runnable, interval, init_delay) in enumerate(runnables):
-        runnable.stop()
-        threads[index].join()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, stop)
+    loop.add_signal_handler(signal.SIGTERM, stop)
 
-    display.shutdown()
-    heater_ssr.shutdown()
-    # cooler_ssr.shutdown()
+    await scheduler.start()
 
 
 if __name__ == '__main__':
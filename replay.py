@@ -0,0 +1,67 @@
+import argparse
+import csv
+import logging
+import sys
+
+from fermentation_controller.config import Config
+from fermentation_controller.replay import Replay, history_files, read_history
+
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.WARNING)
+
+
+def switch_cell(on):
+    # a log without switch columns has no recorded state to compare with
+    return "" if on is None else int(on)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged temperatures through the current controller")
+    parser.add_argument("history", nargs="*", default=["data.csv"],
+                        help="CSV logs, rotated -YYYYMMDD copies of each are included automatically")
+    parser.add_argument("--config", default="./config.json")
+    parser.add_argument("--output", help="write every decision to this CSV file")
+    parser.add_argument("--chamber", default="", help="name of the chamber to replay, when several are configured")
+    args = parser.parse_args()
+
+    files = [f for history in args.history for f in history_files(history)]
+    replay = Replay(Config(args.config), chamber=args.chamber)
+
+    output = open(args.output, "w", newline="") if args.output else None
+    writer = csv.writer(output) if output else None
+    if writer:
+        writer.writerow(["time", "vessel", "fridge", "heater", "cooler", "limiter", "p", "i", "d", "control",
+                         "recorded_heater", "recorded_cooler"])
+
+    decisions = 0
+    compared = 0
+    disagreements = 0
+    switches = 0
+    previous = None
+    for decision in replay.run(read_history(files)):
+        decisions += 1
+        if decision.recorded_heater is not None and decision.recorded_cooler is not None:
+            compared += 1
+            if (decision.heater, decision.cooler) != (decision.recorded_heater, decision.recorded_cooler):
+                disagreements += 1
+        if previous is not None and (decision.heater, decision.cooler) != previous:
+            switches += 1
+        previous = (decision.heater, decision.cooler)
+        if writer:
+            writer.writerow([decision.time, decision.vessel, decision.fridge,
+                             int(decision.heater), int(decision.cooler), int(decision.limiter),
+                             decision.p, decision.i, decision.d, decision.control,
+                             switch_cell(decision.recorded_heater), switch_cell(decision.recorded_cooler)])
+
+    if output:
+        output.close()
+
+    print("Replayed %s control decisions from %s file(s)" % (decisions, len(files)), file=sys.stderr)
+    if decisions:
+        print("Switch changes: %s" % switches, file=sys.stderr)
+    if compared:
+        print("Differing from the recorded switch state: %s of %s (%.1f%%)"
+              % (disagreements, compared, 100 * disagreements / compared), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from threading import Thread
+
+from fermentation_controller import clock, simulator
+from fermentation_controller.chamber import split_field
+
+gpio = simulator.install()
+
+# the fakes have to be in place before the display and SSRs get imported
+import main as app  # noqa: E402
+from fermentation_controller.config import Config  # noqa: E402
+from fermentation_controller.controller import Controller  # noqa: E402
+from fermentation_controller.plant import ThermalPlant  # noqa: E402
+from fermentation_controller.scheduler import Scheduler  # noqa: E402
+from fermentation_controller.sensor import Sensor  # noqa: E402
+from fermentation_controller.w1_bus import W1Bus  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def find_sensors(schedule):
+    sensors = []
+    for runnable, _, _, _ in schedule:
+        if isinstance(runnable, Sensor):
+            sensors.append(runnable)
+        elif isinstance(runnable, W1Bus):
+            sensors.extend(runnable.sensors)
+    return sensors
+
+
+def create_simulations(schedule, devices, gpio, environment: float, vessel: float, fridge: float):
+    # a plant of its own for every chamber, driven by the chamber's SSRs and feeding the chamber's sensors
+    sensors = find_sensors(schedule)
+    simulations = []
+    for controller in [runnable for runnable, _, _, _ in schedule if isinstance(runnable, Controller)]:
+        plant = ThermalPlant(environment=environment, vessel=vessel, fridge=fridge)
+        chamber_sensors = [(split_field(sensor.name)[1], sensor.device_id) for sensor in sensors
+                           if split_field(sensor.name)[0] == controller.name]
+        simulations.append((controller, simulator.Simulation(plant, devices, gpio, chamber_sensors,
+                                                             controller.heater.port, controller.cooler.port)))
+    return simulations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the controller against a simulated chamber in virtual time")
+    parser.add_argument("--config", default="./config.json")
+    parser.add_argument("--speed", type=float, default=1000, help="virtual seconds per real second")
+    parser.add_argument("--duration", type=float, default=24 * 3600, help="virtual seconds to simulate")
+    parser.add_argument("--step", type=float, default=1, help="virtual seconds between plant updates")
+    parser.add_argument("--environment", type=float, default=20.0)
+    parser.add_argument("--vessel", type=float, default=20.0)
+    parser.add_argument("--fridge", type=float, default=20.0)
+    parser.add_argument("--csv", help="keep the CSV output at this path")
+    parser.add_argument("--history", help="keep the binary history at this path")
+    args = parser.parse_args()
+
+    # missed deadlines end up in the report, don't flood the terminal with them at 1000x
+    logging.getLogger().setLevel(logging.ERROR)
+    clock.use(clock.ScaledClock(args.speed))
+
+    with tempfile.TemporaryDirectory() as device_dir:
+        devices = simulator.FakeW1Devices(device_dir)
+        csv_file = args.csv or os.path.join(device_dir, "data.csv")
+        history_file = args.history or os.path.join(device_dir, "data.bin")
+
+        config = Config(args.config)
+        schedule, hardware = app.create(config, None, device_dir, csv_file, history_file)
+
+        simulations = create_simulations(schedule, devices, gpio, args.environment, args.vessel, args.fridge)
+
+        scheduler = Scheduler()
+        for _, simulation in simulations:
+            scheduler.add(simulation, args.step, 0, "plant")
+        for runnable, interval, init_delay, lane in schedule:
+            scheduler.add(runnable, interval, init_delay, lane)
+
+        cpu_started = time.process_time()
+        wall_started = time.monotonic()
+
+        scheduler_thread = Thread(target=scheduler.start, name="scheduler")
+        scheduler_thread.start()
+        clock.sleep(args.duration)
+        scheduler.stop()
+        scheduler_thread.join()
+
+        cpu = time.process_time() - cpu_started
+        wall = time.monotonic() - wall_started
+
+        for device in hardware:
+            device.shutdown()
+
+    print("Simulated %.0fs in %.2fs wall, %.2fs CPU (%.3fs CPU per simulated hour)"
+          % (args.duration, wall, cpu, cpu / args.duration * 3600))
+    for controller, simulation in simulations:
+        print("Final temperatures%s: vessel %.2f, fridge %.2f, target %s"
+              % (" of " + controller.name if controller.name else "", simulation.plant.vessel,
+                 simulation.plant.fridge, controller.config.get_settings().target))
+    print()
+    print("%-28s %8s %8s %14s %14s %16s" % ("job", "runs", "missed", "mean run (ms)", "max run (ms)",
+                                            "max late (ms)"))
+    for job in scheduler.jobs:
+        # durations and lateness are measured in virtual time, report them as real time
+        mean = job.total_duration / job.runs if job.runs else 0.0
+        print("%-28s %8d %8d %14.3f %14.3f %16.3f"
+              % (job.name, job.runs, job.missed, clock.real_delay(mean) * 1000,
+                 clock.real_delay(job.max_duration) * 1000, clock.real_delay(job.max_lateness) * 1000))
+
+
+if __name__ == '__main__':
+    main()
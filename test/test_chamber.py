@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from fermentation_controller.chamber import LEGACY_CHAMBER, Chamber, ChamberConfig, chambers_from, field_name, \
+    split_field
+from fermentation_controller.config import Config, Settings
+
+FRIDGE1 = {"name": "fridge1", "sensors": {"vessel": "28-1", "fridge": "28-2"}, "heater_pin": 16, "cooler_pin": 20}
+FRIDGE2 = {"name": "fridge2", "sensors": {"vessel": "28-3", "fridge": "28-4", "environment": "28-5"},
+           "heater_pin": 21, "cooler_pin": 26, "target": 12.5, "p": 3}
+
+
+class TestFieldName:
+
+    def test_prefixes_named_chambers(self):
+        assert field_name("fridge2", "vessel") == "fridge2.vessel"
+        assert split_field("fridge2.vessel") == ("fridge2", "vessel")
+
+    def test_keeps_plain_names_of_unnamed_chamber(self):
+        assert field_name("", "vessel") == "vessel"
+        assert split_field("vessel") == ("", "vessel")
+
+
+class TestChambersFrom:
+
+    def test_defaults_to_legacy_chamber(self):
+        assert chambers_from(Settings()) == [LEGACY_CHAMBER]
+
+    def test_reads_configured_chambers(self):
+        chambers = chambers_from(Settings(chambers=(FRIDGE1, FRIDGE2)))
+
+        assert chambers == [Chamber("fridge1", FRIDGE1["sensors"], 16, 20),
+                            Chamber("fridge2", FRIDGE2["sensors"], 21, 26)]
+
+    @pytest.mark.parametrize("chamber", [
+        dict(FRIDGE2, name=""),
+        dict(FRIDGE2, name="fridge.2"),
+        dict(FRIDGE2, name="fridge1"),
+        dict(FRIDGE2, sensors={"vessel": "28-3"}),
+        dict(FRIDGE2, sensors={"vessel": "28-3", "fridge": "28-4", "wort": "28-5"}),
+        dict(FRIDGE2, cooler_pin=16),
+    ])
+    def test_rejects_invalid_chambers(self, chamber):
+        with pytest.raises(ValueError):
+            chambers_from(Settings(chambers=(FRIDGE1, chamber)))
+
+
+class TestChamberConfig:
+
+    def __config(self, tmp_path, **values) -> Config:
+        self.__write(tmp_path, **values)
+        return Config(str(tmp_path / "config.json"))
+
+    @staticmethod
+    def __write(tmp_path, **values) -> None:
+        (tmp_path / "config.json").write_text(json.dumps(values))
+
+    def test_overrides_shared_settings(self, tmp_path):
+        config = self.__config(tmp_path, target=18, p=1, chambers=[FRIDGE1, FRIDGE2])
+
+        fridge1 = ChamberConfig(config, "fridge1").get_settings()
+        fridge2 = ChamberConfig(config, "fridge2").get_settings()
+
+        assert (fridge1.target, fridge1.p) == (18, 1)
+        assert (fridge2.target, fridge2.p) == (12.5, 3)
+
+    def test_caches_settings_until_reload(self, tmp_path):
+        config = self.__config(tmp_path, target=18, chambers=[FRIDGE1, FRIDGE2])
+        chamber_config = ChamberConfig(config, "fridge2")
+        settings = chamber_config.get_settings()
+
+        assert chamber_config.get_settings() is settings
+
+        self.__write(tmp_path, target=18, chambers=[FRIDGE1, dict(FRIDGE2, target=4)])
+        config.run()
+
+        assert chamber_config.get_settings().target == 4
@@ -0,0 +1,32 @@
+from threading import Event
+from time import monotonic
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ScaledClock, SystemClock
+
+
+class TestClock:
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    def test_scaled_clock_runs_faster_than_real_time(self):
+        clock.use(ScaledClock(1000, epoch=100))
+
+        started = monotonic()
+        clock.sleep(50)
+
+        assert monotonic() - started < 1
+        assert clock.monotonic() >= 50
+        assert clock.time() >= 150
+
+    def test_waits_in_virtual_time(self):
+        clock.use(ScaledClock(1000))
+
+        started = monotonic()
+        assert clock.wait(Event(), 20) is False
+        assert monotonic() - started < 1
+
+    def test_converts_virtual_delays_to_real_ones(self):
+        assert ScaledClock(100).real_delay(5) == 0.05
+        assert SystemClock().real_delay(5) == 5
@@ -1,6 +1,13 @@
+import asyncio
+import json
+import os
+import time
+from threading import Event, Thread
 from unittest.mock import patch, mock_open
 
-from fermentation_controller.config import Config
+import pytest
+
+from fermentation_controller.config import CONFIG_SCHEMA, NUMBER, Config, Field, Settings, validate
 
 
 class TestConfig:
@@ -29,3 +36,180 @@ class TestConfig:
         config.run()
 
         assert config.get("p") == 5
+
+    @patch("builtins.open", new_callable=mock_open, read_data=config_data)
+    def test_reloads_config_on_event_loop(self, mock_config):
+        later_config_data = '{"p": 5}'
+
+        handlers = (mock_config.return_value, mock_open(read_data=later_config_data).return_value)
+        mock_config.side_effect = handlers
+
+        config = Config("config.json")
+        asyncio.run(config.run_async())
+
+        assert config.get("p") == 5
+
+    @patch("json.loads", wraps=json.loads)
+    @patch("builtins.open", new_callable=mock_open, read_data=config_data)
+    def test_skips_parsing_unchanged_config(self, _, mock_loads):
+        config = Config("config.json")
+        config.run()
+        config.run()
+
+        assert mock_loads.call_count == 1
+
+    def test_rejects_invalid_config_at_startup(self, tmp_path):
+        (tmp_path / "config.json").write_text('{"p": "high"}')
+
+        with pytest.raises(ValueError):
+            Config(str(tmp_path / "config.json"), {"p": Field(NUMBER)})
+
+    def test_keeps_previous_config_on_broken_edit(self, tmp_path):
+        filename = tmp_path / "config.json"
+        filename.write_text('{"p": 2}')
+        config = Config(str(filename), {"p": Field(NUMBER)})
+
+        filename.write_text('{"p": 3')
+        config.run()
+        assert config.get("p") == 2
+
+        filename.write_text('{"p": true}')
+        config.run()
+        assert config.get("p") == 2
+
+        filename.write_text('{"p": 4}')
+        config.run()
+        assert config.get("p") == 4
+
+    def test_rejects_unknown_filter_and_keeps_previous_config(self, tmp_path):
+        filename = tmp_path / "config.json"
+        filename.write_text('{"average_filter": "ema"}')
+        config = Config(str(filename), {"average_filter": CONFIG_SCHEMA["average_filter"]})
+
+        filename.write_text('{"average_filter": "emaa"}')
+        config.run()
+
+        assert config.get_settings().average_filter == "ema"
+        assert validate({"execution_mode": "fibers"}, {"execution_mode": CONFIG_SCHEMA["execution_mode"]}) == [
+            "execution_mode should be one of threads, asyncio, got 'fibers'"]
+
+    def test_config_is_read_only(self, tmp_path):
+        (tmp_path / "config.json").write_text('{"p": 2}')
+        config = Config(str(tmp_path / "config.json"))
+
+        with pytest.raises(TypeError):
+            config.config["p"] = 3
+
+    def test_validates_against_schema(self):
+        schema = {"interval": Field(NUMBER, positive=True), "deadband": Field(NUMBER, minimum=0),
+                  "mode": Field((str,), required=False), "window": Field((int,))}
+
+        assert validate({"interval": 1, "deadband": 0, "window": 3}, schema) == []
+        assert validate({"interval": 0, "deadband": -1, "mode": 1, "window": 2.5}, schema) == [
+            "interval should be positive, got 0", "deadband should be at least 0, got -1",
+            "mode should be str, got 1", "window should be int, got 2.5"]
+        assert validate({"deadband": 0, "window": 3}, schema) == ["interval is missing"]
+        assert validate([], schema) == ["expected an object, got list"]
+
+    def test_validates_items_of_lists(self):
+        schema = {"chambers": Field((list,), required=False, items={"name": Field((str,)), "pin": Field((int,))})}
+
+        assert validate({"chambers": [{"name": "a", "pin": 1}]}, schema) == []
+        assert validate({"chambers": [{"name": "a", "pin": 1}, {"pin": 1.5}, 3]}, schema) == [
+            "chambers[1]: name is missing", "chambers[1]: pin should be int, got 1.5",
+            "chambers[2]: expected an object, got int"]
+
+    def test_validates_values_of_lists(self):
+        schema = {"resolutions": Field((list,), required=False, items=Field(NUMBER, positive=True))}
+
+        assert validate({"resolutions": [60, 3600.0]}, schema) == []
+        assert validate({"resolutions": ["60", 0]}, schema) == [
+            "resolutions[0] should be int/float, got '60'", "resolutions[1] should be positive, got 0"]
+
+    def test_default_config_is_valid(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "config.json")) as file:
+            assert validate(json.load(file), CONFIG_SCHEMA) == []
+
+    def test_reloads_when_file_is_replaced(self, tmp_path):
+        filename = tmp_path / "config.json"
+        filename.write_text('{"p": 2}')
+        config = Config(str(filename))
+        config.watch()
+        try:
+            (tmp_path / "config.json.tmp").write_text('{"p": 5}')
+            os.replace(str(tmp_path / "config.json.tmp"), str(filename))
+
+            deadline = time.monotonic() + 2
+            while config.get("p") != 5 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert config.get("p") == 5
+        finally:
+            config.shutdown()
+
+    def test_publishes_typed_settings_with_defaults(self, tmp_path):
+        (tmp_path / "config.json").write_text('{"p": 2, "rollup_resolutions": [60], "unknown": 1}')
+        config = Config(str(tmp_path / "config.json"))
+
+        settings = config.get_settings()
+
+        assert settings.p == 2
+        assert settings.i == Settings().i
+        assert settings.rollup_resolutions == (60,)
+        with pytest.raises(AttributeError):
+            settings.p = 3
+
+    def test_settings_cover_schema(self):
+        assert set(CONFIG_SCHEMA) <= set(Settings._fields)
+
+    def test_calls_subscribers_only_when_their_keys_change(self, tmp_path):
+        filename = tmp_path / "config.json"
+        filename.write_text('{"p": 2, "i": 0}')
+        config = Config(str(filename))
+        p_changes = []
+        i_changes = []
+        config.subscribe(["p"], lambda settings: p_changes.append(settings.p))
+        config.subscribe(["i"], lambda settings: i_changes.append(settings.i))
+
+        filename.write_text('{"p": 3, "i": 0}')
+        config.run()
+
+        assert p_changes == [2, 3]
+        assert i_changes == [0]
+
+    def test_announces_change_once_when_reloaded_concurrently(self, tmp_path):
+        filename = tmp_path / "config.json"
+        filename.write_text('{"p": 2}')
+        config = Config(str(filename))
+        changes = []
+        config.subscribe(["p"], lambda settings: changes.append(settings.p))
+        filename.write_text('{"p": 3}')
+
+        # the watcher thread is still reading the change when run() starts a reload of its own
+        reading = Event()
+        proceed = Event()
+        read = config._Config__read
+
+        def slow_read():
+            if not reading.is_set():
+                reading.set()
+                proceed.wait(2)
+            return read()
+
+        with patch.object(config, "_Config__read", side_effect=slow_read):
+            watcher = Thread(target=config.run)
+            watcher.start()
+            reading.wait(2)
+            scheduled = Thread(target=config.run)
+            scheduled.start()
+            time.sleep(0.05)
+            proceed.set()
+            watcher.join()
+            scheduled.join()
+
+        assert changes == [2, 3]
+
+    def test_rejects_subscription_to_unknown_key(self, tmp_path):
+        (tmp_path / "config.json").write_text('{}')
+
+        with pytest.raises(ValueError):
+            Config(str(tmp_path / "config.json")).subscribe(["nope"], print)
@@ -2,6 +2,8 @@ from unittest.mock import patch, Mock, PropertyMock
 
 import pytest
 
+from fermentation_controller import clock
+from fermentation_controller.config import Settings
 from fermentation_controller.controller import Controller
 
 
@@ -9,9 +11,9 @@ class TestController:
 
     def setup_method(self):
         self.config = Mock()
-        self.config.get.side_effect = lambda key: {"p": 1, "i": 2, "d": 3, "target": 23,
-                                                   "heating_limit": 40,
-                                                   "limit_window": 5}.get(key)
+        self.config.get_settings.return_value = Settings(p=1, i=2, d=3, target=23,
+                                                         heating_limit=40,
+                                                         limit_window=5)
         self.limiter = Mock()
         self.limiter.get.return_value = False
 
@@ -38,7 +40,8 @@ class TestController:
 
         pid_mock_class.assert_called_with(Kp=1, Ki=2, Kd=3,
                                           setpoint=23,
-                                          sample_time=5)
+                                          sample_time=None,
+                                          time_fn=clock.monotonic)
 
     @patch('fermentation_controller.controller.PID')
     def test_updates_pid_values_on_control(self, pid_mock_class):
@@ -57,9 +60,9 @@ class TestController:
                                 self.current_temp, self.fridge_temp,
                                 [])
 
-        self.config.get.side_effect = lambda key: {"p": 4, "i": 5, "d": 6, "target": 23,
-                                                   "heating_limit": 40,
-                                                   "limit_window": 5}.get(key)
+        self.config.get_settings.return_value = Settings(p=4, i=5, d=6, target=23,
+                                                         heating_limit=40,
+                                                         limit_window=5)
 
         pid_mock.return_value = 5
 
@@ -91,11 +94,11 @@ class TestController:
         tunings_mock.assert_called_once_with()  # the getter, not the setter
 
     @patch('fermentation_controller.controller.PID')
-    def test_feeds_current_temperature_to_pid(self, pid_mock_class):
+    def test_feeds_unrounded_current_temperature_to_pid(self, pid_mock_class):
         pid_mock = pid_mock_class.return_value
 
         current_temp = Mock()
-        self.current_temp.get_average.return_value = current_temp
+        self.current_temp.get_filtered.return_value = current_temp
 
         tunings_mock = PropertyMock()
         type(pid_mock).tunings = tunings_mock
@@ -298,4 +301,70 @@ class TestController:
 
         controller.control()
 
-        self.listener.handle_controller.assert_called_with(4, 3, 2, .4)
+        self.listener.handle_controller.assert_called_with("", 4, 3, 2, .4)
+
+    @pytest.mark.parametrize("current_age, fridge_age, safe", [
+        (5, 5, False),
+        (31, 5, True),
+        (5, 31, True),
+        (float("inf"), 5, True),
+    ])
+    @patch('fermentation_controller.controller.PID')
+    def test_falls_back_to_safe_state_on_stale_readings(self, pid_mock_class, current_age, fridge_age, safe):
+        pid_mock = pid_mock_class.return_value
+        pid_mock.return_value = 3  # would trigger the heater
+
+        tunings_mock = PropertyMock()
+        type(pid_mock).tunings = tunings_mock
+        tunings_mock.return_value = (1, 2, 3)
+
+        components_mock = PropertyMock()
+        type(pid_mock).components = components_mock
+        components_mock.return_value = (4, 3, 2)
+
+        self.config.get_settings.return_value = Settings(p=1, i=2, d=3, target=23,
+                                                         heating_limit=40,
+                                                         limit_window=5,
+                                                         max_sensor_age=30)
+        self.current_temp.get_age.return_value = current_age
+        self.fridge_temp.get_age.return_value = fridge_age
+        self.heater.get.return_value = False
+        self.cooler.get.return_value = True
+
+        controller = Controller(self.config, 5, 0,
+                                self.heater, self.cooler, self.limiter,
+                                self.current_temp, self.fridge_temp,
+                                [])
+        controller.control()
+
+        if safe:
+            pid_mock.assert_not_called()
+            self.heater.set.assert_not_called()
+            self.cooler.set.assert_called_once_with(False)
+        else:
+            self.heater.set.assert_called_with(True)
+
+    def test_recomputes_on_every_run_despite_jitter(self):
+        manual = clock.ManualClock(1000.0)
+        clock.use(manual)
+        try:
+            self.config.get_settings.return_value = Settings(p=0, i=2, d=0, target=23, heating_limit=40,
+                                                             limit_window=5)
+            self.current_temp.get_filtered.return_value = 18
+            self.current_temp.get_age.return_value = 0
+            self.fridge_temp.get_age.return_value = 0
+            controller = Controller(self.config, 15, 0.5,
+                                    self.heater, self.cooler, self.limiter,
+                                    self.current_temp, self.fridge_temp,
+                                    [])
+            controller.control()
+            started = manual.monotonic()
+
+            # the scheduler fires at the interval, give or take a few ms
+            for jitter in [-0.004, 0.003, -0.001, -0.005, 0.0, 0.002, -0.003]:
+                manual.set(manual.time() + 15 + jitter)
+                controller.control()
+
+                assert controller.pid.components[1] == pytest.approx(2 * 5 * (manual.monotonic() - started))
+        finally:
+            clock.use(clock.SystemClock())
@@ -1,16 +1,24 @@
+import os
 from unittest.mock import patch, Mock
 
-from fermentation_controller.csv_writer import CsvWriter
+import pytest
 
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.csv_writer import CsvWriter, RollupCsvWriter
+from fermentation_controller.emission import Emission
+from fermentation_controller.metrics import SINK_ERRORS
+from fermentation_controller.replay import read_history
+from fermentation_controller.rollup import Stats
 
-class TestCsvWriter:
+HEADER = "time,control,cooler,d,environment,environment_avg,fridge,fridge_avg,heater,i,limiter,p," \
+         "target,target_avg,vessel,vessel_avg\r\n"
 
-    @patch("time.time")
-    @patch("builtins.open")
-    def test_writes_csv_to_file(self, mock_file, mock_time):
-        mock_time.return_value = 12.3
 
-        collected_data = {
+class TestCsvWriter:
+
+    def setup_method(self):
+        self.collected_data = {
             "environment": 1.2,
             "environment_avg": 1.3,
             "vessel": 2,
@@ -27,32 +35,197 @@ class TestCsvWriter:
             "d": -5.6,
             "control": 12.5,
         }
+        self.collector = Mock()
+        self.collector.valid_fields = list(self.collected_data)
+        self.collector.get_data_map.return_value = self.collected_data
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    @patch("time.time")
+    def test_writes_csv_to_file(self, mock_time, tmp_path):
+        mock_time.return_value = 12.3
+        filename = str(tmp_path / "data.csv")
+
+        writer = CsvWriter(self.collector, filename)
+        writer.run()
+
+        with open(filename, newline="") as file:
+            assert file.read() == HEADER + "12.3,12.5,0,-5.6,1.2,1.3,3,3.3,1,3.4,1,2.3,31.2,31.3,2,2.3\r\n"
+
+    def test_writes_no_data_if_nothing_was_collected(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        self.collector.get_data_map.return_value = None
+
+        writer = CsvWriter(self.collector, filename)
+        writer.run()
+        writer.shutdown()
+
+        with open(filename, newline="") as file:
+            assert file.read() == HEADER
+
+    def test_does_not_repeat_header_when_appending(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        CsvWriter(self.collector, filename).shutdown()
 
-        collector = Mock()
-        collector.get_data_map.return_value = collected_data
+        writer = CsvWriter(self.collector, filename)
+        writer.run()
+        writer.shutdown()
+
+        with open(filename, newline="") as file:
+            assert file.read().count("time,") == 1
+
+    def test_sets_aside_file_with_other_columns(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        writer = CsvWriter(self.collector, filename)
+        writer.run()
+        writer.shutdown()
+
+        chamber = Mock()
+        chamber.valid_fields = ["lager." + name for name in self.collected_data]
+        chamber.get_data_map.return_value = {"lager." + name: value for name, value in self.collected_data.items()}
+        writer = CsvWriter(chamber, filename)
+        writer.run()
+        writer.shutdown()
 
-        writer = CsvWriter(collector)
+        assert list(read_history([filename]))[0]["lager.vessel"] == 2
+        aside = [f for f in os.listdir(str(tmp_path)) if f.startswith("data.csv.")]
+        assert len(aside) == 1
+        assert list(read_history([str(tmp_path / aside[0])]))[0]["vessel"] == 2
+
+    def test_buffers_rows_until_flush_rows(self, tmp_path):
+        clock.use(ManualClock(0.0))
+        filename = str(tmp_path / "data.csv")
+        writer = CsvWriter(self.collector, filename, flush_rows=3, flush_interval=300)
+
+        writer.run()
         writer.run()
+        assert len(list(read_history([filename]))) == 0
 
-        handle = mock_file()
-        handle.write.assert_called_once_with('12.3,12.5,0,-5.6,1.2,1.3,3,3.3,1,3.4,1,2.3,31.2,31.3,2,2.3\r\n')
-        handle.flush.assert_called()
+        writer.run()
+        assert len(list(read_history([filename]))) == 3
 
-    @patch("builtins.open")
-    def test_writes_no_data_if_nothing_was_collected(self, mock_file):
-        collector = Mock()
-        collector.get_data_map.return_value = None
+    def test_flushes_after_flush_interval(self, tmp_path):
+        manual = ManualClock(0.0)
+        clock.use(manual)
+        filename = str(tmp_path / "data.csv")
+        writer = CsvWriter(self.collector, filename, flush_rows=100, flush_interval=300)
 
-        writer = CsvWriter(collector)
         writer.run()
+        manual.set(299.0)
+        writer.run()
+        assert len(list(read_history([filename]))) == 0
+
+        manual.set(300.0)
+        writer.run()
+        assert len(list(read_history([filename]))) == 3
+
+    def test_flushes_and_closes_file_on_shutdown(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        writer = CsvWriter(self.collector, filename, flush_rows=100, flush_interval=300)
+
+        writer.run()
+        writer.shutdown()
+
+        assert len(list(read_history([filename]))) == 1
+        assert writer.file.file.closed
+
+    def test_counts_failed_writes_and_keeps_rows(self, tmp_path):
+        errors = SINK_ERRORS.labels("csv").value
+        writer = CsvWriter(self.collector, str(tmp_path / "data.csv"))
+        writer.file.write = Mock(side_effect=OSError("disk full"))
+
+        with pytest.raises(OSError):
+            writer.run()
+
+        assert SINK_ERRORS.labels("csv").value == errors + 1
+        assert len(writer.rows) == 1
+
+    @patch("os.fsync")
+    def test_fsyncs_on_flush_if_configured(self, mock_fsync, tmp_path):
+        writer = CsvWriter(self.collector, str(tmp_path / "data.csv"), fsync=True)
+        mock_fsync.reset_mock()
+
+        writer.run()
+
+        mock_fsync.assert_called_once_with(writer.file.file.fileno())
+
+    def test_writes_header_again_after_copytruncate(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        writer = CsvWriter(self.collector, filename)
+        writer.run()
+
+        with open(filename, "r+") as file:
+            file.truncate(0)
+        writer.run()
+
+        with open(filename, newline="") as file:
+            content = file.read()
+        assert content.startswith(HEADER)
+        assert content.count("\r\n") == 2
+
+    def test_reopens_file_that_was_moved_away(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        writer = CsvWriter(self.collector, filename)
+        writer.run()
+
+        os.rename(filename, filename + "-20200101")
+        writer.run()
+
+        assert len(list(read_history([filename + "-20200101"]))) == 1
+        assert len(list(read_history([filename]))) == 1
+
+    def test_leaves_fields_without_emission_empty(self, tmp_path):
+        clock.use(ManualClock(0.0))
+        filename = str(tmp_path / "data.csv")
+        writer = CsvWriter(self.collector, filename, emission=Emission(60, {"vessel": 0.5}))
+
+        writer.run()
+        writer.run()
+        self.collected_data["vessel"] = 3
+        self.collected_data["heater"] = 0
+        writer.run()
+
+        with open(filename, newline="") as file:
+            lines = file.read().splitlines()
+        assert len(lines) == 3
+        assert lines[2] == "0.0,,,,,,,,0,,,,,,3,"
+        assert list(read_history([filename]))[1]["fridge"] == 3
+
+
+class TestRollupCsvWriter:
+
+    def test_writes_rollups_with_header(self, tmp_path):
+        filename = str(tmp_path / "rollup.csv")
+        writer = RollupCsvWriter(["vessel", "heater"], filename)
+
+        writer.handle_rollup(60, 960, {"vessel": Stats(19.0, 21.0, 20.0, 3)})
+        writer.handle_rollup(3600, 0, {"vessel": Stats(19.0, 21.0, 20.0, 3), "heater": Stats(0, 1, 0.25, 4)})
+        writer.run()
+
+        with open(filename, newline="") as file:
+            assert file.read().splitlines() == [
+                "time,resolution,vessel_min,vessel_max,vessel_mean,vessel_count,"
+                "heater_min,heater_max,heater_mean,heater_count",
+                "960,60,19.0,21.0,20.0,3,,,,",
+                "0,3600,19.0,21.0,20.0,3,0,1,0.25,4"]
+
+    def test_sets_aside_rollups_of_other_fields(self, tmp_path):
+        filename = str(tmp_path / "rollup.csv")
+        RollupCsvWriter(["vessel"], filename).shutdown()
+
+        RollupCsvWriter(["lager.vessel"], filename).shutdown()
+
+        with open(filename, newline="") as file:
+            assert file.readline().startswith("time,resolution,lager.vessel_min")
+        assert len([f for f in os.listdir(str(tmp_path)) if f.startswith("rollup.csv.")]) == 1
 
-        handle = mock_file()
-        handle.write.assert_not_called()
+    def test_writes_pending_rollups_on_shutdown(self, tmp_path):
+        filename = str(tmp_path / "rollup.csv")
+        writer = RollupCsvWriter(["vessel"], filename)
 
-    @patch("builtins.open")
-    def test_close_file_on_shutdown(self, mock_file):
-        writer = CsvWriter(Mock())
+        writer.handle_rollup(60, 960, {"vessel": Stats(19.0, 21.0, 20.0, 3)})
         writer.shutdown()
 
-        handle = mock_file()
-        handle.close.assert_called()
+        assert len(list(read_history([filename]))) == 1
+        assert writer.file.file.closed
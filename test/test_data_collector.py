@@ -1,3 +1,8 @@
+from threading import Event, Thread
+from unittest.mock import patch
+
+import pytest
+
 from fermentation_controller.data_collector import DataCollector
 
 
@@ -13,7 +18,7 @@ class TestDataCollector:
         collector.handle_switch("heater", True)
         collector.handle_switch("cooler", False)
         collector.handle_switch("limiter", True)
-        collector.handle_controller(2.3, 3.4, -5.6, 12.5)
+        collector.handle_controller("", 2.3, 3.4, -5.6, 12.5)
 
         collector.handle_switch("something-not-configured", False)
 
@@ -45,3 +50,99 @@ class TestDataCollector:
         # the rest is not yet updated
 
         assert collector.get_data_map() is None
+
+    @patch("time.time")
+    def test_keeps_history_for_configured_horizon(self, mock_time):
+        collector = DataCollector(["vessel"], ["heater"], horizon=3, sample_interval=1)
+
+        for n in range(5):
+            mock_time.return_value = float(n)
+            collector.handle_temperature("vessel", n * 10.0, n * 10.0 + 1)
+        collector.handle_switch("heater", True)
+
+        times, values = collector.get_history("vessel").window()
+        assert list(times) == [2.0, 3.0, 4.0]
+        assert list(values) == [20.0, 30.0, 40.0]
+        assert list(collector.get_history("vessel_avg").window()[1]) == [21.0, 31.0, 41.0]
+        assert collector.get_history("heater").latest() == (4.0, 1.0)
+
+    def test_keeps_no_history_without_horizon(self):
+        collector = DataCollector(["vessel"], ["heater"])
+
+        collector.handle_temperature("vessel", 1.0, 1.0)
+
+        assert collector.get_history("vessel") is None
+
+    @patch("time.time")
+    def test_snapshot_holds_values_with_update_times(self, mock_time):
+        collector = DataCollector(["vessel"], ["heater"])
+        mock_time.return_value = 10.0
+        collector.handle_temperature("vessel", 19.5, 19.4)
+        mock_time.return_value = 12.0
+        collector.handle_switch("heater", True)
+
+        snapshot = collector.get_snapshot()
+
+        assert snapshot.version == 2
+        assert snapshot.values == {"vessel": 19.5, "vessel_avg": 19.4, "heater": 1}
+        assert snapshot.updated == {"vessel": 10.0, "vessel_avg": 10.0, "heater": 12.0}
+
+    def test_snapshot_is_immutable_and_unaffected_by_later_updates(self):
+        collector = DataCollector(["vessel"], ["heater"])
+        collector.handle_temperature("vessel", 19.5, 19.4)
+
+        snapshot = collector.get_snapshot()
+        collector.handle_temperature("vessel", 20.5, 20.4)
+
+        assert snapshot.values["vessel"] == 19.5
+        assert collector.get_snapshot().values["vessel"] == 20.5
+        with pytest.raises(TypeError):
+            snapshot.values["vessel"] = 1.0
+
+    def test_shares_snapshot_until_next_update(self):
+        collector = DataCollector(["vessel"], ["heater"])
+        collector.handle_temperature("vessel", 19.5, 19.4)
+
+        assert collector.get_snapshot() is collector.get_snapshot()
+
+    def test_warns_once_per_unknown_field(self, caplog):
+        collector = DataCollector(["vessel"], ["heater"])
+
+        collector.handle_switch("something-not-configured", False)
+        collector.handle_switch("something-not-configured", True)
+
+        assert len([r for r in caplog.records if "something-not-configured" in r.getMessage()]) == 1
+        assert collector.get_snapshot().values == {}
+
+    def test_namespaces_controller_terms_by_chamber(self):
+        collector = DataCollector(["fridge1.vessel", "fridge2.vessel"], [], controllers=["fridge1", "fridge2"])
+
+        collector.handle_temperature("fridge2.vessel", 12.0, 12.1)
+        collector.handle_controller("fridge1", 1, 2, 3, 6)
+        collector.handle_controller("fridge2", -1, -2, -3, -6)
+        collector.handle_controller("", 7, 7, 7, 7)
+
+        assert collector.get_snapshot().values == {
+            "fridge2.vessel": 12.0, "fridge2.vessel_avg": 12.1,
+            "fridge1.p": 1, "fridge1.i": 2, "fridge1.d": 3, "fridge1.control": 6,
+            "fridge2.p": -1, "fridge2.i": -2, "fridge2.d": -3, "fridge2.control": -6}
+
+    def test_snapshots_never_mix_controller_updates(self):
+        collector = DataCollector([], [])
+        stop = Event()
+
+        def update():
+            n = 0
+            while not stop.is_set():
+                n += 1
+                collector.handle_controller("", n, n, n, n)
+
+        thread = Thread(target=update)
+        thread.start()
+        try:
+            for _ in range(2000):
+                values = collector.get_snapshot().values
+                assert len(set(values.values())) <= 1
+        finally:
+            stop.set()
+            thread.join()
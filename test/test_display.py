@@ -1,9 +1,9 @@
-from time import sleep
 from threading import Thread
 
-from unittest.mock import Mock, PropertyMock, patch, call
+from unittest.mock import PropertyMock, patch, call
 
-from fermentation_controller.display import Display
+from fermentation_controller.display import Display, changed_runs
+from fermentation_controller.simulator import FakeCharLCD
 
 
 class TestDisplay:
@@ -16,63 +16,107 @@ class TestDisplay:
 
         lcd_mock.clear.assert_called()
 
-    @patch('fermentation_controller.display.CharLCD')
-    def test_writes_temperatures_to_lcd(self, lcd_mock_class):
-        lcd_mock = lcd_mock_class.return_value
+    @patch('fermentation_controller.display.CharLCD', FakeCharLCD)
+    def test_writes_temperatures_to_lcd(self):
+        display = Display(["environment", "vessel", "fridge", "target"], [])
 
-        cursor_mock = PropertyMock()
-        type(lcd_mock).cursor_pos = cursor_mock
+        display.handle_temperature("environment", 12.3, 3)
+        display.handle_temperature("vessel", 14.3, 3)
+        display.handle_temperature("fridge", 11.3, 3)
+        display.handle_temperature("target", 22.3, 3)
+        display.run()
 
-        display = Display(["environment", "vessel", "fridge", "target"], [])
+        assert display.lcd.text() == ["E 12.3 V 14.3   ",
+                                      "F 11.3 T 22.3   "]
+
+    @patch('fermentation_controller.display.CharLCD', FakeCharLCD)
+    def test_clears_digits_of_longer_previous_value(self):
+        display = Display(["environment"], [])
 
         display.handle_temperature("environment", 12.3, 3)
-        cursor_mock.assert_called_with((0, 0))
-        lcd_mock.write_string.assert_called_with("E 12.3")
+        display.run()
+        display.handle_temperature("environment", 9.5, 3)
+        display.run()
 
-        display.handle_temperature("vessel", 14.3, 3)
-        cursor_mock.assert_called_with((0, 7))
-        lcd_mock.write_string.assert_called_with("V 14.3")
+        assert display.lcd.text()[0] == "E 9.5           "
 
-        display.handle_temperature("fridge", 11.3, 3)
-        cursor_mock.assert_called_with((1, 0))
-        lcd_mock.write_string.assert_called_with("F 11.3")
+    @patch('fermentation_controller.display.CharLCD', FakeCharLCD)
+    def test_writes_switches_to_lcd(self):
+        display = Display([], ["heater", "cooler", "limiter"])
 
-        display.handle_temperature("target", 22.3, 3)
-        cursor_mock.assert_called_with((1, 7))
-        lcd_mock.write_string.assert_called_with("T 22.3")
+        display.handle_switch("heater", True)
+        display.handle_switch("cooler", True)
+        display.handle_switch("limiter", True)
+        display.run()
+        assert display.lcd.text() == [" " * 14 + "HL", " " * 14 + "C "]
+
+        display.handle_switch("heater", False)
+        display.handle_switch("limiter", False)
+        display.run()
+        assert display.lcd.text() == [" " * 16, " " * 14 + "C "]
+
+    @patch('fermentation_controller.display.CharLCD', FakeCharLCD)
+    def test_labels_chamber_fields_by_their_base_name(self):
+        display = Display(["fridge1.vessel"], ["fridge1.heater"])
+
+        display.handle_temperature("fridge1.vessel", 14.3, 3)
+        display.handle_temperature("fridge2.vessel", 4.0, 3)
+        display.handle_switch("fridge1.heater", True)
+        display.run()
+
+        assert display.lcd.text() == ["V 14.3        H ", " " * 16]
 
     @patch('fermentation_controller.display.CharLCD')
-    def test_writes_switches_to_lcd(self, lcd_mock_class):
+    def test_only_sends_changed_characters(self, lcd_mock_class):
         lcd_mock = lcd_mock_class.return_value
-
         cursor_mock = PropertyMock()
         type(lcd_mock).cursor_pos = cursor_mock
+        display = Display(["environment"], [])
+        display.handle_temperature("environment", 12.3, 3)
+        display.run()
+        cursor_mock.reset_mock()
+        lcd_mock.write_string.reset_mock()
 
-        display = Display([], ["heater", "cooler", "limiter"])
+        display.handle_temperature("environment", 12.3, 3)
+        display.run()
+        lcd_mock.write_string.assert_not_called()
 
-        display.handle_switch("heater", True)
-        cursor_mock.assert_called_with((0, 14))
-        lcd_mock.write_string.assert_called_with("H")
+        display.handle_temperature("environment", 12.4, 3)
+        display.run()
+        cursor_mock.assert_called_once_with((0, 5))
+        lcd_mock.write_string.assert_called_once_with("4")
 
-        display.handle_switch("heater", False)
-        cursor_mock.assert_called_with((0, 14))
-        lcd_mock.write_string.assert_called_with(" ")
+    @patch('fermentation_controller.display.CharLCD')
+    def test_coalesces_nearby_changes_into_one_write(self, lcd_mock_class):
+        lcd_mock = lcd_mock_class.return_value
+        cursor_mock = PropertyMock()
+        type(lcd_mock).cursor_pos = cursor_mock
+        display = Display(["environment"], [])
+        display.handle_temperature("environment", 12.3, 3)
+        display.run()
+        cursor_mock.reset_mock()
+        lcd_mock.write_string.reset_mock()
 
-        display.handle_switch("cooler", True)
-        cursor_mock.assert_called_with((1, 14))
-        lcd_mock.write_string.assert_called_with("C")
+        display.handle_temperature("environment", 13.4, 3)
+        display.run()
+
+        cursor_mock.assert_called_once_with((0, 3))
+        lcd_mock.write_string.assert_called_once_with("3.4")
 
-        display.handle_switch("cooler", False)
-        cursor_mock.assert_called_with((1, 14))
-        lcd_mock.write_string.assert_called_with(" ")
+    @patch('fermentation_controller.display.CharLCD')
+    def test_skips_cursor_move_when_already_in_place(self, lcd_mock_class):
+        lcd_mock = lcd_mock_class.return_value
+        cursor_mock = PropertyMock()
+        type(lcd_mock).cursor_pos = cursor_mock
+        display = Display([], ["heater", "cooler", "limiter"])
 
+        display.handle_switch("heater", True)
+        display.run()
         display.handle_switch("limiter", True)
-        cursor_mock.assert_called_with((0, 15))
-        lcd_mock.write_string.assert_called_with("L")
+        display.run()
 
-        display.handle_switch("limiter", False)
-        cursor_mock.assert_called_with((0, 15))
-        lcd_mock.write_string.assert_called_with(" ")
+        cursor_mock.assert_called_once_with((0, 14))
+        assert lcd_mock.write_string.call_args_list == [call("H"), call("L")]
 
     @patch('fermentation_controller.display.CharLCD')
     def test_does_not_write_unknown_devices(self, lcd_mock_class):
@@ -85,40 +129,57 @@ class TestDisplay:
 
         display.handle_switch("inbetweener", True)
         display.handle_temperature("tropics", 42.3, 3)
+        display.run()
 
         cursor_mock.assert_not_called()
         lcd_mock.write_string.assert_not_called()
 
     @patch('fermentation_controller.display.CharLCD')
-    def test_writing_is_threadsafe(self, lcd_mock_class):
+    def test_listeners_never_touch_the_lcd(self, lcd_mock_class):
         lcd_mock = lcd_mock_class.return_value
-
         cursor_mock = PropertyMock()
-        cursor_mock.side_effect = self.__delay
         type(lcd_mock).cursor_pos = cursor_mock
-
         display = Display(["environment"], ["heater"])
 
-        manager = Mock()
-        manager.attach_mock(lcd_mock, 'lcd_mock')
-        manager.cursor_mock = cursor_mock
-
-        t1 = Thread(target=display.handle_temperature, args=("environment", 12.3, 3))
-        t2 = Thread(target=display.handle_switch, args=("heater", True,))
-        t1.start()
-        t2.start()
-        t1.join()
-        t2.join()
-
-        calls_in_order = [
-            call.cursor_mock((0, 0)),
-            call.lcd_mock.write_string("E 12.3"),
-            call.cursor_mock((0, 14)),
-            call.lcd_mock.write_string("H")
-        ]
-
-        assert manager.mock_calls == calls_in_order
-
-    @staticmethod
-    def __delay(_: tuple) -> None:
-        sleep(0.01)
+        display.handle_temperature("environment", 12.3, 3)
+        display.handle_switch("heater", True)
+
+        cursor_mock.assert_not_called()
+        lcd_mock.write_string.assert_not_called()
+
+    @patch('fermentation_controller.display.CharLCD')
+    def test_renders_only_the_latest_of_updates_between_frames(self, lcd_mock_class):
+        lcd_mock = lcd_mock_class.return_value
+        display = Display(["environment"], [])
+
+        display.handle_temperature("environment", 12.3, 3)
+        display.handle_temperature("environment", 12.4, 3)
+        display.handle_temperature("environment", 12.5, 3)
+        display.run()
+
+        lcd_mock.write_string.assert_called_once_with("E 12.5")
+
+    @patch('fermentation_controller.display.CharLCD', FakeCharLCD)
+    def test_drawing_is_threadsafe(self):
+        display = Display(["environment", "vessel"], ["heater", "cooler"])
+
+        threads = [Thread(target=display.handle_temperature, args=("environment", 12.3, 3)),
+                   Thread(target=display.handle_temperature, args=("vessel", 14.3, 3)),
+                   Thread(target=display.handle_switch, args=("heater", True)),
+                   Thread(target=display.handle_switch, args=("cooler", True))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        display.run()
+
+        assert display.lcd.text() == ["E 12.3 V 14.3 H ", " " * 14 + "C "]
+
+
+class TestChangedRuns:
+
+    def test_finds_changed_runs(self):
+        assert changed_runs("E 12.3", "E 12.3") == []
+        assert changed_runs("E 12.3", "E 12.4") == [(5, 6)]
+        assert changed_runs("E 12.3", "E 13.4") == [(3, 6)]
+        assert changed_runs("E 12.3", "E 22.4") == [(2, 3), (5, 6)]
@@ -0,0 +1,50 @@
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.emission import Emission
+
+
+class TestEmission:
+
+    def setup_method(self):
+        self.clock = ManualClock(0.0)
+        clock.use(self.clock)
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    def test_emits_everything_the_first_time(self):
+        emission = Emission(60, {"vessel": 0.1})
+
+        assert emission.select({"vessel": 19.5, "heater": 0}) == {"vessel": 19.5, "heater": 0}
+
+    def test_emits_only_fields_that_moved_beyond_their_deadband(self):
+        emission = Emission(60, {"vessel": 0.1})
+        emission.select({"vessel": 19.5, "heater": 0})
+
+        assert emission.select({"vessel": 19.55, "heater": 0}) == {}
+        assert emission.select({"vessel": 19.65, "heater": 1}) == {"vessel": 19.65, "heater": 1}
+
+    def test_compares_against_last_emitted_value(self):
+        emission = Emission(60, {"vessel": 0.1})
+        emission.select({"vessel": 19.5})
+
+        # a slow drift still gets emitted once it adds up to more than the deadband
+        assert emission.select({"vessel": 19.56}) == {}
+        assert emission.select({"vessel": 19.62}) == {"vessel": 19.62}
+
+    def test_emits_unchanged_fields_once_max_age_expires(self):
+        emission = Emission(60, default_deadband=1.0)
+        emission.select({"vessel": 19.5, "heater": 0})
+
+        self.clock.set(59.0)
+        assert emission.select({"vessel": 19.5, "heater": 0}) == {}
+
+        self.clock.set(60.0)
+        assert emission.select({"vessel": 19.5, "heater": 0}) == {"vessel": 19.5, "heater": 0}
+
+    def test_chamber_fields_fall_back_to_deadband_of_their_base_field(self):
+        emission = Emission(60, {"vessel": 0.1, "fridge2.fridge": 1.0}, default_deadband=0.5)
+        emission.select({"fridge2.vessel": 19.5, "fridge2.fridge": 4.0, "fridge2.heater": 0})
+
+        assert emission.select({"fridge2.vessel": 19.65, "fridge2.fridge": 4.6, "fridge2.heater": 0.4}) == {
+            "fridge2.vessel": 19.65}
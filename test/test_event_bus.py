@@ -0,0 +1,184 @@
+from threading import Event, Thread
+from unittest.mock import Mock, call
+
+import pytest
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.controller import ControllerListener
+from fermentation_controller.data_collector import DataCollector
+from fermentation_controller.event_bus import BLOCK, DROP_OLDEST, EventBus, Subscription, TemperatureEvent
+from fermentation_controller.sensor import SensorListener
+from fermentation_controller.switch import SwitchListener
+
+
+class SlowListener(SensorListener):
+
+    def __init__(self):
+        self.release = Event()
+        self.started = Event()
+        self.temperatures = []
+
+    def handle_temperature(self, name: str, temperature: float, avg_temperature: float, timestamp=None) -> None:
+        self.started.set()
+        self.release.wait(5)
+        self.temperatures.append(temperature)
+
+
+class TestEventBus:
+
+    def setup_method(self):
+        clock.use(ManualClock(100.0))
+        self.bus = EventBus()
+
+    def teardown_method(self):
+        self.bus.shutdown()
+        clock.use(SystemClock())
+
+    def test_delivers_events_by_listener_interface(self):
+        sensor_listener = Mock(spec=SensorListener)
+        switch_listener = Mock(spec=SwitchListener)
+        collector = DataCollector(["vessel"], ["heater"])
+        self.bus.subscribe(sensor_listener)
+        self.bus.subscribe(switch_listener)
+        self.bus.subscribe(collector)
+
+        self.bus.handle_temperature("vessel", 19.5, 19.4)
+        self.bus.handle_switch("heater", True)
+        self.bus.handle_controller("", 1, 2, 3, 6)
+        self.bus.shutdown()
+
+        sensor_listener.handle_temperature.assert_called_once_with("vessel", 19.5, 19.4, 100.0)
+        switch_listener.handle_switch.assert_called_once_with("heater", True, 100.0)
+        snapshot = collector.get_snapshot()
+        assert (snapshot.values["vessel"], snapshot.values["heater"], snapshot.values["control"]) == (19.5, 1, 6)
+
+    def test_keeps_order_of_events(self):
+        listener = Mock(spec=SwitchListener)
+        self.bus.subscribe(listener)
+
+        for on in [True, False, True]:
+            self.bus.handle_switch("heater", on)
+        self.bus.shutdown()
+
+        assert listener.handle_switch.call_args_list == [call("heater", True, 100.0), call("heater", False, 100.0),
+                                                         call("heater", True, 100.0)]
+
+    def test_queued_events_keep_their_publish_time(self):
+        collector = DataCollector(["vessel"], [])
+        subscription = Subscription(collector, 4)
+        subscription.put(TemperatureEvent("vessel", 19.5, 19.4, 100.0))
+
+        clock.current.set(160.0)
+        subscription.start()
+        subscription.close()
+
+        assert collector.get_snapshot().updated["vessel"] == 100.0
+
+    def test_rejects_listeners_without_events(self):
+        with pytest.raises(ValueError):
+            self.bus.subscribe(Mock(spec=[]))
+
+    def test_rejects_unknown_policy(self):
+        with pytest.raises(ValueError):
+            Subscription(Mock(spec=SensorListener), 1, "drop_newest")
+
+    def test_drops_oldest_events_when_full(self):
+        listener = SlowListener()
+        subscription = self.bus.subscribe(listener, 2, DROP_OLDEST)
+        self.bus.handle_temperature("vessel", 1, 1)
+        assert listener.started.wait(5)
+
+        for temperature in [2, 3, 4]:
+            self.bus.handle_temperature("vessel", temperature, temperature)
+        listener.release.set()
+        self.bus.shutdown()
+
+        assert listener.temperatures == [1, 3, 4]
+        assert subscription.stats().dropped == 1
+
+    def test_blocks_producer_when_full(self):
+        listener = SlowListener()
+        subscription = self.bus.subscribe(listener, 1, BLOCK)
+        self.bus.handle_temperature("vessel", 1, 1)
+        assert listener.started.wait(5)
+        self.bus.handle_temperature("vessel", 2, 2)
+
+        producer = Thread(target=self.bus.handle_temperature, args=("vessel", 3, 3))
+        producer.start()
+        producer.join(0.1)
+        assert producer.is_alive()
+
+        listener.release.set()
+        producer.join(5)
+        self.bus.shutdown()
+
+        assert listener.temperatures == [1, 2, 3]
+        assert subscription.stats().blocked == 1
+        assert subscription.stats().dropped == 0
+
+    def test_slow_listener_does_not_delay_others(self):
+        slow = SlowListener()
+        fast = Mock(spec=SensorListener)
+        handled = Event()
+        fast.handle_temperature.side_effect = lambda *args: handled.set()
+        self.bus.subscribe(slow)
+        self.bus.subscribe(fast)
+
+        self.bus.handle_temperature("vessel", 1, 1)
+
+        assert handled.wait(5)
+        assert slow.temperatures == []
+        slow.release.set()
+
+    def test_failing_listener_keeps_handling_events(self):
+        listener = Mock(spec=ControllerListener)
+        listener.handle_controller.side_effect = [RuntimeError("boom"), None]
+        subscription = self.bus.subscribe(listener)
+
+        self.bus.handle_controller("", 1, 2, 3, 6)
+        self.bus.handle_controller("", 1, 2, 3, 7)
+        self.bus.shutdown()
+
+        assert listener.handle_controller.call_count == 2
+        assert subscription.stats().handled == 2
+
+    def test_reports_queue_depth_and_handling_time(self):
+        listener = SlowListener()
+        self.bus.subscribe(listener, 4, name="slow")
+        self.bus.handle_temperature("vessel", 1, 1)
+        assert listener.started.wait(5)
+        self.bus.handle_temperature("vessel", 2, 2)
+
+        stats = self.bus.stats()[0]
+        assert (stats.name, stats.depth, stats.capacity, stats.handled) == ("slow", 1, 4, 0)
+
+        listener.release.set()
+        self.bus.shutdown()
+        stats = self.bus.stats()[0]
+        assert (stats.depth, stats.handled) == (0, 2)
+        assert stats.max_time >= stats.mean_time >= 0
+
+    def test_warns_about_new_drops_once(self, caplog):
+        listener = SlowListener()
+        self.bus.subscribe(listener, 1, DROP_OLDEST)
+        self.bus.handle_temperature("vessel", 1, 1)
+        assert listener.started.wait(5)
+        self.bus.handle_temperature("vessel", 2, 2)
+        self.bus.handle_temperature("vessel", 3, 3)
+
+        self.bus.run()
+        self.bus.run()
+        listener.release.set()
+
+        assert [r.message for r in caplog.records if r.levelname == "WARNING"] == \
+            ["SlowListener is falling behind, dropped 1 event(s)"]
+
+    def test_ignores_events_after_shutdown(self):
+        listener = Mock(spec=SensorListener)
+        self.bus.subscribe(listener)
+        self.bus.shutdown()
+
+        self.bus.handle_temperature("vessel", 1, 1)
+
+        listener.handle_temperature.assert_not_called()
@@ -0,0 +1,70 @@
+import pytest
+
+from fermentation_controller.filters import MovingAverage, ExponentialAverage, MovingMedian, create_filter
+
+
+class TestFilters:
+
+    def test_moving_average_over_window(self):
+        average = MovingAverage(2)
+
+        assert average.get() == 0.0
+        assert average.update(20) == 20
+        assert average.update(10) == 15
+        assert average.update(9.93) == pytest.approx(9.965)
+
+    def test_moving_average_stays_exact_over_many_updates(self):
+        average = MovingAverage(3)
+        for n in range(100000):
+            average.update(0.1 * (n % 7))
+
+        assert average.get() == pytest.approx(sum(0.1 * (n % 7) for n in range(99997, 100000)) / 3)
+
+    def test_moving_average_keeps_recent_history_on_resize(self):
+        average = MovingAverage(4)
+        for value in [1, 2, 3, 4]:
+            average.update(value)
+
+        average.resize(2)
+        assert average.get() == 3.5
+
+        average.resize(3)
+        assert average.update(5) == 4
+
+    def test_exponential_average(self):
+        average = ExponentialAverage(3)  # alpha = 0.5
+
+        assert average.update(10) == 10
+        assert average.update(20) == 15
+        average.resize(1)  # alpha = 1
+        assert average.update(30) == 30
+
+    def test_moving_median_over_window(self):
+        median = MovingMedian(3)
+
+        assert median.update(10) == 10
+        assert median.update(30) == 20
+        assert median.update(11) == 11
+        assert median.update(100) == 30  # 10 dropped out of the window
+
+    def test_moving_median_keeps_recent_history_on_resize(self):
+        median = MovingMedian(3)
+        for value in [1, 50, 3]:
+            median.update(value)
+
+        median.resize(2)
+        assert median.get() == 26.5
+
+    def test_creates_filter_by_name(self):
+        assert isinstance(create_filter("ema", 3), ExponentialAverage)
+
+        with pytest.raises(ValueError):
+            create_filter("kalman", 3)
+
+    @pytest.mark.parametrize("kind", ["sma", "ema", "median"])
+    def test_empty_until_first_update(self, kind):
+        value_filter = create_filter(kind, 3)
+
+        assert value_filter.is_empty()
+        value_filter.update(1.0)
+        assert not value_filter.is_empty()
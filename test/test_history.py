@@ -0,0 +1,104 @@
+import os
+import struct
+from unittest.mock import patch
+
+import numpy as np
+
+from fermentation_controller.data_collector import DataCollector
+from fermentation_controller.history import HistoryWriter, columns_for, load, read_rows
+
+
+class TestHistoryWriter:
+
+    def setup_method(self):
+        self.collector = DataCollector(["vessel"], ["heater"])
+        self.collector.handle_temperature("vessel", 19.3, 19.25)
+        self.collector.handle_switch("heater", True)
+        self.collector.handle_controller("", 1.5, 0.25, -0.5, 1.25)
+
+    def test_describes_columns_by_type(self):
+        assert columns_for(self.collector) == [("time", "<f8"), ("vessel_avg", "<f4"), ("vessel", "<f4"),
+                                               ("heater", "|u1"), ("p", "<f8"), ("i", "<f8"), ("d", "<f8"),
+                                               ("control", "<f8")]
+
+    @patch("time.time")
+    def test_writes_records_readable_as_columns(self, mock_time, tmp_path):
+        mock_time.return_value = 12.5
+        filename = str(tmp_path / "data.bin")
+
+        writer = HistoryWriter(self.collector, filename)
+        writer.run()
+        mock_time.return_value = 13.5
+        self.collector.handle_switch("heater", False)
+        writer.run()
+        writer.shutdown()
+
+        records = load(filename)
+        assert records.dtype.itemsize == 8 + 4 + 4 + 1 + 4 * 8
+        assert list(records["time"]) == [12.5, 13.5]
+        assert list(records["heater"]) == [1, 0]
+        assert records["vessel"][0] == np.float32(19.3)
+        assert records["control"][1] == 1.25
+
+    def test_reads_rows_across_files(self, tmp_path):
+        filenames = [str(tmp_path / "data.bin-20200101"), str(tmp_path / "data.bin")]
+        for filename in filenames:
+            writer = HistoryWriter(self.collector, filename)
+            writer.run()
+            writer.shutdown()
+
+        rows = list(read_rows(filenames))
+
+        assert len(rows) == 2
+        assert rows[0]["vessel_avg"] == 19.25
+        assert rows[0]["heater"] == 1
+
+    def test_ignores_record_cut_off_by_crash(self, tmp_path):
+        filename = str(tmp_path / "data.bin")
+        writer = HistoryWriter(self.collector, filename)
+        writer.run()
+        writer.run()
+        writer.shutdown()
+
+        os.truncate(filename, os.path.getsize(filename) - 3)
+
+        assert len(load(filename)) == 1
+
+    def test_buffers_records_until_flush_rows(self, tmp_path):
+        filename = str(tmp_path / "data.bin")
+        writer = HistoryWriter(self.collector, filename, flush_rows=2, flush_interval=300)
+
+        writer.run()
+        assert len(load(filename)) == 0
+
+        writer.run()
+        assert len(load(filename)) == 2
+
+    def test_writes_header_again_after_copytruncate(self, tmp_path):
+        filename = str(tmp_path / "data.bin")
+        writer = HistoryWriter(self.collector, filename)
+        writer.run()
+
+        os.truncate(filename, 0)
+        writer.run()
+
+        assert len(load(filename)) == 1
+
+    def test_sets_aside_file_with_different_layout(self, tmp_path):
+        filename = str(tmp_path / "data.bin")
+        HistoryWriter(DataCollector(["fridge"], []), filename).shutdown()
+
+        writer = HistoryWriter(self.collector, filename)
+        writer.run()
+
+        assert load(filename).dtype.names == tuple(name for name, _ in columns_for(self.collector))
+        assert len([f for f in os.listdir(str(tmp_path)) if f.startswith("data.bin.")]) == 1
+
+    def test_packs_records_little_endian(self, tmp_path):
+        filename = str(tmp_path / "data.bin")
+        writer = HistoryWriter(self.collector, filename)
+        writer.run()
+
+        with open(filename, "rb") as file:
+            data = file.read()
+        assert struct.unpack("<ffBdddd", data[-41:]) == (np.float32(19.25), np.float32(19.3), 1, 1.5, 0.25, -0.5, 1.25)
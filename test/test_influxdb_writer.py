@@ -0,0 +1,148 @@
+from unittest.mock import patch, Mock
+
+from influxdb.exceptions import InfluxDBClientError
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.emission import Emission
+from fermentation_controller.influxdb_writer import InfluxDBWriter, InfluxDBFlusher
+from fermentation_controller.rollup import Stats
+from fermentation_controller.spool import Spool
+
+
+class TestInfluxDBWriter:
+
+    def setup_method(self):
+        self.secrets = {"env": "test", "db_host": "1.2.3.4", "db_port": 8086,
+                        "db_username": "user", "db_password": "pass", "db_name": "test_db"}
+        self.config = Mock()
+        self.config.get.side_effect = lambda key: self.secrets.get(key)
+
+        self.collector = Mock()
+        self.collector.valid_fields = ["vessel", "heater"]
+        self.collector.get_data_map.return_value = {"vessel": 19.5, "heater": 1}
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    @staticmethod
+    def __spooled(spool: Spool):
+        return spool.read(100)[0]
+
+    @patch("time.time")
+    def test_spools_all_fields_of_an_interval(self, mock_time, tmp_path):
+        mock_time.return_value = 12.5
+        spool = Spool(str(tmp_path / "spool"))
+
+        writer = InfluxDBWriter(self.config, self.collector, spool)
+        writer.run()
+
+        assert self.__spooled(spool) == ["vessel,env=test value=19.5 12500000000",
+                                         "heater,env=test value=1.0 12500000000"]
+
+    @patch("time.time")
+    def test_spools_single_point_with_configured_measurement_and_tags(self, mock_time, tmp_path):
+        mock_time.return_value = 12.5
+        spool = Spool(str(tmp_path / "spool"))
+        self.secrets.update({"db_layout": "fields", "db_measurement": "chamber", "db_tags": {"fridge": "left"}})
+
+        writer = InfluxDBWriter(self.config, self.collector, spool)
+        writer.run()
+
+        assert self.__spooled(spool) == ["chamber,fridge=left vessel=19.5,heater=1.0 12500000000"]
+
+    def test_spools_only_emitted_fields(self, tmp_path):
+        clock.use(ManualClock(12.5))
+        spool = Spool(str(tmp_path / "spool"))
+
+        writer = InfluxDBWriter(self.config, self.collector, spool, Emission(60, {"vessel": 0.5}))
+        writer.run()
+        spool.commit(spool.read(100)[1])
+        writer.run()
+        self.collector.get_data_map.return_value = {"vessel": 19.6, "heater": 0}
+        writer.run()
+
+        assert self.__spooled(spool) == ["heater,env=test value=0.0 12500000000"]
+
+    def test_spools_rollups_at_window_start(self, tmp_path):
+        spool = Spool(str(tmp_path / "spool"))
+
+        writer = InfluxDBWriter(self.config, self.collector, spool)
+        writer.handle_rollup(3600, 7200, {"vessel": Stats(19.0, 21.0, 20.0, 3)})
+
+        assert self.__spooled(spool) == ["vessel,env=test,rollup=1h min=19.0,max=21.0,mean=20.0,count=3i 7200000000000"]
+
+    def test_spools_nothing_if_nothing_was_collected(self, tmp_path):
+        spool = Spool(str(tmp_path / "spool"))
+        self.collector.get_data_map.return_value = None
+
+        writer = InfluxDBWriter(self.config, self.collector, spool)
+        writer.run()
+
+        assert spool.pending_bytes() == 0
+
+    @patch("fermentation_controller.influxdb_writer.InfluxDBClient")
+    def test_flusher_connects_lazily(self, client_class, tmp_path):
+        self.secrets.update({"db_timeout": 3})
+
+        InfluxDBFlusher(self.config, Spool(str(tmp_path / "spool")))
+
+        client_class.assert_called_once_with(host="1.2.3.4", port=8086, username="user", password="pass",
+                                             timeout=3, retries=1, gzip=True, pool_size=1)
+        client_class.return_value.create_database.assert_not_called()
+
+    @patch("fermentation_controller.influxdb_writer.InfluxDBClient")
+    def test_flusher_drains_spool_in_batches(self, client_class, tmp_path):
+        client = client_class.return_value
+        spool = Spool(str(tmp_path / "spool"))
+        spool.append(["m value=%d 1" % n for n in range(5)])
+        self.secrets.update({"db_batch_size": 2})
+
+        InfluxDBFlusher(self.config, spool).run()
+
+        client.create_database.assert_called_once_with("test_db")
+        client.switch_database.assert_called_once_with("test_db")
+        assert [c.args[0] for c in client.write_points.call_args_list] == [
+            ["m value=0 1", "m value=1 1"], ["m value=2 1", "m value=3 1"], ["m value=4 1"]]
+        client.write_points.assert_called_with(["m value=4 1"], protocol="line")
+        assert spool.pending_bytes() == 0
+
+    @patch("fermentation_controller.influxdb_writer.InfluxDBClient")
+    def test_flusher_backs_off_while_database_is_unreachable(self, client_class, tmp_path):
+        manual = ManualClock()
+        clock.use(manual)
+        client = client_class.return_value
+        client.write_points.side_effect = ConnectionError("unreachable")
+        spool = Spool(str(tmp_path / "spool"))
+        spool.append(["m value=1 1"])
+        self.secrets.update({"db_min_backoff": 10, "db_max_backoff": 15})
+
+        flusher = InfluxDBFlusher(self.config, spool)
+        flusher.run()
+        manual.set(5)
+        flusher.run()  # still backing off
+        assert client.write_points.call_count == 1
+
+        manual.set(10)
+        flusher.run()
+        assert client.write_points.call_count == 2
+        assert flusher.retry_at == 25  # doubled, capped at the maximum
+
+        client.write_points.side_effect = None
+        manual.set(25)
+        flusher.run()
+        assert spool.pending_bytes() == 0
+        assert flusher.backoff == 10
+
+    @patch("fermentation_controller.influxdb_writer.InfluxDBClient")
+    def test_flusher_drops_points_rejected_by_server(self, client_class, tmp_path):
+        client = client_class.return_value
+        client.write_points.side_effect = [InfluxDBClientError("unable to parse", 400), None]
+        spool = Spool(str(tmp_path / "spool"))
+        spool.append(["garbage"])
+
+        flusher = InfluxDBFlusher(self.config, spool)
+        flusher.run()
+
+        assert spool.pending_bytes() == 0
+        assert flusher.retry_at == 0.0
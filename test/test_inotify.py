@@ -0,0 +1,38 @@
+from threading import Thread
+
+from fermentation_controller.inotify import FileWatcher
+
+
+class TestFileWatcher:
+
+    def test_notices_write_of_watched_file_only(self, tmp_path):
+        watcher = FileWatcher(str(tmp_path / "config.json"))
+
+        (tmp_path / "other.json").write_text("{}")
+        assert watcher.wait(0.05) is False
+
+        (tmp_path / "config.json").write_text("{}")
+        assert watcher.wait(1) is True
+        watcher.release()
+
+    def test_notices_file_renamed_over_watched_file(self, tmp_path):
+        watcher = FileWatcher(str(tmp_path / "config.json"))
+
+        (tmp_path / "config.json.tmp").write_text("{}")
+        watcher.wait(0.05)
+        (tmp_path / "config.json.tmp").rename(tmp_path / "config.json")
+
+        assert watcher.wait(1) is True
+        watcher.release()
+
+    def test_close_wakes_up_waiting_thread(self, tmp_path):
+        watcher = FileWatcher(str(tmp_path / "config.json"))
+        results = []
+        thread = Thread(target=lambda: results.append(watcher.wait()))
+        thread.start()
+
+        watcher.close()
+        thread.join(1)
+
+        assert results == [False]
+        watcher.release()
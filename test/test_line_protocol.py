@@ -0,0 +1,49 @@
+from fermentation_controller.line_protocol import LineProtocolEncoder
+
+
+class TestLineProtocolEncoder:
+
+    def test_encodes_one_measurement_per_field(self):
+        encoder = LineProtocolEncoder("ignored", {"env": "prod"}, ["vessel", "heater"])
+
+        assert encoder.encode({"heater": 1, "vessel": 19.5}, 123) == ["vessel,env=prod value=19.5 123",
+                                                                      "heater,env=prod value=1.0 123"]
+
+    def test_encodes_single_point_with_all_fields(self):
+        encoder = LineProtocolEncoder("chamber", {"env": "prod", "beer": "ipa"}, ["vessel", "heater"], "fields")
+
+        assert encoder.encode({"heater": 1, "vessel": 19.5}, 123) == [
+            "chamber,beer=ipa,env=prod vessel=19.5,heater=1.0 123"]
+
+    def test_escapes_names_and_tags(self):
+        encoder = LineProtocolEncoder("my chamber", {"env name": "a,b=c"}, ["vessel avg"], "fields")
+
+        assert encoder.encode({"vessel avg": 2.5}, 1) == ["my\\ chamber,env\\ name=a\\,b\\=c vessel\\ avg=2.5 1"]
+
+    def test_skips_missing_and_non_finite_values(self):
+        encoder = LineProtocolEncoder("m", {}, ["a", "b", "c"], "fields")
+
+        assert encoder.encode({"a": float("nan"), "c": 3}, 1) == ["m c=3.0 1"]
+        assert encoder.encode({}, 1) == []
+
+    def test_encodes_rollups_per_field(self):
+        encoder = LineProtocolEncoder("ignored", {"env": "prod"}, ["vessel", "heater"])
+
+        assert encoder.encode_rollup("1m", {"vessel": (19, 21, 20, 3), "heater": (0, 1, 0.5, 2)}, 60) == [
+            "vessel,env=prod,rollup=1m min=19.0,max=21.0,mean=20.0,count=3i 60",
+            "heater,env=prod,rollup=1m min=0.0,max=1.0,mean=0.5,count=2i 60"]
+
+    def test_encodes_rollups_as_single_point(self):
+        encoder = LineProtocolEncoder("chamber", {"env": "prod"}, ["vessel", "heater"], "fields")
+
+        assert encoder.encode_rollup("1h", {"vessel": (19, 21, 20, 3)}, 60) == [
+            "chamber,env=prod,rollup=1h vessel_min=19.0,vessel_max=21.0,vessel_mean=20.0,vessel_count=3i 60"]
+        assert encoder.encode_rollup("1h", {}, 60) == []
+
+    def test_tags_fields_of_chambers(self):
+        encoder = LineProtocolEncoder("ignored", {"env": "prod"}, ["fridge2.vessel", "heater"])
+
+        assert encoder.encode({"fridge2.vessel": 19.5, "heater": 1}, 123) == [
+            "vessel,chamber=fridge2,env=prod value=19.5 123", "heater,env=prod value=1.0 123"]
+        assert encoder.encode_rollup("1m", {"fridge2.vessel": (19, 21, 20, 3)}, 60) == [
+            "vessel,chamber=fridge2,env=prod,rollup=1m min=19.0,max=21.0,mean=20.0,count=3i 60"]
@@ -0,0 +1,116 @@
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.metrics import (CONTENT_TYPE, SINK_ERRORS, SINK_WRITE_SECONDS, Counter, Gauge, Histogram,
+                                             Metric, MetricsServer, Registry, sink_write)
+
+
+class TestRegistry:
+
+    def setup_method(self):
+        self.registry = Registry()
+
+    def test_renders_counters_and_gauges(self):
+        runs = self.registry.register(Counter("runs_total", "Runs", ("job",)))
+        depth = self.registry.register(Gauge("depth", "Queue depth"))
+        runs.labels("Sensor('vessel')").inc()
+        runs.labels("Sensor('vessel')").inc(2)
+        depth.set(3)
+
+        assert self.registry.render() == (
+            "# HELP runs_total Runs\n"
+            "# TYPE runs_total counter\n"
+            "runs_total{job=\"Sensor('vessel')\"} 3.0\n"
+            "# HELP depth Queue depth\n"
+            "# TYPE depth gauge\n"
+            "depth 3.0\n")
+
+    def test_renders_cumulative_histogram_buckets(self):
+        seconds = self.registry.register(Histogram("run_seconds", "Run time", ("job",), (0.5, 0.1)))
+        for value in [0.05, 0.1, 0.3, 2]:
+            seconds.labels("Controller").observe(value)
+
+        assert self.registry.render().splitlines()[2:] == [
+            "run_seconds_bucket{job=\"Controller\",le=\"0.1\"} 2.0",
+            "run_seconds_bucket{job=\"Controller\",le=\"0.5\"} 3.0",
+            "run_seconds_bucket{job=\"Controller\",le=\"+Inf\"} 4.0",
+            "run_seconds_sum{job=\"Controller\"} 2.45",
+            "run_seconds_count{job=\"Controller\"} 4.0"]
+
+    def test_escapes_label_values(self):
+        errors = self.registry.register(Counter("errors_total", "Errors", ("sink",)))
+        errors.labels("a \"b\"\\\n").inc()
+
+        assert self.registry.render().splitlines()[2] == "errors_total{sink=\"a \\\"b\\\"\\\\\\n\"} 1.0"
+
+    def test_rejects_wrong_labels(self):
+        errors = Counter("errors_total", "Errors", ("sensor", "kind"))
+
+        with pytest.raises(ValueError):
+            errors.labels("vessel")
+
+    def test_metric_is_abstract(self):
+        with pytest.raises(TypeError):
+            Metric("runs_total", "Runs")
+
+    def test_rejects_duplicate_metrics(self):
+        self.registry.register(Counter("errors_total", "Errors"))
+
+        with pytest.raises(ValueError):
+            self.registry.register(Gauge("errors_total", "Errors"))
+
+    def test_times_in_clock_time(self):
+        manual = ManualClock(100.0)
+        clock.use(manual)
+        try:
+            seconds = Histogram("write_seconds", "Writes")
+            with seconds.labels().time():
+                manual.set(100.25)
+        finally:
+            clock.use(SystemClock())
+
+        assert seconds.labels().sum == 0.25
+
+
+class TestSinkWrite:
+
+    def test_counts_failed_writes_and_reraises(self):
+        errors = SINK_ERRORS.labels("test_sink").value
+        writes = SINK_WRITE_SECONDS.labels("test_sink").count
+
+        with sink_write("test_sink"):
+            pass
+        with pytest.raises(OSError):
+            with sink_write("test_sink"):
+                raise OSError("disk full")
+
+        assert SINK_ERRORS.labels("test_sink").value == errors + 1
+        assert SINK_WRITE_SECONDS.labels("test_sink").count == writes + 2
+
+
+class TestMetricsServer:
+
+    def setup_method(self):
+        self.registry = Registry()
+        self.registry.register(Counter("runs_total", "Runs")).inc()
+        self.server = MetricsServer(0, registry=self.registry)
+        self.server.start()
+        self.url = "http://127.0.0.1:%s" % self.server.server.server_port
+
+    def teardown_method(self):
+        self.server.shutdown()
+
+    def test_serves_metrics(self):
+        with urlopen(self.url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert response.read().decode() == "# HELP runs_total Runs\n# TYPE runs_total counter\nruns_total 1.0\n"
+
+    def test_serves_nothing_else(self):
+        with pytest.raises(HTTPError) as error:
+            urlopen(self.url + "/", timeout=5)
+
+        assert error.value.code == 404
@@ -0,0 +1,35 @@
+from fermentation_controller.plant import ThermalPlant
+
+
+class TestThermalPlant:
+
+    def test_stays_at_equilibrium_when_idle(self):
+        plant = ThermalPlant()
+        plant.step(3600, False, False)
+
+        assert plant.fridge == 20.0
+        assert plant.vessel == 20.0
+
+    def test_heater_warms_air_before_vessel(self):
+        plant = ThermalPlant()
+        plant.step(600, True, False)
+
+        assert plant.fridge > plant.vessel > 20.0
+
+    def test_cooler_cools(self):
+        plant = ThermalPlant()
+        plant.step(3600, False, True)
+
+        assert plant.vessel < plant.environment
+        assert plant.fridge < plant.vessel
+
+    def test_drifts_back_to_environment(self):
+        plant = ThermalPlant(environment=25.0, fridge=10.0, vessel=10.0)
+        plant.step(5 * 24 * 3600, False, False)
+
+        assert abs(plant.vessel - 25.0) < 0.5
+
+    def test_looks_up_temperatures_by_sensor_name(self):
+        plant = ThermalPlant(vessel=18.0)
+
+        assert plant.temperature("vessel") == 18.0
@@ -0,0 +1,149 @@
+import json
+import pstats
+import tracemalloc
+from threading import Thread
+from time import localtime, sleep, strftime
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.config import Config
+from fermentation_controller.profiling import Profiler, RunProfile
+from fermentation_controller.runnable import Runnable
+from fermentation_controller.scheduler import Scheduler
+
+
+class Worker(Runnable):
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.runs = 0
+
+    def run(self) -> None:
+        self.runs += 1
+        self.work()
+
+    def work(self) -> None:
+        sum(range(1000))
+
+    def shutdown(self) -> None:
+        pass
+
+
+class TestProfiler:
+
+    def setup_method(self):
+        self.scheduler = Scheduler()
+        self.vessel = self.scheduler.add(Worker("vessel"), 0.01)
+        self.fridge = self.scheduler.add(Worker("fridge"), 0.01)
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    def __config(self, tmp_path, **values) -> Config:
+        self.__write(tmp_path, **values)
+        return Config(str(tmp_path / "config.json"))
+
+    @staticmethod
+    def __write(tmp_path, **values) -> None:
+        (tmp_path / "config.json").write_text(json.dumps(values))
+
+    def __run_for(self, seconds: float) -> None:
+        t = Thread(target=self.scheduler.start)
+        t.start()
+        sleep(seconds)
+        self.scheduler.stop()
+        t.join()
+
+    def test_profiles_jobs_by_name_or_class(self, tmp_path):
+        config = self.__config(tmp_path, profile_jobs=["Worker('vessel')"])
+        Profiler(config, self.scheduler.jobs, str(tmp_path / "profiles"))
+
+        assert self.vessel.profile is not None
+        assert self.fridge.profile is None
+
+        self.__write(tmp_path, profile_jobs=["Worker"])
+        config.run()
+
+        assert self.fridge.profile is not None
+
+    def test_dumps_profiles_of_runs_since_previous_dump(self, tmp_path):
+        config = self.__config(tmp_path, profile_jobs=["Worker('vessel')"])
+        profiler = Profiler(config, self.scheduler.jobs, str(tmp_path / "profiles"))
+
+        self.__run_for(0.1)
+        profiler.run()
+
+        dumps = list((tmp_path / "profiles").iterdir())
+        assert [dump.name[:13] for dump in dumps] == ["Worker_vessel"]
+        stats = pstats.Stats(str(dumps[0])).stats
+        work = [key for key in stats if key[2] == "work"]
+        assert stats[work[0]][1] == self.vessel.runnable.runs
+        assert self.vessel.profile.runs == 0
+
+    def test_dumps_and_stops_profiling_when_disabled(self, tmp_path):
+        config = self.__config(tmp_path, profile_jobs=["Worker"])
+        Profiler(config, self.scheduler.jobs, str(tmp_path / "profiles"))
+        self.__run_for(0.05)
+
+        self.__write(tmp_path, profile_jobs=[])
+        config.run()
+
+        assert self.vessel.profile is None and self.fridge.profile is None
+        assert len(list((tmp_path / "profiles").iterdir())) == 2
+
+    def test_writes_nothing_without_runs(self, tmp_path):
+        config = self.__config(tmp_path, profile_jobs=["Worker"])
+        profiler = Profiler(config, self.scheduler.jobs, str(tmp_path / "profiles"))
+
+        profiler.run()
+
+        assert not list(tmp_path.glob("profiles/*"))
+
+    def test_keeps_only_latest_dumps(self, tmp_path):
+        manual = ManualClock(1_600_000_000.0)
+        clock.use(manual)
+        config = self.__config(tmp_path, profile_jobs=["Worker('vessel')"], profile_tracemalloc=True)
+        profiler = Profiler(config, self.scheduler.jobs, str(tmp_path / "profiles"), keep=2)
+        (tmp_path / "profiles").mkdir()
+        (tmp_path / "profiles" / "Worker_vessel-2-20200101-000000.prof").write_text("")
+
+        for _ in range(4):
+            manual.set(manual.now + 1)
+            self.vessel.profile.run(self.vessel.runnable.run)
+            profiler.run()
+        self.__write(tmp_path, profile_tracemalloc=False)
+        config.run()
+
+        stamps = [clock.time() - 1, clock.time()]
+        names = sorted(dump.name for dump in (tmp_path / "profiles").iterdir())
+        assert names == sorted(["Worker_vessel-2-20200101-000000.prof"]
+                               + ["Worker_vessel-%s.prof" % stamp for stamp in self.__stamps(stamps)]
+                               + ["tracemalloc-%s.snapshot" % stamp for stamp in self.__stamps(stamps)])
+
+    @staticmethod
+    def __stamps(times):
+        return [strftime("%Y%m%d-%H%M%S", localtime(t)) for t in times]
+
+    def test_tracks_allocations_while_enabled(self, tmp_path):
+        config = self.__config(tmp_path, profile_tracemalloc=True)
+        profiler = Profiler(config, self.scheduler.jobs, str(tmp_path / "profiles"))
+        assert tracemalloc.is_tracing()
+
+        profiler.run()
+        self.__write(tmp_path, profile_tracemalloc=False)
+        config.run()
+
+        assert not tracemalloc.is_tracing()
+        assert len(list((tmp_path / "profiles").glob("tracemalloc-*.snapshot"))) >= 1
+
+
+class TestRunProfile:
+
+    def test_counts_profiled_runs(self):
+        profile = RunProfile()
+        worker = Worker("vessel")
+
+        profile.run(worker.run)
+        profile.run(worker.run)
+
+        assert (worker.runs, profile.runs) == (2, 2)
@@ -0,0 +1,123 @@
+from unittest.mock import Mock
+
+import pytest
+
+from fermentation_controller import clock
+from fermentation_controller.clock import SystemClock
+from fermentation_controller.config import Settings
+from fermentation_controller.replay import Replay, history_files, read_history, LEGACY_COLUMNS
+
+
+class TestReplay:
+
+    def setup_method(self):
+        self.config = Mock()
+        self.__configure(p=1, i=0, d=0, target=20, control_deadband=0.15, control_interval=15,
+                         heating_limit=40, limit_window=10)
+
+    def __configure(self, **values) -> None:
+        self.config.get.side_effect = values.get
+        self.config.get_settings.return_value = Settings(**values)
+
+    @staticmethod
+    def __row(time: float, vessel: float, fridge: float, heater: int = 0, cooler: int = 0):
+        return {"time": time, "vessel": vessel, "vessel_avg": vessel, "fridge": fridge, "fridge_avg": fridge,
+                "heater": heater, "cooler": cooler}
+
+    def test_finds_rotated_files_oldest_first(self, tmp_path):
+        for name in ["data.csv", "data.csv-20200102", "data.csv-20200101", "data.csv-backup"]:
+            (tmp_path / name).write_text("")
+        filename = str(tmp_path / "data.csv")
+
+        assert history_files(filename) == [filename + "-20200101", filename + "-20200102", filename]
+
+    def test_reads_legacy_rows_in_alphabetic_column_order(self, tmp_path):
+        values = [str(n) for n in range(len(LEGACY_COLUMNS))]
+        (tmp_path / "data.csv").write_text(",".join(values) + "\r\n")
+
+        rows = list(read_history([str(tmp_path / "data.csv")]))
+
+        assert rows == [{name: float(n) for n, name in enumerate(LEGACY_COLUMNS)}]
+        assert LEGACY_COLUMNS[:4] == ["time", "control", "cooler", "d"]
+
+    def test_reads_rows_by_header_and_skips_broken_ones(self, tmp_path):
+        (tmp_path / "data.csv").write_text("time,vessel,heater\r\n1,19.5,1\r\n2,19.6\r\n3,oops,0\r\n4,19.7,0\r\n")
+
+        rows = list(read_history([str(tmp_path / "data.csv"), str(tmp_path / "missing.csv")]))
+
+        assert rows == [{"time": 1, "vessel": 19.5, "heater": 1}, {"time": 4, "vessel": 19.7, "heater": 0}]
+
+    def test_carries_empty_cells_forward(self, tmp_path):
+        (tmp_path / "data.csv").write_text("time,vessel,heater\r\n1,,1\r\n2,19.5,1\r\n3,,0\r\n")
+        (tmp_path / "data.csv-20200101").write_text("time,vessel,heater\r\n0,19.4,0\r\n")
+
+        rows = list(read_history([str(tmp_path / "data.csv-20200101"), str(tmp_path / "data.csv")]))
+
+        assert rows == [{"time": 0, "vessel": 19.4, "heater": 0}, {"time": 1, "vessel": 19.4, "heater": 1},
+                        {"time": 2, "vessel": 19.5, "heater": 1}, {"time": 3, "vessel": 19.5, "heater": 0}]
+
+    def test_skips_rows_leaving_out_fields_never_seen(self, tmp_path):
+        (tmp_path / "data.csv").write_text("time,vessel,heater\r\n1,,1\r\n2,19.5,1\r\n")
+
+        rows = list(read_history([str(tmp_path / "data.csv")]))
+
+        assert rows == [{"time": 2, "vessel": 19.5, "heater": 1}]
+
+    def test_replays_decisions_at_control_interval(self):
+        rows = [self.__row(0, 18, 18), self.__row(5, 18, 18), self.__row(15, 22, 20, heater=1),
+                self.__row(30, 20, 20, cooler=1)]
+
+        decisions = list(Replay(self.config).run(rows))
+
+        assert [d.time for d in decisions] == [0, 15, 30]
+        assert [(d.heater, d.cooler) for d in decisions] == [(True, False), (False, True), (False, False)]
+        assert decisions[1].control == -2
+        assert decisions[1].recorded_heater is True
+
+    def test_takes_every_step_of_jittered_rows(self):
+        self.__configure(p=0, i=1, d=0, target=20, control_deadband=0, control_interval=15,
+                         heating_limit=40, limit_window=10)
+        times = [0, 14.996, 30.002, 44.999, 59.995, 75.004]
+        rows = [self.__row(time, 19, 20) for time in times]
+
+        decisions = list(Replay(self.config).run(rows))
+
+        assert [d.time for d in decisions] == times
+        assert [d.i for d in decisions] == pytest.approx(times, abs=1e-6)
+
+    def test_replays_columns_and_settings_of_chamber(self):
+        lager = {"name": "lager", "sensors": {"vessel": "28-1", "fridge": "28-2"}, "heater_pin": 16,
+                 "cooler_pin": 20, "target": 10}
+        self.__configure(p=1, i=0, d=0, target=20, control_deadband=0.15, control_interval=15,
+                         heating_limit=40, limit_window=10, chambers=(lager,))
+        rows = [{"time": 0, "lager.vessel": 12, "lager.vessel_avg": 12, "lager.fridge": 8, "lager.fridge_avg": 8,
+                 "lager.heater": 0, "lager.cooler": 1}]
+
+        decision = next(Replay(self.config, chamber="lager").run(rows))
+
+        assert decision.vessel == 12
+        assert decision.control == -2
+        assert (decision.cooler, decision.recorded_cooler) == (True, True)
+
+    def test_engages_limiter_on_hot_fridge(self):
+        rows = [self.__row(0, 18, 41)]
+
+        decision = next(Replay(self.config).run(rows))
+
+        assert decision.limiter is True
+        assert decision.heater is False
+
+    def test_restarts_controller_after_gap(self):
+        self.__configure(p=0, i=1, d=0, target=20, control_deadband=0, control_interval=15,
+                         heating_limit=40, limit_window=10)
+        rows = [self.__row(0, 19, 20), self.__row(15, 19, 20), self.__row(30, 19, 20), self.__row(10000, 19, 20)]
+
+        decisions = list(Replay(self.config, restart_gap=300).run(rows))
+
+        assert decisions[2].i == 30  # integral built up over two intervals
+        assert decisions[3].i < 1e-9  # fresh controller after the restart
+
+    def test_restores_clock(self):
+        list(Replay(self.config).run([self.__row(0, 18, 18)]))
+
+        assert isinstance(clock.current, SystemClock)
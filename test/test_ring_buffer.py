@@ -0,0 +1,75 @@
+import pytest
+
+from fermentation_controller.ring_buffer import RingBuffer
+
+
+class TestRingBuffer:
+
+    def test_starts_empty(self):
+        buffer = RingBuffer(3)
+
+        assert len(buffer) == 0
+        assert buffer.latest() is None
+        assert list(buffer.window()[0]) == []
+
+    def test_keeps_samples_oldest_first(self):
+        buffer = RingBuffer(3)
+        buffer.append(1.0, 10.0)
+        buffer.append(2.0, 20.0)
+
+        times, values = buffer.window()
+
+        assert list(times) == [1.0, 2.0]
+        assert list(values) == [10.0, 20.0]
+        assert buffer.latest() == (2.0, 20.0)
+
+    def test_overwrites_oldest_samples_when_full(self):
+        buffer = RingBuffer(3)
+        for n in range(5):
+            buffer.append(float(n), n * 10.0)
+
+        times, values = buffer.window()
+
+        assert len(buffer) == 3
+        assert list(times) == [2.0, 3.0, 4.0]
+        assert list(values) == [20.0, 30.0, 40.0]
+
+    def test_windows_are_contiguous_at_every_position(self):
+        buffer = RingBuffer(4)
+        for n in range(11):
+            buffer.append(float(n), float(n))
+
+            for count in range(1, len(buffer) + 1):
+                times, _ = buffer.window(count)
+                assert list(times) == [float(t) for t in range(n - count + 1, n + 1)]
+
+    def test_windows_do_not_copy(self):
+        buffer = RingBuffer(3)
+        buffer.append(1.0, 10.0)
+
+        _, values = buffer.window()
+
+        assert values.obj is buffer.values
+
+    def test_selects_samples_since_time(self):
+        buffer = RingBuffer(5)
+        for n in range(8):
+            buffer.append(float(n), n * 10.0)
+
+        times, values = buffer.since(5.0)
+
+        assert list(times) == [5.0, 6.0, 7.0]
+        assert list(values) == [50.0, 60.0, 70.0]
+
+    def test_memory_is_fixed_by_capacity(self):
+        buffer = RingBuffer(100)
+        size = buffer.nbytes()
+
+        for n in range(1000):
+            buffer.append(float(n), float(n))
+
+        assert buffer.nbytes() == size == 100 * 4 * 8
+
+    def test_rejects_empty_capacity(self):
+        with pytest.raises(ValueError):
+            RingBuffer(0)
@@ -0,0 +1,120 @@
+from unittest.mock import Mock
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.rollup import Rollup, Stats, label
+
+
+class TestRollup:
+
+    def setup_method(self):
+        # started on a minute, so the first minute window is complete and the first 5 minute one isn't
+        self.clock = ManualClock(960.0)
+        clock.use(self.clock)
+        self.listener = Mock()
+        self.rollup = Rollup(["vessel"], ["heater"], [60, 300], [self.listener])
+        self.clock.set(1000.0)
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    def __at(self, time: float) -> None:
+        self.clock.set(time)
+
+    def test_emits_nothing_before_window_closes(self):
+        self.rollup.handle_temperature("vessel", 19.5, 19.5)
+        self.__at(1019.0)
+        self.rollup.run()
+
+        self.listener.handle_rollup.assert_not_called()
+
+    def test_emits_min_max_mean_count_of_closed_windows(self):
+        for time, temperature in [(1000.0, 19.0), (1005.0, 21.0), (1010.0, 20.0)]:
+            self.__at(time)
+            self.rollup.handle_temperature("vessel", temperature, 0.0)
+        self.rollup.handle_controller("", 1.0, 2.0, 3.0, 6.0)
+
+        self.__at(1021.0)
+        self.rollup.run()
+
+        # windows are aligned, the first minute window started at 960
+        self.listener.handle_rollup.assert_called_once_with(60, 960.0, {
+            "vessel": Stats(19.0, 21.0, 20.0, 3),
+            "p": Stats(1.0, 1.0, 1.0, 1), "i": Stats(2.0, 2.0, 2.0, 1),
+            "d": Stats(3.0, 3.0, 3.0, 1), "control": Stats(6.0, 6.0, 6.0, 1)})
+
+    def test_emits_every_resolution_on_its_own_schedule(self):
+        self.__at(900.0)
+        self.rollup = Rollup(["vessel"], ["heater"], [60, 300], [self.listener])
+        self.rollup.handle_temperature("vessel", 19.0, 0.0)
+        self.__at(1090.0)
+        self.rollup.handle_temperature("vessel", 20.0, 0.0)
+        self.__at(1200.0)
+        self.rollup.run()
+
+        calls = [(c.args[0], c.args[1], c.args[2]["vessel"]) for c in self.listener.handle_rollup.call_args_list]
+        assert calls == [(60, 900.0, Stats(19.0, 19.0, 19.0, 1)), (60, 1080.0, Stats(20.0, 20.0, 20.0, 1)),
+                         (300, 900.0, Stats(19.0, 20.0, 19.5, 2))]
+
+    def test_drops_window_running_at_startup(self):
+        self.__at(1000.0)
+        self.rollup = Rollup(["vessel"], ["heater"], [60], [self.listener])
+        self.rollup.handle_temperature("vessel", 19.0, 0.0)
+        self.__at(1030.0)
+        self.rollup.handle_temperature("vessel", 20.0, 0.0)
+        self.__at(1081.0)
+        self.rollup.run()
+
+        self.listener.handle_rollup.assert_called_once_with(60, 1020.0, {"vessel": Stats(20.0, 20.0, 20.0, 1)})
+
+    def test_reports_switch_duty_cycle(self):
+        self.__at(960.0)
+        self.rollup = Rollup(["vessel"], ["heater"], [60], [self.listener])
+        self.rollup.handle_switch("heater", True)
+        self.__at(975.0)
+        self.rollup.handle_switch("heater", False)
+        self.__at(1005.0)
+        self.rollup.handle_switch("heater", True)
+
+        self.__at(1021.0)
+        self.rollup.run()
+        self.__at(1080.0)
+        self.rollup.run()
+
+        stats = [c.args[2]["heater"] for c in self.listener.handle_rollup.call_args_list]
+        assert stats == [Stats(0, 1, 0.5, 3), Stats(1, 1, 1.0, 0)]
+
+    def test_times_switches_by_event_time(self):
+        self.__at(960.0)
+        self.rollup = Rollup(["vessel"], ["heater"], [60], [self.listener])
+        self.rollup.handle_switch("heater", True, 960.0)
+        # handled late, off a queue
+        self.__at(1010.0)
+        self.rollup.handle_switch("heater", False, 990.0)
+
+        self.__at(1021.0)
+        self.rollup.run()
+
+        assert self.listener.handle_rollup.call_args.args[2]["heater"].mean == 0.5
+
+    def test_ignores_unknown_fields(self):
+        self.rollup.handle_temperature("target", 19.0, 19.0)
+        self.rollup.handle_switch("limiter", True)
+        self.__at(1021.0)
+        self.rollup.run()
+
+        assert self.listener.handle_rollup.call_args.args[2] == {}
+
+    def test_labels_resolutions(self):
+        assert [label(r) for r in [10, 60, 300, 3600, 86400]] == ["10s", "1m", "5m", "1h", "24h"]
+
+    def test_rolls_up_controller_terms_per_chamber(self):
+        self.__at(960.0)
+        self.rollup = Rollup([], [], [60], [self.listener], controllers=["fridge1", "fridge2"])
+        self.rollup.handle_controller("fridge1", 1, 2, 3, 6)
+        self.rollup.handle_controller("", 7, 7, 7, 7)
+        self.__at(1021.0)
+        self.rollup.run()
+
+        assert set(self.listener.handle_rollup.call_args.args[2]) == {"fridge1.p", "fridge1.i", "fridge1.d",
+                                                                     "fridge1.control"}
@@ -0,0 +1,46 @@
+import os
+
+from fermentation_controller.rotating_file import RotatingFile
+
+
+class TestRotatingFile:
+
+    def test_writes_header_only_to_new_file(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        RotatingFile(filename, b"time,vessel\r\n").close()
+
+        file = RotatingFile(filename, b"time,vessel\r\n")
+        file.write(b"1,19.5\r\n")
+        file.close()
+
+        with open(filename, "rb") as f:
+            assert f.read() == b"time,vessel\r\n1,19.5\r\n"
+
+    def test_follows_rotation_and_truncation(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        file = RotatingFile(filename, b"time\r\n")
+        file.write(b"1\r\n")
+
+        os.rename(filename, filename + "-1")
+        file.write(b"2\r\n")
+        os.truncate(filename, 0)
+        file.write(b"3\r\n")
+        file.close()
+
+        with open(filename + "-1", "rb") as f:
+            assert f.read() == b"time\r\n1\r\n"
+        with open(filename, "rb") as f:
+            assert f.read() == b"time\r\n3\r\n"
+
+    def test_sets_aside_file_with_other_header(self, tmp_path):
+        filename = str(tmp_path / "data.csv")
+        with open(filename, "wb") as f:
+            f.write(b"time,vessel,fridge\r\n1,19.5,4\r\n")
+
+        RotatingFile(filename, b"time,vessel\r\n").close()
+
+        with open(filename, "rb") as f:
+            assert f.read() == b"time,vessel\r\n"
+        aside = [name for name in os.listdir(str(tmp_path)) if name.startswith("data.csv.")]
+        with open(str(tmp_path / aside[0]), "rb") as f:
+            assert f.read() == b"time,vessel,fridge\r\n1,19.5,4\r\n"
@@ -0,0 +1,179 @@
+import asyncio
+from threading import Thread
+from time import sleep, monotonic
+
+from fermentation_controller.runnable import Runnable, AsyncRunnable
+from fermentation_controller.scheduler import (MISSED_DEADLINES, RUN_LATENESS_SECONDS, RUN_SECONDS, Scheduler,
+                                               AsyncScheduler)
+
+
+class Recorder(Runnable):
+
+    def __init__(self, duration: float = 0) -> None:
+        self.duration = duration
+        self.started = []
+        self.shut_down = False
+
+    def run(self) -> None:
+        self.started.append(monotonic())
+        sleep(self.duration)
+
+    def shutdown(self) -> None:
+        self.shut_down = True
+
+
+class AsyncRecorder(AsyncRunnable, Recorder):
+
+    async def run_async(self) -> None:
+        self.started.append(monotonic())
+        await asyncio.sleep(self.duration)
+
+
+class BlockingRecorder(AsyncRunnable, Recorder):
+    pass
+
+
+class TestScheduler:
+
+    @staticmethod
+    def __run_for(scheduler: Scheduler, seconds: float) -> None:
+        t = Thread(target=scheduler.start)
+        t.start()
+        sleep(seconds)
+        scheduler.stop()
+        t.join()
+
+    def test_runs_runnables_at_interval_and_shuts_them_down(self):
+        runnable = Recorder()
+        scheduler = Scheduler()
+        scheduler.add(runnable, 0.02)
+
+        self.__run_for(scheduler, 0.21)
+
+        assert 9 <= len(runnable.started) <= 12
+        assert runnable.shut_down
+
+    def test_does_not_drift_by_run_duration(self):
+        runnable = Recorder(duration=0.02)
+        scheduler = Scheduler()
+        job = scheduler.add(runnable, 0.05)
+
+        self.__run_for(scheduler, 1.01)
+
+        # a sleep-after-run loop would only manage ~14 runs in this time
+        assert len(runnable.started) >= 18
+        assert job.missed <= 1
+
+    def test_honours_initial_delay(self):
+        runnable = Recorder()
+        scheduler = Scheduler()
+        scheduler.add(runnable, 0.01, init_delay=0.2)
+
+        self.__run_for(scheduler, 0.1)
+
+        assert runnable.started == []
+
+    def test_counts_missed_deadlines_of_slow_runnable(self):
+        runnable = Recorder(duration=0.05)
+        scheduler = Scheduler()
+        job = scheduler.add(runnable, 0.01)
+
+        self.__run_for(scheduler, 0.2)
+
+        assert job.missed > 0
+        assert job.max_duration >= 0.05
+
+    def test_exports_run_metrics(self):
+        runnable = Recorder(duration=0.05)
+        runnable.name = "metrics"
+        scheduler = Scheduler()
+        job = scheduler.add(runnable, 0.01)
+
+        self.__run_for(scheduler, 0.2)
+
+        assert MISSED_DEADLINES.labels("Recorder('metrics')").value == job.missed
+        assert RUN_SECONDS.labels("Recorder('metrics')").count == job.runs
+        assert RUN_SECONDS.labels("Recorder('metrics')").sum == job.total_duration
+        assert RUN_LATENESS_SECONDS.labels("Recorder('metrics')").count == job.runs
+
+    def test_slow_lane_does_not_delay_other_lanes(self):
+        slow = Recorder(duration=0.3)
+        fast = Recorder()
+        scheduler = Scheduler()
+        scheduler.add(slow, 1, lane="sinks")
+        scheduler.add(fast, 0.02, lane="sensors")
+
+        self.__run_for(scheduler, 0.21)
+
+        assert len(slow.started) == 1
+        assert len(fast.started) >= 9
+
+    def test_keeps_running_after_failing_run(self):
+        class Failing(Recorder):
+            def run(self) -> None:
+                super().run()
+                raise RuntimeError("sensor unplugged")
+
+        runnable = Failing()
+        scheduler = Scheduler()
+        scheduler.add(runnable, 0.02)
+
+        self.__run_for(scheduler, 0.11)
+
+        assert len(runnable.started) >= 4
+
+
+class TestAsyncScheduler:
+
+    @staticmethod
+    def __run_for(scheduler: AsyncScheduler, seconds: float) -> None:
+        async def run() -> None:
+            asyncio.get_running_loop().call_later(seconds, scheduler.stop)
+            await scheduler.start()
+
+        asyncio.run(run())
+
+    def test_runs_runnables_at_interval_and_shuts_them_down(self):
+        runnable = AsyncRecorder(duration=0.01)
+        scheduler = AsyncScheduler()
+        job = scheduler.add(runnable, 0.02)
+
+        self.__run_for(scheduler, 0.21)
+
+        assert 9 <= len(runnable.started) <= 12
+        assert job.missed == 0
+        assert runnable.shut_down
+
+    def test_stops_immediately_during_long_run(self):
+        runnable = AsyncRecorder(duration=10)
+        scheduler = AsyncScheduler()
+        scheduler.add(runnable, 60)
+
+        started = monotonic()
+        self.__run_for(scheduler, 0.05)
+
+        assert monotonic() - started < 1
+        assert runnable.shut_down
+
+    def test_stop_before_start_ends_it(self):
+        runnable = AsyncRecorder()
+        scheduler = AsyncScheduler()
+        scheduler.add(runnable, 0.01)
+
+        scheduler.stop()
+        asyncio.run(asyncio.wait_for(scheduler.start(), 1))
+
+        assert runnable.started == []
+        assert runnable.shut_down
+
+    def test_runs_blocking_runnables_in_executor(self):
+        runnable = BlockingRecorder(duration=0.05)
+        other = AsyncRecorder()
+        scheduler = AsyncScheduler()
+        scheduler.add(runnable, 1)
+        scheduler.add(other, 0.01)
+
+        self.__run_for(scheduler, 0.11)
+
+        assert len(runnable.started) == 1
+        assert len(other.started) >= 8
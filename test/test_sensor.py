@@ -1,6 +1,12 @@
+import asyncio
+from threading import Event
+from time import monotonic
 from unittest.mock import patch, mock_open, Mock
 
-from fermentation_controller.sensor import Sensor
+import pytest
+
+from fermentation_controller.config import Config
+from fermentation_controller.sensor import READ_SECONDS, SENSOR_ERRORS, Sensor
 
 
 class TestSensor:
@@ -53,3 +59,161 @@ class TestSensor:
 
         assert listener.handle_temperature.call_count == 2
         listener.handle_temperature.assert_called_with(name, 21.512, 21.5)
+
+    @patch("builtins.open", new_callable=mock_open, read_data=healthy_data.format(21512))
+    def test_reads_and_publishes_on_event_loop(self, _):
+        listener = Mock()
+        sensor = Sensor("some-sensor", "28-03..", "sys", 2, [listener])
+
+        asyncio.run(sensor.run_async())
+
+        assert sensor.get() == 21.512
+        listener.handle_temperature.assert_called_once_with("some-sensor", 21.512, 21.5)
+
+    def test_updates_from_externally_acquired_value(self):
+        listener = Mock()
+        sensor = Sensor("some-sensor", "28-03..", "sys", 2, [listener])
+
+        sensor.update(20.0)
+        sensor.update(10.0)
+
+        assert sensor.get() == 10.0
+        assert sensor.get_average() == 15.0
+        listener.handle_temperature.assert_called_with("some-sensor", 10.0, 15.0)
+
+    def test_exposes_unrounded_filtered_value(self):
+        sensor = Sensor("some-sensor", "28-03..", "sys", 2, [])
+
+        sensor.update(20.06)
+        sensor.update(20.0)
+
+        assert sensor.get_filtered() == 20.03
+        assert sensor.get_average() == 20.0
+
+    def test_resizes_window_from_config_without_losing_history(self, tmp_path):
+        (tmp_path / "config.json").write_text('{"average_window": 3}')
+        config = Config(str(tmp_path / "config.json"))
+        sensor = Sensor("some-sensor", "28-03..", "sys", 3, [], config)
+        for value in [10.0, 20.0, 30.0]:
+            sensor.update(value)
+
+        (tmp_path / "config.json").write_text('{"average_window": 2}')
+        config.run()
+        sensor.update(40.0)
+
+        assert sensor.get_average() == 35.0
+
+    def test_switches_filter_from_config(self, tmp_path):
+        (tmp_path / "config.json").write_text('{"average_window": 3, "average_filter": "median"}')
+        config = Config(str(tmp_path / "config.json"))
+        sensor = Sensor("some-sensor", "28-03..", "sys", 3, [], config)
+
+        sensor.update(10.0)
+        sensor.update(90.0)
+        sensor.update(11.0)
+
+        assert sensor.get_average() == 11.0
+
+    def test_keeps_filter_on_unknown_filter(self, tmp_path):
+        # without a schema nothing stops the typo from reaching the sensor
+        (tmp_path / "config.json").write_text('{"average_window": 3, "average_filter": "median"}')
+        config = Config(str(tmp_path / "config.json"))
+        sensor = Sensor("some-sensor", "28-03..", "sys", 3, [], config)
+        sensor.update(10.0)
+
+        (tmp_path / "config.json").write_text('{"average_window": 3, "average_filter": "emaa"}')
+        config.run()
+        sensor.update(90.0)
+        sensor.update(11.0)
+
+        assert sensor.get_average() == 11.0
+        assert sensor.get() == 11.0
+
+    def test_reading_is_not_fresh_when_filter_fails(self):
+        sensor = Sensor("some-sensor", "28-03..", "sys", 3, [])
+        sensor.filter = Mock(window=3)
+        sensor.filter.update.side_effect = ArithmeticError
+
+        with pytest.raises(ArithmeticError):
+            sensor.update(20.0)
+
+        assert sensor.get_age() == float("inf")
+        assert sensor.get() == 0.0
+
+    @patch("builtins.open", new_callable=mock_open, read_data=unhealthy_data)
+    def test_retries_failed_crc_check(self, mock_file):
+        handlers = (mock_file.return_value,
+                    mock_open(read_data=self.healthy_data.format(21512)).return_value)
+        mock_file.side_effect = handlers
+
+        sensor = Sensor("some-sensor", "28-03..", "sys", 2, [], read_retries=1)
+        sensor.read()
+
+        assert sensor.get() == 21.512
+        assert sensor.crc_errors == 1
+        assert sensor.failures == 0
+
+    @patch("builtins.open", new_callable=mock_open, read_data=unhealthy_data)
+    def test_exports_read_metrics(self, _):
+        crc_errors = SENSOR_ERRORS.labels("metered-sensor", "crc").value
+        failures = SENSOR_ERRORS.labels("metered-sensor", "failure").value
+        reads = READ_SECONDS.labels("metered-sensor").count
+
+        Sensor("metered-sensor", "28-03..", "sys", 2, [], read_retries=1).read()
+
+        assert SENSOR_ERRORS.labels("metered-sensor", "crc").value == crc_errors + 2
+        assert SENSOR_ERRORS.labels("metered-sensor", "failure").value == failures + 1
+        assert READ_SECONDS.labels("metered-sensor").count == reads + 2
+
+    @patch("builtins.open", new_callable=mock_open, read_data=unhealthy_data)
+    def test_gives_up_after_retries(self, mock_file):
+        listener = Mock()
+        sensor = Sensor("some-sensor", "28-03..", "sys", 2, [listener], read_retries=2)
+        sensor.read()
+
+        assert mock_file.call_count == 3
+        assert sensor.failures == 1
+        assert sensor.get_age() == float("inf")
+        listener.handle_temperature.assert_not_called()
+
+    @patch("builtins.open")
+    def test_abandons_read_exceeding_deadline(self, mock_file):
+        released = Event()
+        mock_file.return_value.__enter__.return_value.read.side_effect = lambda: released.wait(5) and ""
+
+        sensor = Sensor("some-sensor", "28-03..", "sys", 2, [], read_timeout=0.05, read_retries=3)
+        started = monotonic()
+        sensor.read()
+        sensor.read()  # previous read still hanging, must not queue up behind it
+
+        assert monotonic() - started < 1
+        assert mock_file.call_count == 1
+        assert sensor.timeouts == 1
+        assert sensor.failures == 2
+        released.set()
+
+    def test_hung_sensors_do_not_hold_up_others(self):
+        released = Event()
+
+        def read_lines(sensor, device_file):
+            if sensor.name.startswith("hung"):
+                released.wait(5)
+            return self.healthy_data.format(21512).split("\n")
+
+        hung = [Sensor("hung%d" % n, "28-03..", "sys", 2, [], read_timeout=0.05) for n in range(8)]
+        healthy = Sensor("healthy", "28-03..", "sys", 2, [], read_timeout=0.5)
+        with patch.object(Sensor, "_Sensor__read_lines", read_lines):
+            for sensor in hung:
+                sensor.read()
+            healthy.read()
+
+        assert healthy.get() == 21.512
+        assert healthy.timeouts == 0
+        released.set()
+
+    @patch("builtins.open", new_callable=mock_open, read_data=healthy_data.format(21512))
+    def test_tracks_age_of_reading(self, _):
+        sensor = Sensor("some-sensor", "28-03..", "sys", 2, [], read_timeout=1)
+        sensor.read()
+
+        assert 0 <= sensor.get_age() < 1
@@ -0,0 +1,74 @@
+import sys
+from unittest.mock import patch
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ScaledClock, SystemClock
+from fermentation_controller.plant import ThermalPlant
+from fermentation_controller.sensor import Sensor
+from fermentation_controller.simulator import FakeGPIO, FakeCharLCD, FakeW1Devices, Simulation, install
+from fermentation_controller.w1_bus import W1Bus
+
+
+class TestSimulator:
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    def test_fake_devices_can_be_read_by_sensor(self, tmp_path):
+        devices = FakeW1Devices(str(tmp_path))
+        devices.write("28-01", 21.5)
+
+        sensor = Sensor("vessel", "28-01", str(tmp_path), 1, [])
+        sensor.read()
+
+        assert sensor.get() == 21.5
+
+    def test_fake_devices_support_bulk_reads(self, tmp_path):
+        devices = FakeW1Devices(str(tmp_path))
+        devices.write("28-01", -3.25)
+
+        sensor = Sensor("fridge", "28-01", str(tmp_path), 1, [])
+        W1Bus(str(tmp_path), [sensor]).read()
+
+        assert sensor.get() == -3.25
+
+    def test_fake_gpio_tracks_outputs(self):
+        gpio = FakeGPIO()
+        gpio.setup(16, gpio.OUT)
+        gpio.output(16, gpio.HIGH)
+
+        assert gpio.input(16) == gpio.HIGH
+        gpio.cleanup()
+        assert gpio.input(16) == gpio.LOW
+
+    def test_fake_lcd_keeps_text(self):
+        lcd = FakeCharLCD(cols=16, rows=2)
+        lcd.cursor_pos = (1, 14)
+        lcd.write_string("HCX")
+
+        assert lcd.text() == [" " * 16, " " * 14 + "HC"]
+
+    def test_installs_fake_hardware_modules(self):
+        with patch.dict(sys.modules):
+            gpio = install()
+
+            from RPi import GPIO
+            from RPLCD import CharLCD
+
+            assert GPIO is gpio
+            assert CharLCD is FakeCharLCD
+
+    def test_simulation_drives_plant_from_gpio_in_virtual_time(self, tmp_path):
+        clock.use(ScaledClock(100000))
+        gpio = FakeGPIO()
+        gpio.output(16, gpio.HIGH)
+        plant = ThermalPlant()
+
+        simulation = Simulation(plant, FakeW1Devices(str(tmp_path)), gpio, [("fridge", "28-01")], 16, 20)
+        clock.sleep(60)
+        simulation.run()
+
+        assert plant.fridge > 20.0
+        sensor = Sensor("fridge", "28-01", str(tmp_path), 1, [])
+        sensor.read()
+        assert abs(sensor.get() - plant.fridge) < 0.1
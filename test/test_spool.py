@@ -0,0 +1,61 @@
+from fermentation_controller.spool import Spool
+
+
+class TestSpool:
+
+    def test_reads_records_in_order_in_batches(self, tmp_path):
+        spool = Spool(str(tmp_path / "spool"))
+        spool.append(["a", "b"])
+        spool.append(["c"])
+
+        records, end = spool.read(2)
+        assert records == ["a", "b"]
+        spool.commit(end)
+
+        records, end = spool.read(2)
+        assert records == ["c"]
+
+    def test_keeps_records_until_committed(self, tmp_path):
+        spool = Spool(str(tmp_path / "spool"))
+        spool.append(["a"])
+
+        spool.read(10)
+
+        assert spool.read(10)[0] == ["a"]
+
+    def test_truncates_when_drained(self, tmp_path):
+        spool = Spool(str(tmp_path / "spool"))
+        spool.append(["a", "b"])
+
+        spool.commit(spool.read(10)[1])
+        spool.append(["c"])
+
+        assert spool.read(10)[0] == ["c"]
+        assert (tmp_path / "spool").read_bytes() == b"c\n"
+
+    def test_survives_restart(self, tmp_path):
+        spool = Spool(str(tmp_path / "spool"))
+        spool.append(["a", "b"])
+        records, end = spool.read(1)
+        spool.commit(end)
+        spool.close()
+
+        spool = Spool(str(tmp_path / "spool"))
+
+        assert spool.read(10)[0] == ["b"]
+
+    def test_ignores_cut_off_record(self, tmp_path):
+        (tmp_path / "spool").write_bytes(b"a\nb")
+
+        spool = Spool(str(tmp_path / "spool"))
+
+        assert spool.read(10)[0] == ["a"]
+
+    def test_drops_new_records_when_full(self, tmp_path):
+        spool = Spool(str(tmp_path / "spool"), max_bytes=4)
+        assert spool.append(["a", "b"])
+        assert not spool.append(["c"])
+
+        assert spool.read(10)[0] == ["a", "b"]
+        assert spool.dropped == 1
+        assert spool.pending_bytes() == 4
@@ -1,6 +1,6 @@
 from unittest.mock import patch, Mock
 
-from fermentation_controller.ssr import Ssr
+from fermentation_controller.ssr import SWITCH_SETS, Ssr
 
 
 class TestSsr:
@@ -38,6 +38,19 @@ class TestSsr:
         mock_gpio.output.assert_called_with(3, mock_gpio.LOW)
         assert ssr.get() is False
 
+    @patch('fermentation_controller.ssr.GPIO')
+    def test_counts_sets(self, _):
+        on = SWITCH_SETS.labels("cooler", "on").value
+        off = SWITCH_SETS.labels("cooler", "off").value
+
+        ssr = Ssr("cooler", 3, [])
+        ssr.set(True)
+        ssr.set(True)
+        ssr.set(False)
+
+        assert SWITCH_SETS.labels("cooler", "on").value == on + 2
+        assert SWITCH_SETS.labels("cooler", "off").value == off + 1
+
     @patch('fermentation_controller.ssr.GPIO')
     def test_switching_publishes_to_listeners(self, _):
         listener = Mock()
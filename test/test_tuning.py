@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from unittest.mock import Mock
+
+from fermentation_controller import clock
+from fermentation_controller.clock import ManualClock, SystemClock
+from fermentation_controller.config import Settings
+from fermentation_controller.controller import Controller
+from fermentation_controller.limiter import Limiter
+from fermentation_controller.plant import ThermalPlant
+from fermentation_controller.replay import ReplaySensor, RecordingSwitch
+from fermentation_controller.tuning import Sweep, fit_plant, grid, load_columns, rank
+
+
+class TestTuning:
+
+    def teardown_method(self):
+        clock.use(SystemClock())
+
+    def test_fits_plant_from_logged_columns(self):
+        actual = ThermalPlant(environment=18.0, fridge=15.0, vessel=16.0)
+        rng = np.random.default_rng(1)
+        rows = {"time": [], "environment": [], "fridge": [], "vessel": [], "heater": [], "cooler": []}
+        heater = cooler = False
+        for step in range(3000):
+            if step % 40 == 0:
+                heater, cooler = [(False, False), (True, False), (False, True)][rng.integers(3)]
+            for name, value in [("time", step * 15.0), ("environment", actual.environment),
+                                ("fridge", actual.fridge), ("vessel", actual.vessel),
+                                ("heater", float(heater)), ("cooler", float(cooler))]:
+                rows[name].append(value)
+            actual.step(15, heater, cooler)
+
+        fitted = fit_plant({name: np.asarray(values) for name, values in rows.items()})
+
+        assert fitted.heater_power == pytest.approx(actual.heater_power, rel=0.1)
+        assert fitted.cooler_power == pytest.approx(actual.cooler_power, rel=0.1)
+        assert fitted.air_coupling == pytest.approx(actual.air_coupling, rel=0.2)
+        assert fitted.vessel_coupling == pytest.approx(actual.vessel_coupling, rel=0.2)
+
+    def test_loads_columns_of_chamber(self):
+        rows = [{"time": 15.0 * n, "vessel": 30.0, "fridge2.environment": 18.0, "fridge2.fridge": 15.0 - n,
+                 "fridge2.vessel": 16.0, "fridge2.heater": 0.0, "fridge2.cooler": 1.0} for n in range(3)]
+
+        columns = load_columns(rows, "fridge2")
+
+        assert list(columns["time"]) == [0, 15, 30]
+        assert list(columns["vessel"]) == [16, 16, 16]
+        assert list(columns["fridge"]) == [15, 14, 13]
+        assert list(columns["cooler"]) == [1, 1, 1]
+
+    def test_rejects_history_without_columns_of_chamber(self):
+        rows = [{"time": 0.0, "environment": 18.0, "fridge": 15.0, "vessel": 16.0, "heater": 0.0, "cooler": 0.0}]
+
+        with pytest.raises(ValueError):
+            load_columns(rows, "fridge2")
+
+    def test_builds_full_grid(self):
+        tunings = grid([1, 2], [0, 0.1, 0.2], [0], [0.1, 0.2])
+
+        assert tunings["p"].shape == (12,)
+        assert set(zip(tunings["p"], tunings["control_deadband"])) == {(1, 0.1), (1, 0.2), (2, 0.1), (2, 0.2)}
+
+    def test_matches_controller_step_by_step(self):
+        tunings = grid([2], [0.001], [60], [0.15])
+        plant = ThermalPlant(vessel=23.0, fridge=23.0)
+        results = Sweep(ThermalPlant(vessel=23.0, fridge=23.0), 19.5).run(tunings, 6 * 3600)
+
+        config = Mock()
+        config.get_settings.return_value = Settings(p=2, i=0.001, d=60, target=19.5,
+                                                    heating_limit=40, limit_window=10)
+        manual = ManualClock()
+        clock.use(manual)
+        heater, cooler = RecordingSwitch("heater"), RecordingSwitch("cooler")
+        vessel = ReplaySensor("vessel")
+        controller = Controller(config, 15, 0.15, heater, cooler, Limiter("limiter", heater, []),
+                                vessel, ReplaySensor("fridge"), [])
+        cycles = 0
+        for step in range(6 * 3600 // 15):
+            manual.set((step + 1) * 15.0)
+            vessel.set(plant.vessel, plant.vessel)
+            controller.fridge_temp.set(plant.fridge, plant.fridge)
+            was = (heater.get(), cooler.get())
+            controller.control()
+            cycles += (heater.get() and not was[0]) + (cooler.get() and not was[1])
+            plant.step(15, heater.get(), cooler.get())
+
+        assert results["switch_cycles"][0] == cycles
+        assert results["final_error"][0] == pytest.approx(plant.vessel - 19.5, abs=1e-6)
+
+    def test_reports_overshoot_and_settling(self):
+        tunings = grid([0.5, 50], [0], [0], [0.1])
+        results = Sweep(ThermalPlant(vessel=23.0, fridge=23.0), 19.5).run(tunings, 24 * 3600)
+
+        assert np.all(np.isfinite(results["settling_time"]))
+        assert np.all(results["overshoot"] >= 0)
+        assert np.all(results["cooler_duty"] > 0)
+        assert list(rank(results)) in ([0, 1], [1, 0])
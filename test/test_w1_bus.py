@@ -0,0 +1,93 @@
+from threading import Event
+from time import monotonic
+from unittest.mock import Mock, patch
+
+from fermentation_controller.sensor import Sensor
+from fermentation_controller.w1_bus import W1Bus
+
+
+class TestW1Bus:
+
+    @staticmethod
+    def __create_device(device_dir, device_id: str, temperature: str) -> None:
+        device = device_dir / device_id
+        device.mkdir()
+        (device / "temperature").write_text(temperature + "\n")
+
+    def test_triggers_one_conversion_per_master_and_updates_all_sensors(self, tmp_path):
+        master = tmp_path / "w1_bus_master1"
+        master.mkdir()
+        (master / "therm_bulk_read").write_text("0\n")
+        self.__create_device(tmp_path, "28-01", "21512")
+        self.__create_device(tmp_path, "28-02", "-1250")
+
+        listener = Mock()
+        vessel = Sensor("vessel", "28-01", str(tmp_path), 2, [listener])
+        fridge = Sensor("fridge", "28-02", str(tmp_path), 2, [listener])
+
+        W1Bus(str(tmp_path), [vessel, fridge]).read()
+
+        assert (master / "therm_bulk_read").read_text() == "trigger\n"
+        assert vessel.get() == 21.512
+        assert fridge.get() == -1.25
+        listener.handle_temperature.assert_any_call("vessel", 21.512, 21.5)
+        listener.handle_temperature.assert_any_call("fridge", -1.25, -1.2)
+
+    def test_skips_sensor_without_conversion_result(self, tmp_path):
+        master = tmp_path / "w1_bus_master1"
+        master.mkdir()
+        (master / "therm_bulk_read").write_text("0\n")
+        self.__create_device(tmp_path, "28-01", "")
+
+        listener = Mock()
+        vessel = Sensor("vessel", "28-01", str(tmp_path), 2, [listener])
+
+        W1Bus(str(tmp_path), [vessel]).read()
+
+        assert vessel.get() == 0.0
+        listener.handle_temperature.assert_not_called()
+
+    def test_retries_conversion_result(self, tmp_path):
+        master = tmp_path / "w1_bus_master1"
+        master.mkdir()
+        (master / "therm_bulk_read").write_text("0\n")
+        self.__create_device(tmp_path, "28-01", "")
+        vessel = Sensor("vessel", "28-01", str(tmp_path), 2, [], read_retries=1)
+        results = iter(["\n", "21512\n"])
+
+        with patch.object(Sensor, "_Sensor__read_lines", lambda sensor, device_file: [next(results)]):
+            W1Bus(str(tmp_path), [vessel]).read()
+
+        assert vessel.get() == 21.512
+
+    def test_abandons_hung_bus_master(self, tmp_path):
+        master = tmp_path / "w1_bus_master1"
+        master.mkdir()
+        (master / "therm_bulk_read").write_text("0\n")
+        self.__create_device(tmp_path, "28-01", "21512")
+        vessel = Sensor("vessel", "28-01", str(tmp_path), 2, [], read_timeout=1)
+        released = Event()
+
+        bus = W1Bus(str(tmp_path), [vessel], read_timeout=0.05, read_retries=2)
+        started = monotonic()
+        with patch.object(W1Bus, "_W1Bus__trigger", staticmethod(lambda master: released.wait(5))):
+            bus.read()
+            bus.read()
+
+        assert monotonic() - started < 1
+        assert vessel.get() == 21.512
+        released.set()
+
+    def test_falls_back_to_individual_reads_without_bus_master(self, tmp_path):
+        sensor = Mock()
+
+        W1Bus(str(tmp_path), [sensor, sensor]).read()
+
+        assert sensor.read.call_count == 2
+
+    def test_shuts_down_sensors(self, tmp_path):
+        sensor = Mock()
+
+        W1Bus(str(tmp_path), [sensor]).shutdown()
+
+        sensor.shutdown.assert_called_once()
@@ -0,0 +1,65 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from fermentation_controller.chamber import ChamberConfig
+from fermentation_controller.config import Config
+from fermentation_controller.replay import history_files, read_history
+from fermentation_controller.tuning import Sweep, fit_plant, grid, load_columns, rank
+
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.WARNING)
+
+
+def values(spec: str):
+    # either a comma separated list or start:stop:count
+    if ":" in spec:
+        start, stop, count = spec.split(":")
+        return np.linspace(float(start), float(stop), int(count))
+    return [float(value) for value in spec.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a thermal model from logged history and sweep PID tunings")
+    parser.add_argument("history", nargs="*", default=["data.csv"])
+    parser.add_argument("--config", default="./config.json")
+    parser.add_argument("--chamber", default="", help="name of the chamber to fit, when several are configured")
+    parser.add_argument("--p", type=values, default="0.5:5:10")
+    parser.add_argument("--i", type=values, default="0:0.005:6")
+    parser.add_argument("--d", type=values, default="0:600:6")
+    parser.add_argument("--deadband", type=values, default="0:0.5:6")
+    parser.add_argument("--start", type=float, help="initial vessel temperature, defaults to the first logged one")
+    parser.add_argument("--target", type=float, help="defaults to the configured target")
+    parser.add_argument("--hours", type=float, default=48)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    settings = ChamberConfig(Config(args.config), args.chamber).get_settings()
+    files = [f for history in args.history for f in history_files(history)]
+
+    plant = fit_plant(load_columns(read_history(files), args.chamber))
+    print("Fitted model: %s" % plant)
+    if args.start is not None:
+        plant.vessel = plant.fridge = args.start
+
+    sweep = Sweep(plant, args.target if args.target is not None else settings.target,
+                  settings.control_interval, settings.heating_limit, settings.limit_window)
+    tunings = grid(args.p, args.i, args.d, args.deadband)
+
+    started = time.monotonic()
+    results = sweep.run(tunings, args.hours * 3600)
+    print("Evaluated %s tunings over %sh in %.2fs" % (len(tunings["p"]), args.hours, time.monotonic() - started))
+    print()
+
+    print("%8s %8s %8s %9s %10s %12s %7s %7s %7s" % ("p", "i", "d", "deadband", "overshoot", "settling (h)",
+                                                     "cycles", "heat %", "cool %"))
+    for index in rank(results)[:args.top]:
+        print("%8.3f %8.4f %8.1f %9.2f %10.2f %12.2f %7d %7.1f %7.1f"
+              % (results["p"][index], results["i"][index], results["d"][index], results["control_deadband"][index],
+                 results["overshoot"][index], results["settling_time"][index] / 3600, results["switch_cycles"][index],
+                 100 * results["heater_duty"][index], 100 * results["cooler_duty"][index]))
+
+
+if __name__ == '__main__':
+    main()